@@ -0,0 +1,295 @@
+"""
+End-to-end benchmark of both scrapers against the local fake Messages API
+(bench/fake_anthropic.py). Each run copies the data files into a scratch directory, starts
+the fake server with a scenario, runs the scraper there as a subprocess and reports
+throughput (cells or searches per second), per-call latency percentiles as served,
+calls and injected faults, bytes written, output size and peak memory. Results go to a
+JSON file; --compare prints the change against an earlier results file.
+With --batch the scrapers go through the Message Batches API: a first run over part of
+the work is killed once its batch is submitted, and the measured run must resume that
+batch from the state file and submit the rest as a second one.
+
+    python bench/bench_scrapers.py
+    python bench/bench_scrapers.py --scraper compliance --scenario clean,throttled --limit 40 --concurrency 8
+    python bench/bench_scrapers.py --json bench/results-scrapers.json --compare bench/baseline-scrapers.json
+    python bench/bench_scrapers.py --batch --scenario batch
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "data"))
+
+from fake_anthropic import SCENARIOS, FakeAnthropicServer  # noqa: E402
+from message_batches import batch_state_path_for  # noqa: E402
+
+COMPLIANCE_SCRIPT = os.path.join(REPO_ROOT, "data", "sl5_compliance_scraper.py")
+STAKEHOLDER_SCRIPT = os.path.join(REPO_ROOT, "data", "sl5_stakeholder_scraper.py")
+# Copied into the scratch directory, which the scrapers run in (their data paths are relative)
+DATA_FILES = ["data/compliance-data.json", "data/sources.json"]
+STAKEHOLDER_OUTPUT = "public/stakeholder-map/data/sl5-stakeholder-network.json"
+SCRAPERS = ["compliance", "stakeholder"]
+# Metrics compared by --compare, and whether higher is better
+COMPARED = {"throughput": True, "latency_p95": False, "wall_seconds": False, "peak_memory_mb": False, "bytes_written": False}
+# How long the interrupted first run of a --batch benchmark may take to submit its batch
+BATCH_SUBMIT_TIMEOUT = 60.0
+
+# Runs the scraper as __main__ and, on exit, records the process's own I/O and peak memory
+CHILD = """
+import atexit, json, os, resource, runpy, sys
+stats_path, script = sys.argv[1], sys.argv[2]
+def report():
+    stats = {"peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    try:
+        with open("/proc/self/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        stats["bytes_written"] = int(io["wchar"])
+    except OSError:
+        pass
+    with open(stats_path, "w") as f:
+        json.dump(stats, f)
+atexit.register(report)
+sys.argv = [script] + sys.argv[3:]
+sys.path.insert(0, os.path.dirname(script))
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def snapshot(directory: str) -> Dict[str, tuple]:
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            files[os.path.relpath(path, directory)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def count_compliance_cells(path: str, since: str) -> int:
+    """Cells stamped with a fetched_at at or after `since` (ISO seconds, UTC)."""
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    return sum(1 for sl_entry in data for category in sl_entry["categories"]
+               for subcategory in category["subcategories"] for control in subcategory["controls"]
+               for cell in control["compliance"].values() if (cell.get("fetched_at") or "") >= since)
+
+
+def scraper_command(scraper: str, args, partial: bool = False) -> List[str]:
+    """The scraper's command line; `partial` is the smaller run a --batch benchmark interrupts."""
+    if scraper == "compliance":
+        limit = max(1, args.limit // 2) if partial else args.limit
+        command = [COMPLIANCE_SCRIPT, "--all", "--no-cache", "--limit", str(limit),
+                   "--concurrency", str(args.concurrency)]
+        if args.stream:
+            command.append("--stream")
+        if args.multi_lab:
+            command.append("--multi-lab")
+    else:
+        command = [STAKEHOLDER_SCRIPT, "--fresh", "--no-cache", "--concurrency", str(args.concurrency),
+                   "--output", STAKEHOLDER_OUTPUT] + (["--limit", str(args.labs)] if args.labs else [])
+        if partial:
+            command.append("--skip-hidden")
+    if args.batch:
+        command.append("--batch")
+    return command
+
+
+def scraper_options(scraper: str, args) -> Dict:
+    batch = {"batch": True} if args.batch else {}
+    if scraper == "compliance":
+        return {"limit": args.limit, "concurrency": args.concurrency, "stream": args.stream, "multi_lab": args.multi_lab,
+                **batch}
+    return {"labs": args.labs, "concurrency": args.concurrency, **batch}
+
+
+def interrupt_batch_run(scraper: str, args, workdir: str, env: Dict) -> bool:
+    """
+    Start a --batch run over part of the work and kill it as soon as its batch is submitted,
+    leaving the batch state file behind. Returns whether it was killed before finishing.
+    """
+    output = DATA_FILES[0] if scraper == "compliance" else STAKEHOLDER_OUTPUT
+    state_path = os.path.join(workdir, batch_state_path_for(output))
+    process = subprocess.Popen([sys.executable] + scraper_command(scraper, args, partial=True), cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + BATCH_SUBMIT_TIMEOUT
+    while process.poll() is None and not os.path.exists(state_path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    interrupted = process.poll() is None and os.path.exists(state_path)
+    process.kill()
+    process.wait()
+    return interrupted
+
+
+def run_once(scraper: str, scenario_name: str, args) -> Dict:
+    scenario = SCENARIOS[scenario_name]
+    server = FakeAnthropicServer(scenario).start()
+    with tempfile.TemporaryDirectory(prefix="sl5-bench-") as workdir:
+        for relative in DATA_FILES:
+            os.makedirs(os.path.join(workdir, os.path.dirname(relative)), exist_ok=True)
+            shutil.copy2(os.path.join(REPO_ROOT, relative), os.path.join(workdir, relative))
+        before = snapshot(workdir)
+        stats_path = os.path.join(workdir, ".child-stats.json")
+        env = dict(os.environ, ANTHROPIC_API_KEY="bench", ANTHROPIC_BASE_URL=server.base_url)
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        started = time.perf_counter()
+        interrupted = interrupt_batch_run(scraper, args, workdir, env) if args.batch else False
+        completed = subprocess.run([sys.executable, "-c", CHILD, stats_path] + scraper_command(scraper, args),
+                                   cwd=workdir, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        server.stop()
+
+        # Missing if the child was killed before its exit handler ran
+        child = {}
+        if os.path.exists(stats_path):
+            with open(stats_path) as f:
+                child = json.load(f)
+            os.remove(stats_path)
+        after = snapshot(workdir)
+        changed = [path for path, entry in after.items() if before.get(path) != entry]
+        if scraper == "compliance":
+            units = count_compliance_cells(os.path.join(workdir, "data/compliance-data.json"), started_at)
+        else:
+            units = sum(1 for call in server.calls if call["status"] == 200)
+
+    served = [call["seconds"] for call in server.calls if call["status"] == 200]
+    result = {
+        "scraper": scraper,
+        "scenario": scenario_name,
+        "settings": scenario.to_dict(),
+        "options": scraper_options(scraper, args),
+        "exit_code": completed.returncode,
+        "wall_seconds": round(wall, 3),
+        "units": "cells" if scraper == "compliance" else "searches",
+        "completed": units,
+        "throughput": round(units / wall, 3) if wall else None,
+        "calls": len(server.calls),
+        "rate_limited": sum(1 for call in server.calls if call["status"] == 429),
+        "overloaded": sum(1 for call in server.calls if call["status"] == 529),
+        "malformed": sum(1 for call in server.calls if call["malformed"]),
+        "web_searches": sum(call["searches"] for call in server.calls),
+        "latency_p50": percentile(served, 0.5),
+        "latency_p95": percentile(served, 0.95),
+        "latency_p99": percentile(served, 0.99),
+        "bytes_written": child.get("bytes_written"),
+        "output_bytes": sum(after[path][0] for path in changed),
+        "files_written": len(changed),
+        "peak_memory_mb": round(child["peak_memory_kb"] / 1024, 1) if "peak_memory_kb" in child else None
+    }
+    if args.batch:
+        result["batches"] = len(server.batches)
+        result["resumed"] = interrupted and "Resuming message batch" in completed.stdout
+    for field in ("latency_p50", "latency_p95", "latency_p99"):
+        if result[field] is not None:
+            result[field] = round(result[field], 4)
+    if completed.returncode:
+        result["stderr_tail"] = completed.stderr[-2000:]
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[Dict]):
+    print(f"{'scraper':<12} {'scenario':<10} {'done':>6} {'rate':>9} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'calls':>6} {'429':>4} {'529':>4} {'bad':>4} {'written':>9} {'peak':>8} {'wall':>7}")
+    for result in results:
+        def ms(field):
+            return f"{result[field] * 1000:>5.0f}ms" if result[field] is not None else f"{'-':>7}"
+        written = result["bytes_written"] if result["bytes_written"] is not None else result["output_bytes"]
+        peak = f"{result['peak_memory_mb']:>6.1f}MB" if result["peak_memory_mb"] is not None else f"{'-':>8}"
+        print(f"{result['scraper']:<12} {result['scenario']:<10} {result['completed']:>6} "
+              f"{result['throughput']:>7.2f}/s {ms('latency_p50')} {ms('latency_p95')} {ms('latency_p99')} "
+              f"{result['calls']:>6} {result['rate_limited']:>4} {result['overloaded']:>4} {result['malformed']:>4} "
+              f"{written / 1024:>7.0f}KB {peak} {result['wall_seconds']:>6.1f}s"
+              + (f"  ({result['batches']} batches{', resumed' if result['resumed'] else ''})" if "batches" in result else "")
+              + (f"  (exit {result['exit_code']})" if result["exit_code"] else ""))
+
+
+def run_key(run: Dict) -> tuple:
+    """Runs are only comparable with the same scraper, scenario and options."""
+    return run["scraper"], run["scenario"], json.dumps(run["options"], sort_keys=True)
+
+
+def print_comparison(results: List[Dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {run_key(run): run for run in baseline["runs"]}
+    print(f"\nChange against '{baseline_path}' (commit {baseline.get('commit') or 'unknown'}):")
+    for result in results:
+        old = previous.get(run_key(result))
+        if old is None:
+            print(f"  {result['scraper']}/{result['scenario']}: no run with the same options in the baseline")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED.items():
+            if not old.get(metric) or result.get(metric) is None:
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            worse = change < 0 if higher_is_better else change > 0
+            changes.append(f"{metric} {change:+.0%}{' (worse)' if worse and abs(change) >= 0.1 else ''}")
+        print(f"  {result['scraper']}/{result['scenario']}: " + ", ".join(changes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers end to end against a local fake Messages API.")
+    parser.add_argument("--scraper", type=lambda value: value.split(","), default=SCRAPERS,
+                        help=f"Comma-separated scrapers to run (default: {','.join(SCRAPERS)}).")
+    parser.add_argument("--scenario", type=lambda value: value.split(","), default=["clean", "throttled", "malformed"],
+                        help=f"Comma-separated scenarios, from: {', '.join(SCENARIOS)} (default: clean,throttled,malformed).")
+    parser.add_argument("--limit", type=int, default=20, help="Compliance controls per run (default: 20).")
+    parser.add_argument("--labs", type=int, help="Stakeholder labs per run (default: all).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Scraper concurrency (default: 8).")
+    parser.add_argument("--stream", action="store_true", help="Run the compliance scraper with --stream.")
+    parser.add_argument("--multi-lab", action="store_true", help="Run the compliance scraper with --multi-lab.")
+    parser.add_argument("--batch", action="store_true",
+                        help="Run the scrapers with --batch, resuming a batch left by an interrupted first run.")
+    parser.add_argument("--json", default="bench/results-scrapers.json", help="Results file (default: bench/results-scrapers.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+    unknown = set(args.scraper) - set(SCRAPERS) or set(args.scenario) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scraper or scenario: {', '.join(sorted(unknown))}")
+
+    results = []
+    for scraper in args.scraper:
+        for scenario_name in args.scenario:
+            print(f"Running {scraper} / {scenario_name}...", file=sys.stderr)
+            results.append(run_once(scraper, scenario_name, args))
+    print_results(results)
+    for result in results:
+        if result["exit_code"]:
+            print(f"\n{result['scraper']}/{result['scenario']} exited with {result['exit_code']}:\n{result['stderr_tail']}",
+                  file=sys.stderr)
+    with open(args.json, "w") as f:
+        json.dump({
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "runs": results
+        }, f, indent=2)
+    print(f"Results written to '{args.json}'.")
+    if args.compare:
+        print_comparison(results, args.compare)
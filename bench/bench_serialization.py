@@ -0,0 +1,145 @@
+"""
+Load / validate / save benchmark for the data files: the plain-dict path the scrapers used
+before data/serialization.py (stdlib json, indent=2, no validation) against, for each
+available JSON backend, the dicts validated in place (data/validation.py) and the typed
+models of data/models.py (from_dict on load, to_dict on save). The cost of validating, of
+building objects and the gain from the backend show separately. --scale replicates the
+compliance levels to see how the paths grow with the dataset.
+
+    python bench/bench_serialization.py
+    python bench/bench_serialization.py --scale 20 --repeat 5 --json bench/results-serialization.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+
+import serialization  # noqa: E402
+from models import Network, levels_from_dicts, levels_to_dicts  # noqa: E402
+from validation import validate_compliance_data, validate_network  # noqa: E402
+
+COMPLIANCE_FILE = "data/compliance-data.json"
+NETWORK_FILE = "public/stakeholder-map/data/sl5-stakeholder-network.json"
+
+
+@contextmanager
+def backend(name: str):
+    """Run with serialization forced to one backend."""
+    saved = serialization.orjson
+    if name == "json":
+        serialization.orjson = None
+    try:
+        yield
+    finally:
+        serialization.orjson = saved
+
+
+def scaled_compliance(path: str, scale: int) -> bytes:
+    with open(path, "rb") as f:
+        levels = json.loads(f.read())
+    scaled = []
+    for copy_number in range(scale):
+        for sl_entry in levels:
+            sl_entry = copy.deepcopy(sl_entry)
+            sl_entry["level"] += copy_number * len(levels)
+            scaled.append(sl_entry)
+    return json.dumps(scaled, indent=2).encode("utf-8")
+
+
+def before_path(raw: bytes, out_path: str):
+    """What load + save cost before: json.load, then json.dump(indent=2)."""
+    data = json.loads(raw)
+    with open(out_path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def dict_path(raw: bytes, out_path: str, validate=None):
+    """Load and save the plain dicts through data/serialization.py, validating them in place in between."""
+    data = serialization.loads(raw)
+    validate(data)
+    with open(out_path, "wb") as f:
+        f.write(serialization.dumps(data))
+
+
+def model_path(raw: bytes, out_path: str, from_dicts=None, to_dicts=None, compact: bool = False):
+    """Load through data/serialization.py into the models (validating), then save them back."""
+    model = from_dicts(serialization.loads(raw))
+    with open(out_path, "wb") as f:
+        f.write(serialization.dumps(to_dicts(model), compact))
+
+
+def measure(function, repeat: int, *args, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(datasets, repeat: int):
+    backends = ["json"] + (["orjson"] if serialization.orjson is not None else [])
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "out.json")
+        for name, raw, validate, from_dicts, to_dicts in datasets:
+            cases = [("json (before)", "json", before_path, {})]
+            models = {"from_dicts": from_dicts, "to_dicts": to_dicts}
+            for backend_name in backends:
+                cases.append((f"{backend_name} dicts + validate", backend_name, dict_path, {"validate": validate}))
+                cases.append((f"{backend_name} models", backend_name, model_path, models))
+                cases.append((f"{backend_name} models, compact", backend_name, model_path, dict(models, compact=True)))
+            for label, backend_name, function, kwargs in cases:
+                with backend(backend_name):
+                    function(raw, out_path, **kwargs)  # warm up
+                    seconds = measure(function, repeat, raw, out_path, **kwargs)
+                results.append({
+                    "dataset": name,
+                    "path": label,
+                    "input_bytes": len(raw),
+                    "output_bytes": os.path.getsize(out_path),
+                    "seconds": round(seconds, 6)
+                })
+    return results
+
+
+def print_results(results):
+    print(f"{'dataset':<28} {'path':<28} {'input':>10} {'output':>10} {'time':>10} {'vs before':>9}")
+    baselines = {result["dataset"]: result["seconds"] for result in results if result["path"].endswith("(before)")}
+    for result in results:
+        print(f"{result['dataset']:<28} {result['path']:<28} {result['input_bytes'] / 1024:>8.1f}KB "
+              f"{result['output_bytes'] / 1024:>8.1f}KB {result['seconds'] * 1000:>8.2f}ms "
+              f"{baselines[result['dataset']] / result['seconds']:>8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark load/validate/save of the data files: dicts against models, per JSON backend.")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case; the median is reported (default: 7).")
+    parser.add_argument("--scale", type=int, default=1, help="Also run on the compliance data replicated this many times.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    compliance = (validate_compliance_data, levels_from_dicts, levels_to_dicts)
+    network = (validate_network, Network.from_dict, Network.to_dict)
+    with open(COMPLIANCE_FILE, "rb") as f:
+        datasets = [("compliance", f.read(), *compliance)]
+    if args.scale > 1:
+        datasets.append((f"compliance x{args.scale}", scaled_compliance(COMPLIANCE_FILE, args.scale), *compliance))
+    with open(NETWORK_FILE, "rb") as f:
+        datasets.append(("stakeholder network", f.read(), *network))
+
+    results = run(datasets, args.repeat)
+    print(f"JSON backend available: {serialization.BACKEND}")
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"Results written to '{args.json}'.")
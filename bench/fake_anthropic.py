@@ -0,0 +1,464 @@
+"""
+Local stand-in for the Messages API, for benchmarking the scrapers without paying for calls.
+Answers POST /v1/messages (plain or streamed) with canned web-search blocks and the JSON each
+scraper asks for, recognised from the prompt: single- and multi-lab compliance scores and
+the four stakeholder searches. Message Batches (POST /v1/messages/batches, GET
+/v1/messages/batches/{id} and its JSONL results) are answered the same way, each request
+drawn like one call, and end `batch_seconds` after they were created. A scenario sets the latency distribution and how often a
+call fails with 429 (rate limited) or 529 (overloaded) or answers with malformed output
+(no JSON, truncated JSON, an invalid score). Answers are derived from a hash of the prompt
+so reruns see the same data; latency and fault injection come from a seeded generator.
+
+    python bench/fake_anthropic.py --port 8765 --scenario throttled
+    ANTHROPIC_API_KEY=bench ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python data/sl5_compliance_scraper.py --limit 5 --output /tmp/out.json
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+SCORES = [0, 25, 50, 75, 100]
+# Justifications start with this, so a harness can tell cells written from canned answers
+JUSTIFICATION_PREFIX = "Benchmark answer"
+# Entity pools the stakeholder answers draw from; small enough that labs share vendors
+CONTRACTORS = [f"{name} Construction" for name in ("Turner", "DPR", "Mortenson", "Holder", "Fortis", "Clayco",
+                                                    "Rosendin", "Whiting-Turner", "Hensel Phelps", "Skanska")]
+CLOUD_PROVIDERS = ["Amazon Web Services", "Microsoft Azure", "Google Cloud", "Oracle Cloud", "CoreWeave"]
+POWER_VENDORS = ["Vertiv", "Schneider Electric", "Eaton", "Caterpillar", "GE Vernova", "Trane"]
+SPECIALIZED = ["Sentinel SCIF Builders", "Keystone Secure Facilities", "Ironclad Integrators",
+               "Northgate Physical Security", "Coldfront Liquid Cooling", "Fibrelane Networks"]
+LABS = ["OpenAI", "Anthropic", "Google DeepMind", "xAI", "Meta AI"]
+# Malformed answer kinds, chosen uniformly when a call is selected to be malformed
+MALFORMED_KINDS = ["no_json", "truncated", "invalid_score"]
+# Characters per streamed text delta
+STREAM_CHUNK = 40
+# Shorter prefixes marked with cache_control are not cached, as with the real API's minimum
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a function of a random.Random returning seconds."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    raise ValueError(f"Invalid latency spec '{spec}' (use fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA)")
+
+
+class Scenario:
+    """
+    Behaviour of the fake server. `latency` is "fixed:S", "uniform:LOW,HIGH" or
+    "lognormal:MEDIAN,SIGMA" (seconds); the rates are per-call probabilities. A message
+    batch stays in progress for `batch_seconds` after it is created.
+    """
+
+    def __init__(self, latency: str = "lognormal:0.05,0.5", rate_limited: float = 0.0, overloaded: float = 0.0,
+                 malformed: float = 0.0, retry_after: float = 0.0, searches: int = 2, entities: int = 4, seed: int = 0,
+                 batch_seconds: float = 1.0):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.overloaded = overloaded
+        self.malformed = malformed
+        self.retry_after = retry_after
+        self.searches = searches
+        self.entities = entities
+        self.seed = seed
+        self.batch_seconds = batch_seconds
+        self.sample_latency = parse_latency(latency)
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in ("latency", "rate_limited", "overloaded", "malformed",
+                                                          "retry_after", "searches", "entities", "seed",
+                                                          "batch_seconds")}
+
+
+SCENARIOS = {
+    "clean": Scenario(),
+    "throttled": Scenario(rate_limited=0.1, overloaded=0.05),
+    "malformed": Scenario(malformed=0.2),
+    "slow": Scenario(latency="lognormal:0.5,0.8"),
+    # Long enough that a --batch run can be interrupted while its batch is still in progress
+    "batch": Scenario(rate_limited=0.05, malformed=0.1, batch_seconds=8.0),
+}
+
+
+def prompt_of(body: Dict) -> str:
+    content = body["messages"][-1]["content"]
+    if isinstance(content, list):
+        return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return content
+
+
+def pick(pool: List[str], digest: int, count: int) -> List[str]:
+    """`count` distinct entries of `pool`, chosen by `digest`."""
+    start = digest % len(pool)
+    step = 1 + (digest // len(pool)) % (len(pool) - 1) if len(pool) > 1 else 1
+    chosen = []
+    for i in range(len(pool) * 2):
+        entry = pool[(start + i * step) % len(pool)]
+        if entry not in chosen:
+            chosen.append(entry)
+        if len(chosen) == min(count, len(pool)):
+            break
+    return chosen
+
+
+def urls_for(name: str, digest: int, count: int = 2) -> List[str]:
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return [f"https://{slug}.example.com/news/{(digest >> (8 * i)) % 1000}" for i in range(count)]
+
+
+def compliance_answer(prompt: str, digest: int) -> Optional[Dict]:
+    multi = re.search(r"each of these AI labs: (.*?), regarding", prompt)
+    if multi:
+        return {lab: {"score": SCORES[(digest >> i) % 5], "justification": f"{JUSTIFICATION_PREFIX} for {lab}.",
+                      "sources": urls_for(lab, digest >> i)}
+                for i, lab in enumerate(multi.group(1).split(", "))}
+    if prompt.startswith("Assess "):
+        return {"score": SCORES[digest % 5], "justification": f"{JUSTIFICATION_PREFIX}.", "sources": urls_for("lab", digest)}
+    return None
+
+
+def stakeholder_answer(prompt: str, digest: int, entities: int) -> Optional[Dict]:
+    lab = next((lab for lab in LABS if lab in prompt), "the lab")
+    if '"contractors" schema' in prompt:
+        return {"contractors": [
+            {"name": name, "description": f"{JUSTIFICATION_PREFIX}: builds datacenters for {lab}.",
+             "projects": [f"{lab} campus phase {i + 1}"], "url": urls_for(name, digest, 1)[0],
+             "sources": urls_for(name, digest)}
+            for i, name in enumerate(pick(CONTRACTORS, digest, entities))
+        ]}
+    if '"security_staff" schema' in prompt:
+        return {"security_staff": [
+            {"name": f"{lab} Security Lead {i + 1}", "title": "Director of Security",
+             "description": JUSTIFICATION_PREFIX, "initiatives": ["Insider risk program"],
+             "sources": urls_for(f"{lab} staff {i}", digest)}
+            for i in range(max(1, entities // 2))
+        ]}
+    if '"infrastructure" schema' in prompt:
+        return {"infrastructure": {
+            "cloud_providers": [{"name": name, "relationship": JUSTIFICATION_PREFIX, "services": ["GPU capacity"],
+                                 "sources": urls_for(name, digest)} for name in pick(CLOUD_PROVIDERS, digest, 2)],
+            "datacenters": [],
+            "power_cooling": [{"vendor": name, "services": JUSTIFICATION_PREFIX, "projects": [],
+                               "sources": urls_for(name, digest)} for name in pick(POWER_VENDORS, digest >> 4, 2)]
+        }}
+    if '"specialized_contractors" schema' in prompt:
+        return {"specialized_contractors": [
+            {"name": name, "specialty": "security" if i % 2 == 0 else "cooling",
+             "background": JUSTIFICATION_PREFIX, "ai_projects": [f"Facility for {lab}" for lab in pick(LABS, digest >> i, 2)],
+             "sources": urls_for(name, digest)}
+            for i, name in enumerate(pick(SPECIALIZED, digest, entities))
+        ]}
+    return None
+
+
+def malformed_text(answer: Dict, kind: str) -> str:
+    if kind == "no_json":
+        return "I could not find specific public information on this, so I can't give a structured answer."
+    if kind == "invalid_score" and "score" in answer:
+        return "```json\n" + json.dumps(dict(answer, score=42)) + "\n```"
+    encoded = json.dumps(answer)
+    return "```json\n" + encoded[:len(encoded) // 2]
+
+
+def search_blocks(prompt: str, digest: int, searches: int) -> List[Dict]:
+    blocks = []
+    for i in range(searches):
+        tool_id = f"srvtoolu_{digest % 10**8:08d}{i}"
+        blocks.append({"type": "server_tool_use", "id": tool_id, "name": "web_search",
+                       "input": {"query": prompt[:60]}})
+        blocks.append({"type": "web_search_tool_result", "tool_use_id": tool_id, "content": [
+            {"type": "web_search_result", "url": url, "title": f"Result page {j + 1}",
+             "encrypted_content": "benchmark", "page_age": None}
+            for j, url in enumerate(urls_for("lab", digest >> i))
+        ]})
+    return blocks
+
+
+def cited_blocks(prompt: str, digest: int, searches: int) -> List[Dict]:
+    """A sentence citing the first result of each search, as answers grounded in search results carry."""
+    if not searches:
+        return []
+    citations = [{"type": "web_search_result_location", "url": urls_for("lab", digest >> i)[0], "title": "Result page 1",
+                  "cited_text": f"Published material on: {prompt[:150]}", "encrypted_index": "benchmark"}
+                 for i in range(searches)]
+    return [{"type": "text", "text": "The search results describe this directly.", "citations": citations}]
+
+
+class FakeAnthropicServer:
+    """The server plus per-call records, served from a background thread."""
+
+    def __init__(self, scenario: Scenario, port: int = 0):
+        self.scenario = scenario
+        self.rng = random.Random(scenario.seed)
+        self.lock = threading.Lock()
+        # One record per request, batched requests included: {status, seconds, stream, malformed, searches, batch}
+        self.calls = []
+        self.cached_prefixes = set()
+        # Batch id -> {"created", "created_at", "results"}
+        self.batches = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def draw(self):
+        """Latency, injected status and malformed kind for the next call, from the seeded generator."""
+        with self.lock:
+            latency = self.scenario.sample_latency(self.rng)
+            roll = self.rng.random()
+            malformed = self.rng.choice(MALFORMED_KINDS) if self.rng.random() < self.scenario.malformed else None
+        if roll < self.scenario.rate_limited:
+            return latency, 429, None
+        if roll < self.scenario.rate_limited + self.scenario.overloaded:
+            return latency, 529, None
+        return latency, 200, malformed
+
+    def record(self, **call):
+        with self.lock:
+            self.calls.append(call)
+
+    def usage(self, body: Dict, text: str, searches: int) -> Dict:
+        """Token counts as the API would report them (about four characters per token)."""
+        system = json.dumps(body.get("system", ""))
+        prompt = json.dumps(body["messages"])
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": max(1, len(text) // 4),
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0,
+                 "server_tool_use": {"web_search_requests": searches}}
+        if "cache_control" in system and len(system) // 4 >= MIN_CACHEABLE_TOKENS:
+            with self.lock:
+                seen = system in self.cached_prefixes
+                self.cached_prefixes.add(system)
+            usage["cache_read_input_tokens" if seen else "cache_creation_input_tokens"] = len(system) // 4
+        else:
+            usage["input_tokens"] += len(system) // 4
+        return usage
+
+    def message(self, body: Dict, malformed: Optional[str]) -> Dict:
+        prompt = prompt_of(body)
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        answer = compliance_answer(prompt, digest) or stakeholder_answer(prompt, digest, self.scenario.entities) or {}
+        if malformed:
+            text = malformed_text(answer, malformed)
+        else:
+            text = "Based on the search results:\n```json\n" + json.dumps(answer, indent=2) + "\n```"
+        searches = self.scenario.searches if body.get("tools") else 0
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "content": search_blocks(prompt, digest, searches) + cited_blocks(prompt, digest, searches)
+                       + [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": self.usage(body, text, searches)
+        }
+
+    def create_batch(self, body: Dict) -> Dict:
+        """Answer every request of a batch up front; the results are served once the batch has ended."""
+        results = []
+        for request in body["requests"]:
+            latency, status, malformed = self.draw()
+            if status == 200:
+                message = self.message(request["params"], malformed)
+                result = {"type": "succeeded", "message": message}
+                searches = message["usage"]["server_tool_use"]["web_search_requests"]
+            else:
+                error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": error_type, "message": f"{error_type} (injected)"}}}
+                searches = 0
+            results.append({"custom_id": request["custom_id"], "result": result})
+            self.record(status=status, seconds=latency, stream=False, malformed=malformed, searches=searches, batch=True)
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.batches[batch_id] = {"created": time.monotonic(), "created_at": datetime.now(timezone.utc),
+                                      "results": results}
+        return self.batch_object(batch_id)
+
+    def batch_object(self, batch_id: str) -> Optional[Dict]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        ended = time.monotonic() - batch["created"] >= self.scenario.batch_seconds
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for entry in batch["results"]:
+            counts[entry["result"]["type"] if ended else "processing"] += 1
+        created_at = batch["created_at"]
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": created_at.isoformat(),
+            "expires_at": (created_at + timedelta(hours=24)).isoformat(),
+            "ended_at": (created_at + timedelta(seconds=self.scenario.batch_seconds)).isoformat() if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # A --batch benchmark kills its first run mid-connection
+                    pass
+
+            def send_json(self, status: int, payload: Dict, headers: Dict = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.send_header("request-id", f"req_{uuid.uuid4().hex[:16]}")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_not_found(self):
+                self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[:3] != ["v1", "messages", "batches"] or len(parts) not in (4, 5) or parts[4:] not in ([], ["results"]):
+                    self.send_not_found()
+                    return
+                batch = server.batch_object(parts[3])
+                if batch is None or (len(parts) == 5 and batch["processing_status"] != "ended"):
+                    self.send_not_found()
+                elif len(parts) == 4:
+                    self.send_json(200, batch)
+                else:
+                    with server.lock:
+                        results = server.batches[parts[3]]["results"]
+                    data = "".join(json.dumps(entry) + "\n" for entry in results).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("content-type", "application/binary")
+                    self.send_header("content-length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+
+            def do_POST(self):
+                started = time.monotonic()
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+                if self.path.split("?")[0] == "/v1/messages/batches":
+                    self.send_json(200, server.create_batch(body))
+                    return
+                if self.path.split("?")[0] != "/v1/messages":
+                    self.send_not_found()
+                    return
+                latency, status, malformed = server.draw()
+                stream = bool(body.get("stream"))
+                if status == 429:
+                    time.sleep(min(latency, 0.01))
+                    self.send_json(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited (injected)"}},
+                                   {"retry-after": str(server.scenario.retry_after)})
+                elif status == 529:
+                    time.sleep(min(latency, 0.01))
+                    self.send_json(529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (injected)"}})
+                else:
+                    message = server.message(body, malformed)
+                    if stream:
+                        self.stream_message(message, latency)
+                    else:
+                        time.sleep(latency)
+                        self.send_json(200, message)
+                server.record(status=status, seconds=time.monotonic() - started, stream=stream, malformed=malformed,
+                              searches=message["usage"]["server_tool_use"]["web_search_requests"] if status == 200 else 0,
+                              batch=False)
+
+            def stream_message(self, message: Dict, latency: float):
+                """Server-sent events: a third of the latency before the first event, the rest spread over the text."""
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(name: str, data: Dict):
+                    self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                time.sleep(latency / 3)
+                try:
+                    start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=1))
+                    event("message_start", {"type": "message_start", "message": start})
+                    for index, block in enumerate(message["content"]):
+                        if block["type"] != "text":
+                            event("content_block_start", {"type": "content_block_start", "index": index, "content_block": block})
+                        else:
+                            event("content_block_start", {"type": "content_block_start", "index": index,
+                                                          "content_block": {"type": "text", "text": ""}})
+                            for citation in block.get("citations") or []:
+                                event("content_block_delta", {"type": "content_block_delta", "index": index, "delta": {
+                                    "type": "citations_delta", "citation": citation}})
+                            chunks = range(0, len(block["text"]), STREAM_CHUNK)
+                            for offset in chunks:
+                                time.sleep(latency * 2 / 3 / len(chunks))
+                                event("content_block_delta", {"type": "content_block_delta", "index": index, "delta": {
+                                    "type": "text_delta", "text": block["text"][offset:offset + STREAM_CHUNK]}})
+                        event("content_block_stop", {"type": "content_block_stop", "index": index})
+                    event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                            "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+                    event("message_stop", {"type": "message_stop"})
+                except (BrokenPipeError, ConnectionResetError):
+                    # --stream clients hang up as soon as the result JSON closes
+                    pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Messages API.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765).")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="clean", help="Latency and fault profile (default: clean).")
+    parser.add_argument("--latency", help="Override the scenario's latency, e.g. fixed:0.2 or lognormal:1.5,0.6.")
+    args = parser.parse_args()
+
+    scenario = SCENARIOS[args.scenario]
+    if args.latency:
+        scenario = Scenario(**dict(scenario.to_dict(), latency=args.latency))
+    server = FakeAnthropicServer(scenario, args.port)
+    print(f"Fake Messages API ({args.scenario}: {json.dumps(scenario.to_dict())}) on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
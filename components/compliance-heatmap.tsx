@@ -6,15 +6,25 @@ import { ScrollArea } from "@/components/ui/scroll-area"
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "@/components/ui/tooltip"
 import { Badge } from "@/components/ui/badge"
 import { Separator } from "@/components/ui/separator"
-import { useState, useMemo } from "react"
+import { useState } from "react"
 
-import complianceData from "@/data/compliance-data.json"
+// Scores only (written by data/compliance_export.py); justifications and sources are in
+// per-level shards under public/compliance, fetched the first time a cell in that level opens
+import complianceScores from "@/data/compliance-scores.json"
+// Per-lab aggregates precomputed by data/compliance_analytics.py (written with the export)
+import complianceAnalytics from "@/data/compliance-analytics.json"
 
 const companies = ["OpenAI", "Anthropic", "Google", "xAI", "Meta"]
 
+interface ComplianceScores {
+  labs: string[]
+  levels: ComplianceData[]
+}
+
 interface ComplianceData {
   level: number
   description: string
+  details: string
   categories: Category[]
 }
 
@@ -30,15 +40,65 @@ interface Subcategory {
 
 interface Control {
   name: string
-  compliance: Record<string, ComplianceInfo>
+  scores: (number | null)[]
+  detail: number
+}
+
+interface ComplianceDetails {
+  source_ids?: string[]
+  justification?: string
+  fetched_at?: string
+  model?: string
+}
+
+interface Source {
+  url: string | null
+  title: string | null
+  domain: string
+}
+
+interface LevelDetails {
+  level: number
+  labs: string[]
+  controls: (ComplianceDetails | null)[][]
+  // Each source the level cites, once (see data/source_registry.py)
+  sources: Record<string, Source>
+}
+
+interface LabStats {
+  mean: number
+  rank: number
+  perfect_controls: number
+  total_controls: number
+  attainment: Record<string, number>
 }
 
-interface ComplianceInfo {
-  score: number
-  sources: string[]
-  justification: string
+interface ComplianceAnalytics {
+  overall: Record<string, LabStats>
+}
+
+const scoreData = complianceScores as ComplianceScores
+const companyStats = (complianceAnalytics as ComplianceAnalytics).overall
+
+// One request per level shard, shared by every cell in the level
+const levelDetailsCache = new Map<string, Promise<LevelDetails>>()
+
+const loadLevelDetails = (url: string): Promise<LevelDetails> => {
+  let details = levelDetailsCache.get(url)
+  if (!details) {
+    details = fetch(url).then((response) => {
+      if (!response.ok) throw new Error(`Failed to load ${url}: ${response.status}`)
+      return response.json()
+    })
+    // Let a failed request be retried the next time a cell opens
+    details.catch(() => levelDetailsCache.delete(url))
+    levelDetailsCache.set(url, details)
+  }
+  return details
 }
 
+const getScore = (control: Control, company: string): number => control.scores[scoreData.labs.indexOf(company)] ?? 0
+
 const getScoreColor = (score: number): string => {
   if (score === 0) return "bg-red-500"
   if (score === 100) return "bg-green-500"
@@ -55,22 +115,44 @@ const getTextColor = (score: number): string => {
 interface ComplianceCellProps {
   company: string
   control: Control
+  detailsUrl: string
 }
 
-const ComplianceCell: React.FC<ComplianceCellProps> = ({ company, control }) => {
+const ComplianceCell: React.FC<ComplianceCellProps> = ({ company, control, detailsUrl }) => {
   const [isOpen, setIsOpen] = useState(false)
-  const compliance = control.compliance[company]
-  const score = compliance?.score || 0
-  const justification = compliance?.justification || "No information available"
-  const sources = compliance?.sources || []
+  const [details, setDetails] = useState<ComplianceDetails | null>(null)
+  const [sources, setSources] = useState<Source[]>([])
+  const [detailsState, setDetailsState] = useState<"idle" | "loading" | "loaded" | "error">("idle")
+  const score = getScore(control, company)
+  const justification =
+    detailsState === "loaded"
+      ? details?.justification || "No information available"
+      : detailsState === "error"
+        ? "Details could not be loaded."
+        : "Loading details..."
+
+  const handleOpenChange = (open: boolean) => {
+    setIsOpen(open)
+    if (open && detailsState !== "loaded" && detailsState !== "loading") {
+      setDetailsState("loading")
+      loadLevelDetails(detailsUrl)
+        .then((levelDetails) => {
+          const cell = levelDetails.controls[control.detail]?.[levelDetails.labs.indexOf(company)] ?? null
+          setDetails(cell)
+          setSources((cell?.source_ids ?? []).map((id) => levelDetails.sources[id]).filter(Boolean))
+          setDetailsState("loaded")
+        })
+        .catch(() => setDetailsState("error"))
+    }
+  }
 
   const handleClick = () => {
-    setIsOpen(!isOpen)
+    handleOpenChange(!isOpen)
   }
 
   return (
     <TooltipProvider>
-      <Tooltip open={isOpen} onOpenChange={setIsOpen}>
+      <Tooltip open={isOpen} onOpenChange={handleOpenChange}>
         <TooltipTrigger asChild>
           <div
             onClick={handleClick}
@@ -102,7 +184,13 @@ const ComplianceCell: React.FC<ComplianceCellProps> = ({ company, control }) =>
                 <ul className="list-disc list-inside mt-1">
                   {sources.map((source, idx) => (
                     <li key={idx} className="text-xs">
-                      {source}
+                      {source.url ? (
+                        <a href={source.url} target="_blank" rel="noopener noreferrer" className="underline">
+                          {source.title || source.url}
+                        </a>
+                      ) : (
+                        source.title
+                      )}
                     </li>
                   ))}
                 </ul>
@@ -116,40 +204,7 @@ const ComplianceCell: React.FC<ComplianceCellProps> = ({ company, control }) =>
 }
 
 export default function ComplianceHeatmap() {
-  const data = complianceData as ComplianceData[]
-
-  const companyStats = useMemo(() => {
-    const stats: Record<string, { totalScore: number; perfectControls: number; totalControls: number }> = {}
-
-    companies.forEach((company) => {
-      let scoreSum = 0
-      let controlCount = 0
-      let perfectCount = 0
-
-      data.forEach((level) => {
-        level.categories.forEach((category) => {
-          category.subcategories.forEach((subcategory) => {
-            subcategory.controls.forEach((control) => {
-              const score = control.compliance[company].score
-              scoreSum += score
-              controlCount++
-              if (score === 100) {
-                perfectCount++
-              }
-            })
-          })
-        })
-      })
-
-      stats[company] = {
-        totalScore: scoreSum / controlCount || 0,
-        perfectControls: perfectCount,
-        totalControls: controlCount,
-      }
-    })
-
-    return stats
-  }, [data])
+  const data = scoreData.levels
 
   return (
     <div className="w-full max-w-7xl mx-auto p-4">
@@ -175,13 +230,13 @@ export default function ComplianceHeatmap() {
               return (
                 <div key={company} className="flex flex-col items-center">
                   <div
-                    className={`text-2xl font-bold ${getScoreColor(stats.totalScore)} ${getTextColor(stats.totalScore)} rounded-full w-20 h-20 flex items-center justify-center`}
+                    className={`text-2xl font-bold ${getScoreColor(stats.mean)} ${getTextColor(stats.mean)} rounded-full w-20 h-20 flex items-center justify-center`}
                   >
-                    {stats.totalScore.toFixed(0)}%
+                    {stats.mean.toFixed(0)}%
                   </div>
                   <p className="text-center font-medium text-sm mt-1">{company}</p>
                   <p className="text-center text-muted-foreground text-xs">
-                    {stats.perfectControls}/{stats.totalControls} at 100%
+                    {stats.perfect_controls}/{stats.total_controls} at 100%
                   </p>
                 </div>
               )
@@ -238,7 +293,7 @@ export default function ComplianceHeatmap() {
                                   </div>
                                   <div className="flex">
                                     {companies.map((company) => (
-                                      <ComplianceCell key={company} company={company} control={control} />
+                                      <ComplianceCell key={company} company={company} control={control} detailsUrl={level.details} />
                                     ))}
                                   </div>
                                 </div>
@@ -0,0 +1,276 @@
+"""
+Aggregates over the compliance matrix.
+Loads data/compliance-data.json into a dense array scores[level, control, lab] (levels have
+different numbers of controls, so rows past a level's last control are padding and masked
+out) with per-control category and subcategory index arrays, and computes everything the
+heatmap and the weekly summary need in a handful of vectorized passes: per-lab, per-level and
+per-category means, the highest SL each lab reaches at a few score thresholds, the gaps
+left at the next level, and rankings. Prints a report, and writes the results as JSON the
+heatmap bundles instead of recomputing them in the browser.
+
+    python data/compliance_analytics.py
+    python data/compliance_analytics.py --json data/compliance-analytics.json
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from progress_journal import atomic_write_json
+from serialization import load_file
+
+INPUT_FILE = "data/compliance-data.json"
+ANALYTICS_FILE = "data/compliance-analytics.json"
+# A control with no cell for a lab counts as no evidence, the way the heatmap shows it
+MISSING_SCORE = 0
+# A lab reaches a level at a threshold when every control of that level and all lower
+# levels scores at least the threshold
+ATTAINMENT_THRESHOLDS = {"full": 100, "substantial": 75, "partial": 50}
+# Controls listed per lab for the first level it does not fully reach
+MAX_GAP_CONTROLS = 10
+
+
+class ComplianceMatrix:
+    """
+    Dense view of the compliance data. `scores` is float [level, control, lab] with
+    MISSING_SCORE where a lab has no cell; `valid` [level, control] is False on padding;
+    `category` and `subcategory` [level, control] index into `category_names` and
+    `subcategory_names` (-1 on padding). Subcategories are keyed by (category, subcategory)
+    name, so the same area is pooled across levels.
+    """
+    __slots__ = ("levels", "labs", "scores", "present", "valid", "control_names",
+                 "category", "subcategory", "category_names", "subcategory_names")
+
+    def __init__(self, levels, labs, scores, present, valid, control_names,
+                 category, subcategory, category_names, subcategory_names):
+        self.levels = levels
+        self.labs = labs
+        self.scores = scores
+        self.present = present
+        self.valid = valid
+        self.control_names = control_names
+        self.category = category
+        self.subcategory = subcategory
+        self.category_names = category_names
+        self.subcategory_names = subcategory_names
+
+
+def build_matrix(compliance_data: List[Dict], labs: List[str] = None) -> ComplianceMatrix:
+    """Flatten the nested levels/categories/subcategories/controls into the dense arrays."""
+    if labs is None:
+        labs = {}
+        for sl_entry in compliance_data:
+            for category in sl_entry["categories"]:
+                for subcategory in category["subcategories"]:
+                    for control in subcategory["controls"]:
+                        labs.update(dict.fromkeys(control["compliance"]))
+        labs = list(labs)
+    lab_index = {lab: i for i, lab in enumerate(labs)}
+    width = max((sum(len(subcategory["controls"]) for category in sl_entry["categories"]
+                     for subcategory in category["subcategories"]) for sl_entry in compliance_data), default=0)
+    shape = (len(compliance_data), width)
+    scores = np.full(shape + (len(labs),), MISSING_SCORE, dtype=np.float64)
+    present = np.zeros(shape + (len(labs),), dtype=bool)
+    valid = np.zeros(shape, dtype=bool)
+    category_ids = np.full(shape, -1, dtype=np.intp)
+    subcategory_ids = np.full(shape, -1, dtype=np.intp)
+    category_names: Dict[str, int] = {}
+    subcategory_names: Dict[tuple, int] = {}
+    control_names = []
+    for level_row, sl_entry in enumerate(compliance_data):
+        names = []
+        for category in sl_entry["categories"]:
+            category_id = category_names.setdefault(category["name"], len(category_names))
+            for subcategory in category["subcategories"]:
+                key = (category["name"], subcategory["name"])
+                subcategory_id = subcategory_names.setdefault(key, len(subcategory_names))
+                for control in subcategory["controls"]:
+                    column = len(names)
+                    names.append(control["name"])
+                    valid[level_row, column] = True
+                    category_ids[level_row, column] = category_id
+                    subcategory_ids[level_row, column] = subcategory_id
+                    for lab, cell in control["compliance"].items():
+                        if lab in lab_index and cell.get("score") is not None:
+                            scores[level_row, column, lab_index[lab]] = cell["score"]
+                            present[level_row, column, lab_index[lab]] = True
+        control_names.append(names)
+    return ComplianceMatrix([sl_entry["level"] for sl_entry in compliance_data], labs, scores, present, valid,
+                            control_names, category_ids, subcategory_ids, list(category_names), list(subcategory_names))
+
+
+def group_means(matrix: ComplianceMatrix, group_ids: np.ndarray, groups: int) -> np.ndarray:
+    """Mean score per (group, lab) over the controls in each group; NaN for empty groups."""
+    flat_ids = group_ids[matrix.valid]
+    scores = matrix.scores[matrix.valid]  # (controls, labs)
+    sums = np.zeros((groups, len(matrix.labs)))
+    np.add.at(sums, flat_ids, scores)
+    counts = np.bincount(flat_ids, minlength=groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts[:, None]
+
+
+def competition_ranks(values: np.ndarray) -> np.ndarray:
+    """1 + the number of labs strictly ahead, along the last axis (ties share a rank)."""
+    return (values[..., None, :] > values[..., :, None]).sum(axis=-1) + 1
+
+
+def attainment(matrix: ComplianceMatrix, threshold: float) -> np.ndarray:
+    """Highest level each lab reaches at `threshold` (0 when it does not reach the first)."""
+    meets = (matrix.scores >= threshold) | ~matrix.valid[:, :, None]
+    level_met = meets.all(axis=1)  # (levels, labs)
+    # Levels are cumulative: reaching SL3 needs SL1 and SL2 as well
+    reached = np.logical_and.accumulate(level_met, axis=0).sum(axis=0)
+    levels = np.asarray([0] + matrix.levels)
+    return levels[reached]
+
+
+def analyze(matrix: ComplianceMatrix) -> Dict:
+    """Every aggregate as plain JSON-ready values, keyed by lab where that is the natural lookup."""
+    valid = matrix.valid[:, :, None]
+    level_counts = matrix.valid.sum(axis=1)
+    total_controls = int(level_counts.sum())
+    masked = np.where(valid, matrix.scores, 0.0)
+
+    overall = masked.sum(axis=(0, 1)) / max(total_controls, 1)
+    perfect = ((matrix.scores == 100) & valid).sum(axis=(0, 1))
+    gap_points = np.where(valid, 100 - matrix.scores, 0.0).sum(axis=(0, 1))
+    missing = (~matrix.present & valid).sum(axis=(0, 1))
+    overall_ranks = competition_ranks(overall)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        level_means = masked.sum(axis=1) / level_counts[:, None]  # (levels, labs)
+    level_ranks = competition_ranks(level_means)
+    category_means = group_means(matrix, matrix.category, len(matrix.category_names))
+    subcategory_means = group_means(matrix, matrix.subcategory, len(matrix.subcategory_names))
+    weakest = np.nanargmin(subcategory_means, axis=0) if len(matrix.subcategory_names) else []
+    reached = {name: attainment(matrix, threshold) for name, threshold in ATTAINMENT_THRESHOLDS.items()}
+
+    full_threshold = ATTAINMENT_THRESHOLDS["full"]
+    next_gaps = {}
+    for lab_column, lab in enumerate(matrix.labs):
+        level_row = matrix.levels.index(reached["full"][lab_column]) + 1 if reached["full"][lab_column] else 0
+        if level_row >= len(matrix.levels):
+            next_gaps[lab] = None
+            continue
+        row = matrix.scores[level_row, :, lab_column]
+        short = np.flatnonzero(matrix.valid[level_row] & (row < full_threshold))
+        short = short[np.argsort(row[short], kind="stable")]
+        next_gaps[lab] = {
+            "level": matrix.levels[level_row],
+            "controls_short": int(short.size),
+            "controls": [{"name": matrix.control_names[level_row][column], "score": round(float(row[column]), 1)}
+                         for column in short[:MAX_GAP_CONTROLS]]
+        }
+
+    def rounded(values) -> List:
+        return [None if np.isnan(value) else round(float(value), 1) for value in values]
+
+    return {
+        "labs": matrix.labs,
+        "levels": matrix.levels,
+        "categories": matrix.category_names,
+        "thresholds": ATTAINMENT_THRESHOLDS,
+        "overall": {
+            lab: {
+                "mean": round(float(overall[i]), 1),
+                "rank": int(overall_ranks[i]),
+                "perfect_controls": int(perfect[i]),
+                "total_controls": total_controls,
+                "missing_cells": int(missing[i]),
+                "gap_points": round(float(gap_points[i]), 1),
+                "attainment": {name: int(levels[i]) for name, levels in reached.items()}
+            }
+            for i, lab in enumerate(matrix.labs)
+        },
+        "by_level": {lab: rounded(level_means[:, i]) for i, lab in enumerate(matrix.labs)},
+        "level_ranks": {lab: [int(rank) for rank in level_ranks[:, i]] for i, lab in enumerate(matrix.labs)},
+        "by_category": {lab: rounded(category_means[:, i]) for i, lab in enumerate(matrix.labs)},
+        "weakest_subcategory": {
+            lab: {
+                "category": matrix.subcategory_names[weakest[i]][0],
+                "subcategory": matrix.subcategory_names[weakest[i]][1],
+                "mean": round(float(subcategory_means[weakest[i], i]), 1)
+            }
+            for i, lab in enumerate(matrix.labs)
+        } if len(matrix.subcategory_names) else {},
+        "next_level_gaps": next_gaps
+    }
+
+
+def write_analytics(compliance_data: List[Dict], path: str = ANALYTICS_FILE, labs: List[str] = None) -> Dict:
+    results = analyze(build_matrix(compliance_data, labs))
+    # Compact: the heatmap bundles it and nobody reads it by hand
+    atomic_write_json(results, path, compact=True)
+    return results
+
+
+def print_report(results: Dict):
+    labs = results["labs"]
+    column = max([len(lab) for lab in labs] + [6]) + 2
+
+    def header(title: str, first: str, width: int = 0):
+        print(f"\n{title}")
+        print(f"  {first:<{width}}" + "".join(f"{lab:>{column}}" for lab in labs))
+
+    def cell(value) -> str:
+        return f"{'-':>{column}}" if value is None else f"{value:>{column}.1f}"
+
+    ranked = sorted(labs, key=lambda lab: results["overall"][lab]["rank"])
+    print("Overall ranking")
+    for lab in ranked:
+        stats = results["overall"][lab]
+        print(f"  {stats['rank']}. {lab:<{column}} mean {stats['mean']:>5.1f}   "
+              f"{stats['perfect_controls']}/{stats['total_controls']} at 100   "
+              f"gap {stats['gap_points']:.0f} points   {stats['missing_cells']} missing")
+
+    header("Mean score by level", "", 8)
+    for i, level in enumerate(results["levels"]):
+        print(f"  {'SL' + str(level):<8}" + "".join(cell(results["by_level"][lab][i]) for lab in labs))
+
+    width = max(len(name) for name in results["categories"]) if results["categories"] else 0
+    header("Mean score by category", "", width)
+    for i, name in enumerate(results["categories"]):
+        print(f"  {name:<{width}}" + "".join(cell(results["by_category"][lab][i]) for lab in labs))
+
+    header("Highest SL reached", "", 22)
+    for name, threshold in results["thresholds"].items():
+        label = f"{name} (all >= {threshold})"
+        print(f"  {label:<22}" + "".join(f"{results['overall'][lab]['attainment'][name] or '-':>{column}}" for lab in labs))
+
+    print("\nWeakest subcategory")
+    for lab, weakest in results["weakest_subcategory"].items():
+        area = f"{weakest['category']} / {weakest['subcategory']}" if weakest["subcategory"] else weakest["category"]
+        print(f"  {lab:<{column}} {weakest['mean']:>5.1f}  {area}")
+
+    print("\nGaps at the next level")
+    for lab, gaps in results["next_level_gaps"].items():
+        if gaps is None:
+            print(f"  {lab}: fully reaches every level")
+            continue
+        print(f"  {lab}: SL{gaps['level']}, {gaps['controls_short']} controls below 100")
+        for control in gaps["controls"]:
+            print(f"    {control['score']:>5.1f}  {control['name']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report aggregates over the compliance data: means, SL attainment, gaps and rankings.")
+    parser.add_argument("--input", default=INPUT_FILE, help=f"Compliance data file (default: {INPUT_FILE}).")
+    parser.add_argument("--json", nargs="?", const=ANALYTICS_FILE,
+                        help=f"Also write the results as JSON (default path: {ANALYTICS_FILE}).")
+    parser.add_argument("--quiet", action="store_true", help="Skip the report (with --json).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: The input JSON file '{args.input}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+    compliance_data = load_file(args.input)
+    if args.json:
+        results = write_analytics(compliance_data, args.json)
+        print(f"Analytics written to '{args.json}'.")
+    else:
+        results = analyze(build_matrix(compliance_data))
+    if not args.quiet:
+        print_report(results)
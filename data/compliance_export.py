@@ -0,0 +1,153 @@
+"""
+Compact export of the compliance data for the heatmap.
+data/compliance-data.json stays the source of truth; this writes two derived views of it:
+a small score matrix (levels x controls x labs, plus the names needed to draw the grid) that
+the heatmap bundles for first paint, and one detail shard per level (justifications and
+sources) under public/ that the heatmap fetches the first time a cell in that level opens.
+Shards cite sources by registry ID and carry the entries they cite, each once. The
+aggregates from compliance_analytics.py are written next to the matrix.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+from progress_journal import atomic_write_json
+from source_registry import SOURCES_FILE, SourceRegistry, load_compliance_data
+from validation import ValidationError, validate_compliance_data
+from compliance_analytics import ANALYTICS_FILE, write_analytics
+
+INPUT_FILE = "data/compliance-data.json"
+SCORES_FILE = "data/compliance-scores.json"
+DETAILS_DIR = "public/compliance"
+# URL the Next.js app serves DETAILS_DIR under
+DETAILS_URL = "/compliance"
+# Cell fields that go into the detail shards (the score lives in the matrix; sources become source_ids)
+DETAIL_FIELDS = ["justification", "fetched_at", "model"]
+# Registry fields a shard carries for each source it cites
+SHARD_SOURCE_FIELDS = ["url", "title", "domain"]
+
+
+def find_labs(compliance_data: List[Dict]) -> List[str]:
+    """Labs in the order they first appear in the data."""
+    labs = {}
+    for sl_entry in compliance_data:
+        for category in sl_entry["categories"]:
+            for subcategory in category["subcategories"]:
+                for control in subcategory["controls"]:
+                    labs.update(dict.fromkeys(control["compliance"]))
+    return list(labs)
+
+
+def cell_details(cell: Optional[Dict], registry: SourceRegistry) -> Optional[Dict]:
+    if cell is None:
+        return None
+    details = {field: cell[field] for field in DETAIL_FIELDS if cell.get(field) not in (None, "", [])}
+    if cell.get("sources"):
+        details["source_ids"] = [registry.intern(url, seen=cell.get("fetched_at")) for url in cell["sources"]]
+    return details
+
+
+def content_hash(data) -> str:
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def build_export(compliance_data: List[Dict], registry: SourceRegistry, labs: List[str] = None):
+    """
+    Split the compliance data (sources expanded to URLs) into (scores, shards). Each control
+    in `scores` carries its per-lab scores (None where a lab has no cell) and `detail`, its
+    index in its level's shard; shards map a level to
+    {level, labs, controls: [[details per lab], ...], sources: {id: entry}}.
+    """
+    labs = labs or find_labs(compliance_data)
+    scores = {"labs": labs, "levels": []}
+    shards = {}
+    for sl_entry in compliance_data:
+        level_details = []
+        categories = []
+        for category in sl_entry["categories"]:
+            subcategories = []
+            for subcategory in category["subcategories"]:
+                controls = []
+                for control in subcategory["controls"]:
+                    cells = [control["compliance"].get(lab) for lab in labs]
+                    controls.append({
+                        "name": control["name"],
+                        "scores": [cell.get("score") if cell else None for cell in cells],
+                        "detail": len(level_details)
+                    })
+                    level_details.append([cell_details(cell, registry) for cell in cells])
+                subcategories.append({"name": subcategory["name"], "controls": controls})
+            categories.append({"name": category["name"], "subcategories": subcategories})
+        cited = [source for row in level_details for details in row if details for source in details.get("source_ids", [])]
+        shard = {
+            "level": sl_entry["level"],
+            "labs": labs,
+            "controls": level_details,
+            "sources": {entry["id"]: {field: entry[field] for field in SHARD_SOURCE_FIELDS} for entry in registry.table(cited)}
+        }
+        shards[sl_entry["level"]] = shard
+        scores["levels"].append({
+            "level": sl_entry["level"],
+            "description": sl_entry.get("description", ""),
+            # The content hash in the query string lets browsers cache shards until they change
+            "details": f"{DETAILS_URL}/level-{sl_entry['level']}.json?v={content_hash(shard)}",
+            "categories": categories
+        })
+    return scores, shards
+
+
+def export_compliance(compliance_data: List[Dict], registry: SourceRegistry, scores_file: str = SCORES_FILE,
+                      details_dir: str = DETAILS_DIR, labs: List[str] = None,
+                      analytics_file: str = ANALYTICS_FILE) -> Dict[str, int]:
+    """Write the score matrix, the detail shards and the analytics; returns the size in bytes of each file written."""
+    scores, shards = build_export(compliance_data, registry, labs)
+    os.makedirs(details_dir, exist_ok=True)
+    written = {}
+    for level, shard in shards.items():
+        path = os.path.join(details_dir, f"level-{level}.json")
+        atomic_write_json(shard, path, compact=True)
+        written[path] = os.path.getsize(path)
+    # Shards for levels that no longer exist would otherwise linger
+    current = {f"level-{level}.json" for level in shards}
+    for name in os.listdir(details_dir):
+        if name.startswith("level-") and name.endswith(".json") and name not in current:
+            os.remove(os.path.join(details_dir, name))
+    atomic_write_json(scores, scores_file, compact=True)
+    written[scores_file] = os.path.getsize(scores_file)
+    write_analytics(compliance_data, analytics_file, scores["labs"])
+    written[analytics_file] = os.path.getsize(analytics_file)
+    return written
+
+
+def print_export_summary(written: Dict[str, int]):
+    for path, size in written.items():
+        print(f"  - {path}: {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the compliance data as a compact score matrix plus per-level detail shards.")
+    parser.add_argument("--input", default=INPUT_FILE, help=f"Compliance data file (default: {INPUT_FILE}).")
+    parser.add_argument("--scores", default=SCORES_FILE, help=f"Score matrix output (default: {SCORES_FILE}).")
+    parser.add_argument("--analytics", default=ANALYTICS_FILE, help=f"Analytics output (default: {ANALYTICS_FILE}).")
+    parser.add_argument("--details-dir", default=DETAILS_DIR, help=f"Directory for the detail shards (default: {DETAILS_DIR}).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: The input JSON file '{args.input}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+    registry = SourceRegistry(SOURCES_FILE)
+    compliance_data = load_compliance_data(args.input, registry)
+    try:
+        validate_compliance_data(compliance_data)
+    except ValidationError as e:
+        print(f"Error: '{args.input}' is not valid compliance data: {e}", file=sys.stderr)
+        sys.exit(1)
+    written = export_compliance(compliance_data, registry, args.scores, args.details_dir,
+                                analytics_file=args.analytics)
+    print(f"Exported '{args.input}' ({os.path.getsize(args.input) / 1024:.1f} KB):")
+    print_export_summary(written)
@@ -0,0 +1,307 @@
+"""
+Entity resolution for the stakeholder network.
+Names found by different searches ("Microsoft Azure" / "Azure", "Vantage Data Centers" /
+"Vantage", "Turner Construction" / "Turner Construction Company") are resolved to one node
+ID through a normalized-name index, an alias table and fuzzy matching restricted to blocks
+of entities that share a distinctive name token, so each lookup compares against a handful
+of candidates instead of every entity seen so far. Duplicate edges are merged into one
+weighted link, and free text is scanned for lab mentions with one precompiled matcher.
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Entity kinds; names are only ever matched against entities of the same kind
+ORGANIZATION = "organization"
+PERSON = "person"
+
+# Legal-form words dropped during normalization
+CORPORATE_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "lp", "ltd", "limited", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "ag", "sa", "group", "holdings", "the"
+}
+# Honorifics and post-nominals dropped from person names
+PERSON_TITLES = {"dr", "mr", "mrs", "ms", "prof", "professor", "sir", "phd", "jr", "sr"}
+# Industry words that don't identify an organization on their own: ignored for blocking and
+# fuzzy comparison ("Vantage Data Centers" ~ "Vantage"), but kept in the exact-match key
+GENERIC_TOKENS = {
+    "and", "of", "data", "center", "centers", "centre", "centres", "datacenter", "datacenters",
+    "construction", "constructors", "builders", "contractors", "contracting", "engineering",
+    "technologies", "technology", "tech", "solutions", "systems", "international", "global",
+    "industries", "partners", "services", "platform", "cloud", "infrastructure"
+}
+
+# Alternate name -> canonical name, both in normalized form
+ALIASES = {
+    "aws": "amazon web services",
+    "amazon aws": "amazon web services",
+    "amazon cloud": "amazon web services",
+    "gcp": "google cloud platform",
+    "google cloud": "google cloud platform",
+    "azure": "microsoft azure",
+    "microsoft azure cloud": "microsoft azure",
+    "oci": "oracle cloud infrastructure",
+    "oracle cloud": "oracle cloud infrastructure",
+    "deepmind": "google deepmind",
+    "meta": "meta ai",
+    "facebook": "meta ai",
+    "facebook ai research": "meta ai",
+    "fair": "meta ai",
+    "x ai": "xai",
+    "nvidia corporation": "nvidia",
+    "supermicro": "super micro computer",
+}
+
+# Fuzzy thresholds (SequenceMatcher ratio on the distinctive part of the name)
+ORGANIZATION_SIMILARITY = 0.9
+PERSON_SIMILARITY = 0.95
+# Blocks larger than this come from tokens too common to discriminate and are skipped
+MAX_BLOCK_SIZE = 200
+
+# "Amazon Web Services (AWS)": a parenthetical that looks like an acronym is an alias
+ACRONYM_PATTERN = re.compile(r"\(\s*([A-Z][A-Za-z0-9&.\-]{1,7})\s*\)")
+
+
+def normalize_name(name: str, kind: str = ORGANIZATION) -> str:
+    """Lowercase ASCII, punctuation and parentheticals removed, legal forms / titles dropped."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("&", " and ")
+    text = re.sub(r"\([^)]*\)", " ", text)
+    text = re.sub(r"\b([a-z])\.(?=[a-z]\.)", r"\1", text)  # "m.a." -> "ma."
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    dropped = PERSON_TITLES if kind == PERSON else CORPORATE_SUFFIXES
+    tokens = [token for token in text.split() if token not in dropped]
+    return " ".join(tokens)
+
+
+def slugify(name: str) -> str:
+    """Node ID for a display name, e.g. 'Oracle (self-build)' -> 'oracle-self-build'."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", text.replace("&", " and ")).strip("-") or "entity"
+
+
+def lookup_keys(name: str, kind: str = ORGANIZATION) -> List[str]:
+    """
+    Normalized keys a name may be indexed under: the full name, its alias-table canonical form,
+    acronym parentheticals ("(AWS)") and, for "AWS/Amazon" style names, each part.
+    """
+    candidates = [normalize_name(name, kind)]
+    if kind == ORGANIZATION:
+        candidates += [normalize_name(acronym) for acronym in ACRONYM_PATTERN.findall(name)]
+        if "/" in name:
+            candidates += [normalize_name(part) for part in name.split("/")]
+    keys = []
+    for key in candidates:
+        for variant in (ALIASES.get(key), key):
+            if variant and variant not in keys:
+                keys.append(variant)
+    return keys
+
+
+def distinctive_tokens(key: str, kind: str) -> frozenset:
+    tokens = key.split()
+    if kind == ORGANIZATION:
+        tokens = [token for token in tokens if token not in GENERIC_TOKENS]
+    return frozenset(tokens)
+
+
+class Entity:
+    __slots__ = ("entity_id", "kind", "key", "tokens", "pinned")
+
+    def __init__(self, entity_id: str, kind: str, key: str, pinned: bool):
+        self.entity_id = entity_id
+        self.kind = kind
+        self.key = key
+        self.tokens = distinctive_tokens(key, kind)
+        self.pinned = pinned
+
+
+class EntityResolver:
+    """
+    Online resolver: resolve(name, kind) returns the node ID for a name, creating a new
+    entity when nothing matches. Lookups go exact key -> alias -> fuzzy within blocks.
+    Entities registered with pinned=True (the AI labs) are reachable by exact name or alias
+    only, so an unrelated "Google Cloud Platform" is never fuzzily folded into a lab.
+    """
+
+    def __init__(self):
+        self.exact = {}   # (kind, normalized key) -> Entity
+        self.blocks = {}  # (kind, distinctive token) -> [Entity]
+        self.ids = set()
+
+    def register(self, entity_id: str, name: str, kind: str = ORGANIZATION, pinned: bool = False) -> str:
+        """Add an entity with a fixed ID (e.g. an AI lab) so later mentions resolve to it."""
+        keys = lookup_keys(name, kind)
+        entity = Entity(entity_id, kind, keys[0], pinned)
+        self.ids.add(entity_id)
+        self.index(entity, keys)
+        return entity_id
+
+    def resolve(self, name: str, kind: str = ORGANIZATION) -> Tuple[str, bool]:
+        """Return (node ID, True if this is a new entity) for a mention of `name`."""
+        entity_id = self.match(name, kind)
+        if entity_id is not None:
+            return entity_id, False
+        return self.register(self.unique_id(slugify(name)), name, kind), True
+
+    def match(self, name: str, kind: str = ORGANIZATION) -> Optional[str]:
+        """ID of the known entity `name` refers to (which from then on also answers to `name`), or None."""
+        keys = lookup_keys(name, kind)
+        entity = self.find_exact(keys, kind) or self.find_fuzzy(keys[0], kind)
+        if entity is None:
+            return None
+        self.index(entity, keys)
+        return entity.entity_id
+
+    def find_exact(self, keys: List[str], kind: str) -> Optional[Entity]:
+        for key in keys:
+            entity = self.exact.get((kind, key))
+            if entity is not None:
+                return entity
+        return None
+
+    def find_fuzzy(self, key: str, kind: str) -> Optional[Entity]:
+        tokens = distinctive_tokens(key, kind)
+        seen = set()
+        best, best_score = None, 0.0
+        for token in sorted(tokens):
+            block = self.blocks.get((kind, token), [])
+            if len(block) > MAX_BLOCK_SIZE:
+                continue
+            for candidate in block:
+                if candidate.pinned or id(candidate) in seen:
+                    continue
+                seen.add(id(candidate))
+                score = match_score(key, tokens, candidate, kind)
+                if score > best_score:
+                    best, best_score = candidate, score
+        return best
+
+    def index(self, entity: Entity, keys: List[str]):
+        for key in keys:
+            self.exact.setdefault((entity.kind, key), entity)
+        for token in entity.tokens:
+            block = self.blocks.setdefault((entity.kind, token), [])
+            if entity not in block:
+                block.append(entity)
+
+    def unique_id(self, slug: str) -> str:
+        entity_id, suffix = slug, 2
+        while entity_id in self.ids:
+            entity_id = f"{slug}-{suffix}"
+            suffix += 1
+        return entity_id
+
+
+def match_score(key: str, tokens: frozenset, candidate: Entity, kind: str) -> float:
+    """Similarity in (0, 1] if `key` names the same entity as `candidate`, else 0."""
+    if not tokens or not candidate.tokens:
+        return 0.0
+    if kind == PERSON:
+        # Same first and last name ("Jason Clinton" / "Jason R Clinton"), or a near-identical spelling
+        names, other = key.split(), candidate.key.split()
+        if names[0] == other[0] and names[-1] == other[-1]:
+            return 1.0
+        ratio = SequenceMatcher(None, key, candidate.key).ratio()
+        return ratio if ratio >= PERSON_SIMILARITY else 0.0
+    if tokens == candidate.tokens:
+        return 1.0
+    smaller, larger = sorted((tokens, candidate.tokens), key=len)
+    if smaller < larger and len(larger - smaller) == 1:
+        # "Vantage" / "Vantage Data Centers" already match above; this is "Azure" / "Microsoft Azure"
+        return 0.95
+    ratio = SequenceMatcher(None, " ".join(sorted(tokens)), " ".join(sorted(candidate.tokens))).ratio()
+    return ratio if ratio >= ORGANIZATION_SIMILARITY else 0.0
+
+
+def merge_node(existing: Dict, node: Dict):
+    """Fold a duplicate mention into the node already emitted for the same entity."""
+    for field in ("description", "url"):
+        if not existing.get(field) and node.get(field):
+            existing[field] = node[field]
+    existing["size"] = max(existing.get("size", 0), node.get("size", 0))
+    existing["research"] = list(dict.fromkeys(existing.get("research", []) + node.get("research", [])))
+    urls = {source.get("url") for source in existing.get("sources", [])}
+    for source in node.get("sources", []):
+        if source.get("url") not in urls:
+            urls.add(source.get("url"))
+            existing["sources"].append(dict(source, text=f"Source {len(existing['sources']) + 1}"))
+
+
+class LinkSet:
+    """Undirected link accumulator: repeated (source, target) pairs become one weighted edge."""
+
+    def __init__(self):
+        self.links = {}
+
+    def add(self, source: str, target: str, strength: int = 3):
+        if source == target:
+            return
+        key = (source, target) if (target, source) not in self.links else (target, source)
+        link = self.links.get(key)
+        if link is None:
+            self.links[key] = {"source": source, "target": target, "strength": strength, "weight": 1}
+        else:
+            link["strength"] = max(link["strength"], strength)
+            link["weight"] += 1
+
+    def to_list(self) -> List[Dict]:
+        return list(self.links.values())
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation for `words` shaped as a trie ("deep(?:mind)?" rather than
+    "deep|deepmind"), so the engine never tries more than one branch per character and
+    matching stays linear in the text whatever the number of words.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+class AliasMatcher:
+    """
+    Finds every entity mentioned in free text, given {entity name: [aliases]}. All aliases are
+    compiled into one case-insensitive, word-bounded trie regex; all-caps acronyms ("FAIR")
+    only match in capitals so they don't fire on ordinary words ("fair use").
+    """
+
+    def __init__(self, alias_table: Dict[str, List[str]]):
+        self.entities = {}  # lowercased alias -> (entity name, alias as written)
+        for entity, aliases in alias_table.items():
+            for alias in [entity] + list(aliases):
+                self.entities.setdefault(alias.lower(), (entity, alias))
+        # Longest alternatives are preferred by the trie's greedy optional groups
+        self.pattern = re.compile(r"\b(?:" + trie_pattern(self.entities) + r")\b", re.IGNORECASE)
+
+    def find(self, *texts: str) -> List[str]:
+        """Entities mentioned anywhere in `texts`, in order of first mention."""
+        found = []
+        for text in texts:
+            if not text:
+                continue
+            for match in self.pattern.finditer(text):
+                entity, alias = self.entities[match.group(0).lower()]
+                if alias.isalpha() and alias.isupper() and match.group(0) != alias:
+                    continue
+                if entity not in found:
+                    found.append(entity)
+        return found
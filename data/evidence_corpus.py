@@ -0,0 +1,250 @@
+"""
+Local evidence corpus of web search results, shared by both scrapers.
+Every answer that ran web searches leaves its results here: one document per URL (title,
+domain, page age, the labs whose queries surfaced it) plus the passages Claude cited from
+it. Search results come back with their page content encrypted, so the cited passages are
+the page text the corpus can keep. A BM25 inverted index over the passages lets the
+compliance scraper's --rescore mode assess a control x lab from passages already on disk
+instead of paying for new web searches.
+
+    python data/evidence_corpus.py
+    python data/evidence_corpus.py --query "weight encryption" --lab OpenAI
+    python data/evidence_corpus.py --seed-from-cache
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+EVIDENCE_FILE = "data/.evidence/corpus.jsonl"
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it", "its", "of",
+             "on", "or", "that", "the", "their", "this", "to", "was", "were", "with"}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def evidence_from_content(content_blocks) -> Dict[str, Dict]:
+    """
+    URL -> {"title", "page_age", "passages"} for the web search results and the cited
+    passages (web_search_result_location citations) in a response's content blocks.
+    """
+    documents = {}
+
+    def document(url: str, title: Optional[str]) -> Dict:
+        entry = documents.setdefault(url.strip(), {"title": None, "page_age": None, "passages": []})
+        if title and not entry["title"]:
+            entry["title"] = title.strip()
+        return entry
+
+    for block in content_blocks or []:
+        block_type = getattr(block, "type", None)
+        if block_type == "web_search_tool_result" and isinstance(getattr(block, "content", None), list):
+            for result in block.content:
+                url = getattr(result, "url", None)
+                if url:
+                    document(url, getattr(result, "title", None))["page_age"] = getattr(result, "page_age", None)
+        elif block_type == "text":
+            for citation in getattr(block, "citations", None) or []:
+                url, cited_text = getattr(citation, "url", None), getattr(citation, "cited_text", None)
+                if getattr(citation, "type", None) != "web_search_result_location" or not url:
+                    continue
+                passages = document(url, getattr(citation, "title", None))["passages"]
+                if cited_text and cited_text.strip() not in passages:
+                    passages.append(cited_text.strip())
+    return documents
+
+
+class EvidenceCorpus:
+    """
+    Latest document per URL, in an append-only JSONL file: a document is rewritten as a new
+    line whenever a search adds passages, labs or a title to it, and compact() drops the
+    superseded lines. The BM25 index is built on the first search after a change.
+    """
+
+    def __init__(self, path: str = EVIDENCE_FILE, load: bool = True):
+        self.path = path
+        self.lock = threading.Lock()
+        self.documents = {}
+        self.superseded = 0
+        self.added_passages = 0
+        self.index = None
+        if load:
+            self.load()
+
+    def load(self):
+        """Read the corpus; a torn final line (from a crash mid-append) is ignored."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Ignoring unreadable evidence line {line_number} in '{self.path}'.", file=sys.stderr)
+                    continue
+                if entry["url"] in self.documents:
+                    self.superseded += 1
+                self.documents[entry["url"]] = entry
+
+    def add(self, content_blocks, labs: Iterable[str] = ()) -> int:
+        """Store the search results and cited passages of one response; returns the number of new passages."""
+        found = evidence_from_content(content_blocks)
+        if not found:
+            return 0
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        labs = [lab for lab in labs if lab]
+        new_passages = 0
+        with self.lock:
+            changed = []
+            for url, evidence in found.items():
+                entry = self.documents.get(url)
+                if entry is None:
+                    entry = {"url": url, "title": None, "domain": urlparse(url).netloc.lower(), "page_age": None,
+                             "labs": [], "passages": [], "first_seen": now}
+                    before = None
+                else:
+                    before = json.dumps(entry, sort_keys=True)
+                    entry = dict(entry, labs=list(entry["labs"]), passages=list(entry["passages"]))
+                entry["title"] = entry["title"] or evidence["title"]
+                entry["page_age"] = evidence["page_age"] or entry["page_age"]
+                entry["labs"].extend(lab for lab in labs if lab not in entry["labs"])
+                passages = [passage for passage in evidence["passages"] if passage not in entry["passages"]]
+                entry["passages"].extend(passages)
+                if json.dumps(entry, sort_keys=True) != before:
+                    if before is not None:
+                        self.superseded += 1
+                    self.documents[url] = entry
+                    changed.append(entry)
+                    new_passages += len(passages)
+            if changed:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in changed))
+                self.added_passages += new_passages
+                self.index = None
+        return new_passages
+
+    def compact(self):
+        """Rewrite the corpus with only the latest line per URL, if anything was superseded."""
+        with self.lock:
+            if not self.superseded:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self.documents.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.superseded = 0
+
+    def build_index(self) -> Dict:
+        """
+        Inverted index over the cited passages (each indexed with its page title): term ->
+        (passage ids, term frequencies) as compact arrays, plus passage lengths for BM25.
+        """
+        passages, lengths, postings = [], array("I"), {}
+        for entry in self.documents.values():
+            for text in entry["passages"]:
+                passage_id = len(passages)
+                passages.append((entry, text))
+                tokens = tokenize(f"{entry['title'] or ''} {text}")
+                lengths.append(len(tokens))
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, count in counts.items():
+                    ids, frequencies = postings.setdefault(token, (array("I"), array("H")))
+                    ids.append(passage_id)
+                    frequencies.append(min(count, 65535))
+        average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        return {"passages": passages, "lengths": lengths, "postings": postings, "average_length": average_length}
+
+    def search(self, query: str, k: int = 8, lab: Optional[str] = None) -> List[Dict]:
+        """
+        Top `k` passages for `query` by BM25 as {"score", "url", "title", "text"}. With `lab`,
+        only passages from pages surfaced by that lab's searches or that mention it count.
+        """
+        with self.lock:
+            if self.index is None:
+                self.index = self.build_index()
+            index = self.index
+        passages, lengths, average_length = index["passages"], index["lengths"], index["average_length"]
+        mentions = re.compile(rf"\b{re.escape(lab)}\b", re.IGNORECASE) if lab else None
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = index["postings"].get(term)
+            if posting is None:
+                continue
+            ids, frequencies = posting
+            idf = math.log(1 + (len(passages) - len(ids) + 0.5) / (len(ids) + 0.5))
+            for passage_id, frequency in zip(ids, frequencies):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[passage_id] / average_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        results = []
+        for passage_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            entry, text = passages[passage_id]
+            if mentions and lab not in entry["labs"] and not mentions.search(f"{entry['title'] or ''} {text}"):
+                continue
+            results.append({"score": round(score, 3), "url": entry["url"], "title": entry["title"], "text": text})
+            if len(results) >= k:
+                break
+        return results
+
+    def summary(self) -> str:
+        passages = sum(len(entry["passages"]) for entry in self.documents.values())
+        return (f"Evidence corpus: {len(self.documents)} pages, {passages} cited passages "
+                f"({self.added_passages} new this run) in '{self.path}'")
+
+
+def add_evidence_arguments(parser):
+    """Register the evidence corpus switches shared by both scrapers."""
+    parser.add_argument("--evidence", default=EVIDENCE_FILE, help=f"Evidence corpus file (default: {EVIDENCE_FILE}).")
+    parser.add_argument("--no-evidence", action="store_true", help="Don't store web search results in the evidence corpus.")
+
+
+def evidence_from_args(args) -> Optional[EvidenceCorpus]:
+    return None if args.no_evidence else EvidenceCorpus(args.evidence)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or seed the local evidence corpus.")
+    parser.add_argument("--corpus", default=EVIDENCE_FILE, help=f"Corpus file (default: {EVIDENCE_FILE}).")
+    parser.add_argument("--query", help="Print the best-matching passages for this query.")
+    parser.add_argument("--lab", help="With --query, only passages about this lab.")
+    parser.add_argument("-k", type=int, default=8, help="Passages to print with --query (default: 8).")
+    parser.add_argument("--seed-from-cache", nargs="?", const="data/.cache/responses", metavar="DIR",
+                        help="Import the search results of every cached response (default: data/.cache/responses).")
+    args = parser.parse_args()
+
+    corpus = EvidenceCorpus(args.corpus)
+    if args.seed_from_cache:
+        from response_cache import ResponseCache
+        cache = ResponseCache(args.seed_from_cache, ttl_seconds=0)
+        for key in list(cache.entries):
+            corpus.add(cache.read(key) or [])
+        corpus.compact()
+    print(corpus.summary())
+    if args.query:
+        for rank, passage in enumerate(corpus.search(args.query, args.k, args.lab), 1):
+            print(f"{rank:>2}. {passage['score']:>6.2f}  {passage['title'] or passage['url']}\n"
+                  f"    {passage['url']}\n    {passage['text']}")
@@ -0,0 +1,56 @@
+"""
+Fetch timestamps and --max-age, shared by both scrapers: compliance cells and stored
+stakeholder search results are stamped with when they were fetched (ISO 8601, UTC), and
+anything fetched longer ago than --max-age is fetched again.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# What missing or unreadable stamps count as: older than any cutoff
+NEVER = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def parse_max_age(value: str) -> timedelta:
+    """argparse type for --max-age: a number with an optional unit, e.g. 30d, 12h, 2w (default unit: days)."""
+    units = {"h": "hours", "d": "days", "w": "weeks"}
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([hdw]?)", value.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid age '{value}', expected e.g. 30d, 12h or 2w")
+    return timedelta(**{units[match.group(2) or "d"]: float(match.group(1))})
+
+
+def parse_timestamp(value: str) -> datetime:
+    """argparse type for an ISO 8601 date or time, e.g. 2025-06-01 or 2025-06-01T09:00:00+00:00 (default zone: UTC)."""
+    stamp = parse_fetched_at(value.strip())
+    if stamp == NEVER:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}', expected an ISO date or time such as 2025-06-01")
+    return stamp
+
+
+def parse_fetched_at(value: Optional[str]) -> datetime:
+    """A fetched_at stamp as an aware datetime; missing or unreadable stamps count as infinitely old."""
+    try:
+        stamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return NEVER
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+
+def cutoff_for(max_age: Optional[timedelta]) -> Optional[datetime]:
+    """Oldest fetch time still fresh under `max_age`, or None when nothing expires."""
+    return datetime.now(timezone.utc) - max_age if max_age else None
+
+
+def last_commit_time(path: str) -> Optional[datetime]:
+    """When `path` was last committed to git (UTC), or None when it is untracked or git is unavailable."""
+    try:
+        output = subprocess.run(["git", "log", "-1", "--format=%cI", "--", os.path.basename(path)],
+                                cwd=os.path.dirname(os.path.abspath(path)), capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return parse_fetched_at(output.strip()).astimezone(timezone.utc) if output.strip() else None
@@ -0,0 +1,259 @@
+"""
+Graph analytics for the stakeholder network, precomputed into the network JSON.
+Builds an undirected CSR adjacency (indptr/indices/weights arrays) from the nodes and links
+and computes, per node, degree, weighted degree, betweenness centrality and a community, and
+for the whole graph the communities and which vendors serve more than one lab. Everything is
+near-linear in the size of the graph: betweenness is exact (Brandes, O(n*m)) up to
+EXACT_BETWEENNESS_LIMIT nodes and estimated from BETWEENNESS_SAMPLES source nodes above it,
+each a level-synchronous BFS vectorized over the CSR arrays; communities come from Louvain
+modularity optimisation, whose passes are linear in the number of links.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Node categories that count as vendors when computing lab overlap
+VENDOR_CATEGORIES = ["contractors", "security_contractors", "cloud_infrastructure", "power_infrastructure"]
+LAB_CATEGORY = "ai_labs"
+# Above this many nodes, betweenness is estimated from a sample of source nodes
+EXACT_BETWEENNESS_LIMIT = 1000
+BETWEENNESS_SAMPLES = 256
+# Louvain stops a local-moving phase after this many passes even if nodes still move
+MAX_LOUVAIN_PASSES = 20
+# Nodes listed in metadata by betweenness
+TOP_NODES = 10
+
+
+def build_csr(nodes: List[Dict], links: List[Dict]) -> Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Undirected adjacency in CSR form: the neighbours of node i are indices[indptr[i]:indptr[i+1]]
+    with the link strengths in the same slice of weights. Links to unknown nodes and self-links
+    are dropped; repeated links between the same pair are summed.
+    """
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    pairs = [(index[link["source"]], index[link["target"]], float(link.get("strength", 1) or 1)) for link in links
+             if link["source"] in index and link["target"] in index and link["source"] != link["target"]]
+    if not pairs:
+        return index, np.zeros(n + 1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    sources, targets, strengths = (np.array(column) for column in zip(*pairs))
+    rows = np.concatenate([sources, targets]).astype(np.int64)
+    columns = np.concatenate([targets, sources]).astype(np.int64)
+    weights = np.concatenate([strengths, strengths])
+    # Sort by (row, column) and sum duplicates
+    keys = rows * n + columns
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse, weights=weights)
+    rows, columns = unique_keys // n, unique_keys % n
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64)
+    return index, indptr, columns, weights
+
+
+def expand_frontier(indptr: np.ndarray, indices: np.ndarray, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Every (node, neighbour) edge out of `frontier`, as two aligned arrays."""
+    starts, ends = indptr[frontier], indptr[frontier + 1]
+    counts = ends - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(frontier, counts), indices[np.repeat(starts, counts) + offsets]
+
+
+def single_source_dependencies(indptr: np.ndarray, indices: np.ndarray, source: int) -> np.ndarray:
+    """
+    Brandes' dependency of `source` on every node: a BFS that counts shortest paths level by
+    level, then accumulates dependencies back from the deepest level, each level one batch of
+    array operations over its edges.
+    """
+    n = len(indptr) - 1
+    distance = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    distance[source], sigma[source] = 0, 1.0
+    levels = []  # (parents, children) edges from each level to the next
+    frontier = np.array([source], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        parents, children = expand_frontier(indptr, indices, frontier)
+        unseen = distance[children] < 0
+        distance[np.unique(children[unseen])] = depth + 1
+        onward = distance[children] == depth + 1
+        parents, children = parents[onward], children[onward]
+        sigma += np.bincount(children, weights=sigma[parents], minlength=n)
+        levels.append((parents, children))
+        frontier = np.unique(children)
+        depth += 1
+    delta = np.zeros(n)
+    for parents, children in reversed(levels):
+        delta += np.bincount(parents, weights=sigma[parents] / sigma[children] * (1 + delta[children]), minlength=n)
+    delta[source] = 0.0
+    return delta
+
+
+def betweenness_centrality(indptr: np.ndarray, indices: np.ndarray, samples: int = BETWEENNESS_SAMPLES,
+                           exact_limit: int = EXACT_BETWEENNESS_LIMIT) -> Tuple[np.ndarray, bool]:
+    """
+    Normalised betweenness (the share of shortest paths between other pairs through a node,
+    0..1), unweighted since link strength is not a distance. Returns (values, exact).
+    """
+    n = len(indptr) - 1
+    if n < 3:
+        return np.zeros(n), True
+    exact = n <= exact_limit
+    if exact:
+        sources = np.arange(n)
+    else:
+        # A fixed seed keeps the estimate, and so the file, stable between runs
+        sources = np.random.default_rng(0).choice(n, size=min(samples, n), replace=False)
+    total = np.zeros(n)
+    for source in sources:
+        total += single_source_dependencies(indptr, indices, int(source))
+    total *= n / len(sources)
+    # Each pair was counted from both ends
+    return total / ((n - 1) * (n - 2)), exact
+
+
+def louvain_level(indptr, indices, weights, node_weight, total_weight) -> np.ndarray:
+    """
+    One local-moving phase of Louvain: move each node to the neighbouring community with the
+    largest modularity gain until a pass moves nothing. Returns the community of each node.
+    """
+    n = len(indptr) - 1
+    community = list(range(n))
+    community_weight = list(node_weight)
+    indptr, indices, weights = indptr.tolist(), indices.tolist(), weights.tolist()
+    for _ in range(MAX_LOUVAIN_PASSES):
+        moved = 0
+        for i in range(n):
+            current = community[i]
+            links_to = {}
+            for position in range(indptr[i], indptr[i + 1]):
+                j = indices[position]
+                if j != i:
+                    links_to[community[j]] = links_to.get(community[j], 0.0) + weights[position]
+            k_i = node_weight[i]
+            community_weight[current] -= k_i
+            best, best_gain = current, links_to.get(current, 0.0) - community_weight[current] * k_i / total_weight
+            for candidate, weight in links_to.items():
+                gain = weight - community_weight[candidate] * k_i / total_weight
+                if gain > best_gain + 1e-12:
+                    best, best_gain = candidate, gain
+            community_weight[best] += k_i
+            if best != current:
+                community[i] = best
+                moved += 1
+        if not moved:
+            break
+    # Renumber 0..k-1
+    _, labels = np.unique(np.asarray(community), return_inverse=True)
+    return labels
+
+
+def aggregate(indptr, indices, weights, labels, groups: int):
+    """Collapse each community to one node; links inside a community become a self-loop."""
+    rows = labels[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))]
+    columns = labels[indices]
+    keys, inverse = np.unique(rows * groups + columns, return_inverse=True)
+    merged = np.bincount(inverse, weights=weights)
+    new_rows = keys // groups
+    new_indptr = np.concatenate([[0], np.cumsum(np.bincount(new_rows, minlength=groups))]).astype(np.int64)
+    return new_indptr, keys % groups, merged
+
+
+def modularity(indptr, indices, weights, labels) -> float:
+    total_weight = weights.sum()
+    if not total_weight:
+        return 0.0
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    inside = weights[labels[rows] == labels[indices]].sum()
+    degree_by_community = np.bincount(labels, weights=np.bincount(rows, weights=weights, minlength=len(labels)))
+    return float(inside / total_weight - ((degree_by_community / total_weight) ** 2).sum())
+
+
+def louvain_communities(indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Community of each node, numbered by decreasing size (ties by first node)."""
+    n = len(indptr) - 1
+    labels = np.arange(n)
+    total_weight = float(weights.sum())
+    if not total_weight:
+        return labels
+    level_indptr, level_indices, level_weights = indptr, indices, weights
+    while True:
+        rows = np.repeat(np.arange(len(level_indptr) - 1), np.diff(level_indptr))
+        # An aggregated node's self-loop already holds both directions of its internal links
+        node_weight = np.bincount(rows, weights=level_weights, minlength=len(level_indptr) - 1)
+        level_labels = louvain_level(level_indptr, level_indices, level_weights, node_weight.tolist(), total_weight)
+        groups = int(level_labels.max()) + 1
+        if groups == len(level_indptr) - 1:
+            break
+        labels = level_labels[labels]
+        level_indptr, level_indices, level_weights = aggregate(level_indptr, level_indices, level_weights,
+                                                               level_labels, groups)
+    sizes = np.bincount(labels)
+    first_member = np.full(len(sizes), n)
+    np.minimum.at(first_member, labels, np.arange(n))
+    order = np.lexsort((first_member, -sizes))
+    renumber = np.empty_like(order)
+    renumber[order] = np.arange(len(order))
+    return renumber[labels]
+
+
+def lab_overlap(nodes: List[Dict], indptr: np.ndarray, indices: np.ndarray) -> Dict:
+    """Shared-vendor counts between every pair of labs, and the vendors linked to two or more labs."""
+    labs = [i for i, node in enumerate(nodes) if node.get("category") == LAB_CATEGORY]
+    is_vendor = np.array([node.get("category") in VENDOR_CATEGORIES for node in nodes], dtype=bool)
+    serves = np.zeros((len(labs), len(nodes)), dtype=np.int64)  # lab x node incidence
+    for row, lab in enumerate(labs):
+        neighbours = indices[indptr[lab]:indptr[lab + 1]]
+        serves[row, neighbours[is_vendor[neighbours]]] = 1
+    lab_counts = serves.sum(axis=0)
+    shared = np.flatnonzero(lab_counts >= 2)
+    shared = shared[np.argsort(-lab_counts[shared], kind="stable")]
+    return {
+        "labs": [nodes[lab]["id"] for lab in labs],
+        # matrix[a][b]: vendors serving both lab a and lab b (the diagonal is each lab's own vendor count)
+        "matrix": (serves @ serves.T).tolist(),
+        "shared_vendors": [
+            {"id": nodes[vendor]["id"], "labs": [nodes[labs[row]]["id"] for row in np.flatnonzero(serves[:, vendor])]}
+            for vendor in shared
+        ]
+    }
+
+
+def apply_analytics(nodes: List[Dict], links: List[Dict]) -> Dict:
+    """
+    Write degree, weighted_degree, betweenness and community onto every node in place and
+    return the graph-level results for the network metadata.
+    """
+    index, indptr, indices, weights = build_csr(nodes, links)
+    degree = np.diff(indptr)
+    weighted_degree = np.bincount(np.repeat(np.arange(len(nodes)), degree), weights=weights, minlength=len(nodes))
+    betweenness, exact = betweenness_centrality(indptr, indices)
+    communities = louvain_communities(indptr, indices, weights)
+    for i, node in enumerate(nodes):
+        node["degree"] = int(degree[i])
+        node["weighted_degree"] = round(float(weighted_degree[i]), 1)
+        node["betweenness"] = round(float(betweenness[i]), 4)
+        node["community"] = int(communities[i])
+
+    community_list = []
+    for community in range(int(communities.max()) + 1 if len(nodes) else 0):
+        members = np.flatnonzero(communities == community)
+        hub = members[np.argmax(weighted_degree[members])]
+        community_list.append({
+            "id": community,
+            "size": int(members.size),
+            "hub": nodes[hub]["id"],
+            "labs": [nodes[i]["id"] for i in members if nodes[i].get("category") == LAB_CATEGORY]
+        })
+    top = np.argsort(-betweenness, kind="stable")[:TOP_NODES]
+    return {
+        "betweenness": "exact (Brandes)" if exact else f"estimated from {BETWEENNESS_SAMPLES} sampled sources",
+        "communities_algorithm": "louvain",
+        "modularity": round(modularity(indptr, indices, weights, communities), 4),
+        "communities": community_list,
+        "top_betweenness": [nodes[i]["id"] for i in top if betweenness[i] > 0],
+        "lab_overlap": lab_overlap(nodes, indptr, indices)
+    }
+
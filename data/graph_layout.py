@@ -0,0 +1,243 @@
+"""
+Offline force-directed layout for the stakeholder network.
+Runs the same forces as the d3 simulation in public/stakeholder-map (link springs, many-body
+repulsion, centering and collision, with d3's defaults) vectorized in NumPy, so the map can
+start from a settled layout instead of simulating in the browser. Repulsion is exact for small
+graphs and uses a particle-mesh grid approximation (density deposited on a grid and convolved
+with the force kernel by FFT) above EXACT_REPULSION_LIMIT nodes, so one iteration costs
+O(n + G^2 log G) instead of O(n^2).
+"""
+
+import functools
+import hashlib
+import math
+from typing import Dict, List
+
+import numpy as np
+
+# Force parameters, matching initializeGraph() in public/stakeholder-map/index.html
+LINK_DISTANCE = 100.0
+CHARGE_STRENGTH = -300.0
+COLLIDE_PADDING = 10.0
+DEFAULT_NODE_SIZE = 20.0
+# d3 simulation schedule
+ITERATIONS = 300
+ALPHA_MIN = 0.001
+# Starting alpha when most nodes already have positions (a merge into an existing map), so
+# new nodes settle in without reshuffling the rest
+WARM_START_ALPHA = 0.1
+VELOCITY_DECAY = 0.4
+# Above this many nodes, repulsion switches from exact pairs to the particle-mesh grid
+EXACT_REPULSION_LIMIT = 1500
+GRID_SIZE = 256
+
+
+def initial_positions(nodes: List[Dict], index: Dict[str, int], links: List[Dict]) -> np.ndarray:
+    """
+    Start from the x/y a node already has (so incremental updates keep the map stable). New
+    nodes start next to an already placed neighbour, or on d3's phyllotaxis spiral, with a
+    small jitter derived from the node ID so repeated runs give the same layout.
+    """
+    positions = np.full((len(nodes), 2), np.nan)
+    for i, node in enumerate(nodes):
+        if isinstance(node.get("x"), (int, float)) and isinstance(node.get("y"), (int, float)):
+            positions[i] = (node["x"], node["y"])
+    placed_any = not np.isnan(positions[:, 0]).all()
+    neighbours = {}
+    for link in links:
+        source, target = index[link["source"]], index[link["target"]]
+        neighbours.setdefault(source, []).append(target)
+        neighbours.setdefault(target, []).append(source)
+    for i, node in enumerate(nodes):
+        if not np.isnan(positions[i, 0]):
+            continue
+        digest = hashlib.sha1(node["id"].encode("utf-8")).digest()
+        jitter = np.frombuffer(digest[:8], dtype=np.uint32) / 2**32 - 0.5
+        anchor = next((j for j in neighbours.get(i, []) if not np.isnan(positions[j, 0])), None)
+        if placed_any and anchor is not None:
+            positions[i] = positions[anchor] + jitter * LINK_DISTANCE
+        else:
+            radius = 10 * math.sqrt(0.5 + i)
+            angle = i * math.pi * (3 - math.sqrt(5))
+            positions[i] = (radius * math.cos(angle), radius * math.sin(angle)) + jitter
+    return positions
+
+
+def link_forces(positions, velocities, sources, targets, strengths, biases, alpha):
+    """d3.forceLink: springs towards LINK_DISTANCE, weaker for high-degree endpoints."""
+    delta = positions[targets] + velocities[targets] - positions[sources] - velocities[sources]
+    length = np.sqrt((delta ** 2).sum(axis=1))
+    length[length == 0] = 1e-6
+    scale = (length - LINK_DISTANCE) / length * alpha * strengths
+    delta *= scale[:, None]
+    n = len(positions)
+    change = np.zeros_like(positions)
+    for axis in range(2):
+        change[:, axis] -= np.bincount(targets, weights=delta[:, axis] * biases, minlength=n)
+        change[:, axis] += np.bincount(sources, weights=delta[:, axis] * (1 - biases), minlength=n)
+    return change
+
+
+def exact_repulsion(positions, alpha):
+    """d3.forceManyBody without the Barnes-Hut approximation: every pair, O(n^2) memory."""
+    delta = positions[None, :, :] - positions[:, None, :]
+    distance2 = (delta ** 2).sum(axis=2)
+    np.maximum(distance2, 1.0, out=distance2)  # d3's distanceMin
+    np.fill_diagonal(distance2, np.inf)
+    return (delta * (CHARGE_STRENGTH * alpha / distance2)[:, :, None]).sum(axis=1)
+
+
+def grid_repulsion(positions, alpha, grid_size: int = GRID_SIZE):
+    """
+    Particle-mesh approximation of d3.forceManyBody. Nodes are deposited on a grid_size^2
+    grid with cloud-in-cell weights, the grid is convolved with the pairwise force kernel by
+    zero-padded FFT, and forces are interpolated back to the nodes. Structure below one grid
+    cell is smoothed out; the collision force keeps nearby nodes apart.
+    """
+    low = positions.min(axis=0)
+    extent = max(float((positions.max(axis=0) - low).max()), 1.0)
+    cell = extent / (grid_size - 2)
+    grid = (positions - low) / cell + 0.5
+    base = np.floor(grid).astype(np.int64)
+    frac = grid - base
+
+    # Cloud-in-cell deposit onto a (2G)^2 zero-padded grid so the FFT convolution is linear, not circular
+    size = 2 * grid_size
+    density = np.zeros(size * size)
+    corners = [(0, 0), (1, 0), (0, 1), (1, 1)]
+    weights = []
+    for dx, dy in corners:
+        weight = (frac[:, 0] if dx else 1 - frac[:, 0]) * (frac[:, 1] if dy else 1 - frac[:, 1])
+        weights.append(weight)
+        density += np.bincount((base[:, 0] + dx) * size + base[:, 1] + dy, weights=weight, minlength=size * size)
+    density = density.reshape(size, size)
+
+    # The kernel scales as 1/cell, so its transform is computed once per grid size
+    density_hat = np.fft.rfft2(density)
+    field = [np.fft.irfft2(density_hat * kernel_hat, s=(size, size)) / cell for kernel_hat in unit_kernel_hat(size)]
+
+    # Interpolate the field back to the nodes with the same weights
+    force = np.zeros_like(positions)
+    for (dx, dy), weight in zip(corners, weights):
+        cells = (base[:, 0] + dx, base[:, 1] + dy)
+        force[:, 0] += weight * field[0][cells]
+        force[:, 1] += weight * field[1][cells]
+    return force * alpha
+
+
+@functools.lru_cache(maxsize=4)
+def unit_kernel_hat(size: int):
+    """
+    FFTs of the x/y force kernel on a grid with unit cells: the force on a node at offset d
+    from a unit mass, -CHARGE_STRENGTH * d / |d|^2 (repulsive, as d3 with a negative strength).
+    """
+    offsets = np.fft.fftfreq(size, 1.0 / size)
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    distance2 = dx ** 2 + dy ** 2
+    distance2[0, 0] = np.inf
+    return tuple(np.fft.rfft2(-CHARGE_STRENGTH * component / distance2) for component in (dx, dy))
+
+
+def neighbour_pairs(positions, cell_size: float):
+    """All pairs (i, j), i < j, in the same or adjacent grid cells, via a sorted spatial hash."""
+    cells = np.floor((positions - positions.min(axis=0)) / cell_size).astype(np.int64)
+    stride = int(cells[:, 1].max()) + 3
+    keys = (cells[:, 0] + 1) * stride + cells[:, 1] + 1
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    pair_i, pair_j = [], []
+    # Half of the 3x3 neighbourhood, so each pair of cells is visited once. Queries are made
+    # in key order (sorted_keys + offset stays sorted), which keeps searchsorted cache-friendly.
+    for ox, oy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        wanted = sorted_keys + ox * stride + oy
+        start = np.searchsorted(sorted_keys, wanted, side="left")
+        counts = np.searchsorted(sorted_keys, wanted, side="right") - start
+        total = int(counts.sum())
+        if not total:
+            continue
+        i = np.repeat(order, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = order[np.repeat(start, counts) + offsets]
+        keep = i < j if (ox, oy) == (0, 0) else i != j
+        pair_i.append(i[keep])
+        pair_j.append(j[keep])
+    if not pair_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+
+def collision_forces(positions, velocities, radii):
+    """d3.forceCollide (strength 1): push overlapping circles apart, smaller nodes moving more."""
+    predicted = positions + velocities
+    i, j = neighbour_pairs(predicted, 2 * float(radii.max()))
+    delta = predicted[i] - predicted[j]
+    distance = np.sqrt((delta ** 2).sum(axis=1))
+    reach = radii[i] + radii[j]
+    overlapping = distance < reach
+    i, j, delta, distance, reach = i[overlapping], j[overlapping], delta[overlapping], distance[overlapping], reach[overlapping]
+    distance[distance == 0] = 1e-6
+    push = delta * ((reach - distance) / distance)[:, None]
+    ri2, rj2 = radii[i] ** 2, radii[j] ** 2
+    share_i = (rj2 / (ri2 + rj2))[:, None]
+    change = np.zeros_like(positions)
+    for axis in range(2):
+        change[:, axis] += np.bincount(i, weights=push[:, axis] * share_i[:, 0], minlength=len(positions))
+        change[:, axis] -= np.bincount(j, weights=push[:, axis] * (1 - share_i[:, 0]), minlength=len(positions))
+    return change
+
+
+def compute_layout(nodes: List[Dict], links: List[Dict], iterations: int = ITERATIONS) -> np.ndarray:
+    """Run the simulation and return an (n, 2) array of positions centred on the origin."""
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    links = [link for link in links if link["source"] in index and link["target"] in index]
+    positions = initial_positions(nodes, index, links)
+    if not nodes:
+        return positions
+    placed = sum(isinstance(node.get("x"), (int, float)) for node in nodes)
+    velocities = np.zeros_like(positions)
+    radii = np.array([float(node.get("size") or DEFAULT_NODE_SIZE) + COLLIDE_PADDING for node in nodes])
+
+    sources = np.array([index[link["source"]] for link in links], dtype=np.int64)
+    targets = np.array([index[link["target"]] for link in links], dtype=np.int64)
+    degree = np.bincount(np.concatenate([sources, targets]), minlength=len(nodes)).astype(float)
+    strengths = 1.0 / np.maximum(np.minimum(degree[sources], degree[targets]), 1.0)
+    biases = degree[sources] / np.maximum(degree[sources] + degree[targets], 1.0)
+    repulsion = exact_repulsion if len(nodes) <= EXACT_REPULSION_LIMIT else grid_repulsion
+
+    alpha = WARM_START_ALPHA if placed * 2 >= len(nodes) else 1.0
+    alpha_decay = 1 - (ALPHA_MIN / alpha) ** (1 / iterations)
+    for _ in range(iterations):
+        alpha += (0 - alpha) * alpha_decay
+        if len(links):
+            velocities += link_forces(positions, velocities, sources, targets, strengths, biases, alpha)
+        velocities += repulsion(positions, alpha)
+        velocities += collision_forces(positions, velocities, radii)
+        velocities *= 1 - VELOCITY_DECAY
+        positions += velocities
+        positions -= positions.mean(axis=0)  # d3.forceCenter
+    return positions
+
+
+def apply_layout(nodes: List[Dict], links: List[Dict], pin: bool = False, iterations: int = ITERATIONS) -> Dict:
+    """
+    Write x/y (and fx/fy with `pin`, which fixes nodes in the map until dragged) onto every
+    node in place. Coordinates are centred on the origin; the map offsets them to the view.
+    Returns a description of the layout for the network metadata.
+    """
+    warm_start = sum(isinstance(node.get("x"), (int, float)) for node in nodes) * 2 >= len(nodes) > 0
+    positions = compute_layout(nodes, links, iterations)
+    for node, (x, y) in zip(nodes, positions):
+        node["x"], node["y"] = round(float(x), 1), round(float(y), 1)
+        if pin:
+            node["fx"], node["fy"] = node["x"], node["y"]
+        else:
+            node.pop("fx", None)
+            node.pop("fy", None)
+    return {
+        "algorithm": "force-directed (exact repulsion)" if len(nodes) <= EXACT_REPULSION_LIMIT
+        else f"force-directed (particle-mesh repulsion, {GRID_SIZE}x{GRID_SIZE} grid)",
+        "iterations": iterations,
+        "pinned": pin,
+        "warm_start": warm_start,
+        "centered_on_origin": True
+    }
@@ -0,0 +1,140 @@
+"""
+Incremental JSON object extraction from model output.
+Scans text (whole or streamed in chunks) once, tracking brace depth and string state, and
+yields each complete top-level JSON object as soon as its closing brace arrives. Prose,
+markdown code fences and several objects in one response are all handled, unlike a
+find('{') / rfind('}') slice or a non-greedy regex, which break on nested or multiple objects.
+"""
+
+import json
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+# spans lookup default: the brace hasn't been scanned from yet
+UNSCANNED = object()
+
+
+class IncrementalJSONExtractor:
+    """
+    Feed text chunks with feed(); each call returns the JSON objects completed by that chunk.
+    Call finish() at the end to recover objects hidden behind an unmatched stray '{'.
+    """
+
+    def __init__(self):
+        self.buffer = []        # characters of the candidate object being scanned
+        self.open = []          # stream offsets of the braces open in the candidate (its depth)
+        self.in_string = False
+        self.escaped = False
+        self.offset = 0         # stream offset of the next character fed
+        # Stream offset of a brace -> offset just past its matching brace, or None if it never
+        # closes. A scan from a brace matches the same way whichever scan passed it outside a
+        # string, so rescans after an invalid candidate jump over spans already matched
+        self.spans = {}
+
+    def feed(self, chunk: str) -> List[Dict]:
+        found = self.scan(chunk, self.offset)
+        self.offset += len(chunk)
+        if not self.open:
+            # Only the open candidate's text is ever rescanned
+            self.spans.clear()
+        return found
+
+    def scan(self, text: str, base: int) -> List[Dict]:
+        """Scan `text`, whose first character is at stream offset `base`."""
+        found = []
+        # (text, base, position) segments still to scan, the next one last; an invalid candidate
+        # pushes its own text back for a rescan instead of recursing
+        segments = [(text, base, 0)]
+        while segments:
+            text, base, position = segments.pop()
+            while position < len(text):
+                if not self.open:
+                    # Outside an object only an opening brace matters
+                    position = text.find("{", position)
+                    if position < 0:
+                        break
+                    end = self.spans.get(base + position, UNSCANNED)
+                    if end is None:
+                        position += 1
+                    elif end is not UNSCANNED and end - base <= len(text):
+                        obj = decode_object(text[position:end - base])
+                        if obj is not None:
+                            found.append(obj)
+                        position = end - base if obj is not None else position + 1
+                    else:
+                        self.open = [base + position]
+                        self.buffer = ["{"]
+                        position += 1
+                    continue
+                char = text[position]
+                position += 1
+                self.buffer.append(char)
+                if self.in_string:
+                    if self.escaped:
+                        self.escaped = False
+                    elif char == "\\":
+                        self.escaped = True
+                    elif char == '"':
+                        self.in_string = False
+                elif char == '"':
+                    self.in_string = True
+                elif char == "{":
+                    self.open.append(base + position - 1)
+                elif char == "}":
+                    start = self.open.pop()
+                    self.spans[start] = base + position
+                    if not self.open:
+                        candidate = "".join(self.buffer)
+                        self.buffer = []
+                        obj = decode_object(candidate)
+                        if obj is not None:
+                            found.append(obj)
+                        else:
+                            # Not valid JSON (e.g. "{lab}" in prose): rescan everything after its opening
+                            # brace, then carry on with the rest of this text
+                            segments.append((text, base, position))
+                            segments.append((candidate, start, 1))
+                            break
+        return found
+
+    def finish(self) -> List[Dict]:
+        """Objects that were only hidden by an unclosed '{' earlier in the text."""
+        found = []
+        while self.open:
+            # The braces still open never close: rescan after the outermost as prose, skipping them
+            for start in self.open:
+                self.spans[start] = None
+            start = self.open[0]
+            leftover = "".join(self.buffer[1:])
+            self.open, self.buffer, self.in_string, self.escaped = [], [], False, False
+            found.extend(self.scan(leftover, start + 1))
+        self.spans.clear()
+        return found
+
+
+def decode_object(text: str) -> Optional[Dict]:
+    try:
+        obj = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def iter_json_objects(text: str) -> Iterator[Dict]:
+    """Every top-level JSON object in `text`, in order."""
+    extractor = IncrementalJSONExtractor()
+    yield from extractor.feed(text)
+    yield from extractor.finish()
+
+
+def first_json_object(text: str, accept: Callable[[Dict], bool] = None) -> Optional[Dict]:
+    """The first top-level JSON object in `text` for which `accept` is true (any object if None)."""
+    for obj in iter_json_objects(text):
+        if accept is None or accept(obj):
+            return obj
+    return None
+
+
+def response_text(content_blocks) -> str:
+    """Concatenate the text blocks of a response (citations can split one answer across blocks)."""
+    return "".join(block.text for block in content_blocks if block.type == "text")
@@ -0,0 +1,127 @@
+"""
+Message Batches API helpers for bulk, non-interactive scraper runs (--batch).
+Submits many messages.create requests as one batch job, polls it with backoff, and streams
+the results file back. The batch id is saved next to the data file so an interrupted run
+resumes polling the same job instead of paying for a second one.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from progress_journal import atomic_write_json
+
+# Polling schedule: start short, grow geometrically, never wait longer than the cap
+POLL_INITIAL_DELAY = 5.0
+POLL_MAX_DELAY = 300.0
+POLL_BACKOFF = 1.5
+
+
+def batch_state_path_for(data_file: str) -> str:
+    """State file that records an in-flight batch, e.g. data/compliance-data.batch.json."""
+    root, _ = os.path.splitext(data_file)
+    return f"{root}.batch.json"
+
+
+def load_batch_state(path: str) -> Optional[Dict]:
+    """Return {'batch_id', 'requests'} for an in-flight batch, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_batch_state(path: str, batch_id: str, requests: Dict[str, Dict]):
+    atomic_write_json({"batch_id": batch_id, "requests": requests}, path)
+
+
+def clear_batch_state(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def submit_batch(client, limiter, requests: Dict[str, Dict]) -> str:
+    """Create one batch job from {custom_id: {'params': ..., 'meta': ...}}. Returns the batch id."""
+    batch = limiter.call(
+        client.messages.batches.create,
+        requests=[{"custom_id": custom_id, "params": request["params"]} for custom_id, request in requests.items()]
+    )
+    print(f"Submitted message batch {batch.id} with {len(requests)} requests.")
+    return batch.id
+
+
+def wait_for_batch(client, limiter, batch_id: str, initial_delay: float = POLL_INITIAL_DELAY,
+                   max_delay: float = POLL_MAX_DELAY):
+    """Poll until the batch has ended, backing off between polls. Returns the final batch object."""
+    delay = initial_delay
+    while True:
+        batch = limiter.call(client.messages.batches.retrieve, batch_id)
+        counts = batch.request_counts
+        print(f"Batch {batch_id}: {batch.processing_status} "
+              f"(processing {counts.processing}, succeeded {counts.succeeded}, errored {counts.errored}, "
+              f"canceled {counts.canceled}, expired {counts.expired})")
+        if batch.processing_status == "ended":
+            return batch
+        time.sleep(delay)
+        delay = min(max_delay, delay * POLL_BACKOFF)
+
+
+def iter_batch_results(client, limiter, batch_id: str) -> Iterator[Tuple[str, Optional[object]]]:
+    """
+    Stream the results file and yield (custom_id, message) per request; message is None
+    for requests that errored, were canceled or expired.
+    """
+    for entry in limiter.call(client.messages.batches.results, batch_id):
+        if entry.result.type == "succeeded":
+            yield entry.custom_id, entry.result.message
+        else:
+            detail = getattr(entry.result, "error", None)
+            print(f"Batch request {entry.custom_id} {entry.result.type}" + (f": {detail}" if detail else ""),
+                  file=sys.stderr)
+            yield entry.custom_id, None
+
+
+def request_key(params: Dict) -> str:
+    """Identity of a request across runs (custom ids are only unique within one batch)."""
+    return json.dumps(params, sort_keys=True)
+
+
+def batch_results(client, limiter, batch_id: str, requests: Dict[str, Dict],
+                  state_path: str) -> Iterator[Tuple[Dict, Dict, Optional[object]]]:
+    """Wait for one batch to end and yield (meta, params, message) per request, then clear its state file."""
+    wait_for_batch(client, limiter, batch_id)
+    for custom_id, message in iter_batch_results(client, limiter, batch_id):
+        request = requests.get(custom_id)
+        if request is None:
+            print(f"Warning: Batch result for unknown request {custom_id} ignored.", file=sys.stderr)
+            continue
+        yield request["meta"], request["params"], message
+    clear_batch_state(state_path)
+
+
+def run_batch(client, limiter, requests: Dict[str, Dict], state_path: str) -> Iterator[Tuple[Dict, Dict, Optional[object]]]:
+    """
+    Submit `requests` ({custom_id: {'params': messages.create kwargs, 'meta': caller data}})
+    as a batch, wait for it to end and yield (meta, params, message) per request.
+    A batch recorded in `state_path` by an interrupted run is resumed first, with its saved
+    requests so results always map back to the cells they were submitted for; requests it
+    doesn't cover are then submitted as a new batch. The state file is removed once every
+    result of its batch has been consumed.
+    """
+    state = load_batch_state(state_path)
+    if state is not None:
+        print(f"Resuming message batch {state['batch_id']} from '{state_path}'.")
+        submitted = {request_key(request["params"]) for request in state["requests"].values()}
+        remaining = {custom_id: request for custom_id, request in requests.items()
+                     if request_key(request["params"]) not in submitted}
+        yield from batch_results(client, limiter, state["batch_id"], state["requests"], state_path)
+        if remaining:
+            print(f"{len(remaining)} requests were not in the resumed batch; submitting them as a new batch.")
+        requests = remaining
+    if not requests:
+        return
+    batch_id = submit_batch(client, limiter, requests)
+    save_batch_state(state_path, batch_id, requests)
+    yield from batch_results(client, limiter, batch_id, requests, state_path)
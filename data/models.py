@@ -0,0 +1,337 @@
+"""
+Typed, slotted models for the compliance data and the stakeholder network.
+from_dict() validates as it builds, with the same checks and messages as data/validation.py
+(which checks the plain dicts in place, the faster path when no objects are needed);
+to_dict() gives back the plain-dict form the scrapers and the site use, in the files' field
+order. Fields a model does not know are kept in `extra` and written back after the known ones.
+"""
+
+from typing import Dict, List, Optional
+
+from progress_journal import atomic_write_json
+from serialization import load_file
+from validation import ValidationError, check, validate_cell, validate_link, validate_node
+
+
+def extra_fields(data: Dict, known: frozenset) -> Optional[Dict]:
+    if data.keys() <= known:
+        return None
+    return {key: value for key, value in data.items() if key not in known}
+
+
+def put_optional(out: Dict, key: str, value):
+    if value is not None:
+        out[key] = value
+
+
+# --- Compliance data ---
+
+class ComplianceCell:
+    """One lab's assessment of one control. Sources are URLs in memory, registry IDs on disk."""
+    __slots__ = ("score", "justification", "sources", "source_ids", "fetched_at", "model", "sources_hash", "extra")
+    FIELDS = frozenset(("score", "sources", "source_ids", "justification", "fetched_at", "model", "sources_hash"))
+
+    def __init__(self, score: int, justification: str, sources: List[str] = None, source_ids: List[str] = None,
+                 fetched_at: str = None, model: str = None, sources_hash: str = None, extra: Dict = None):
+        self.score = score
+        self.justification = justification
+        self.sources = sources
+        self.source_ids = source_ids
+        self.fetched_at = fetched_at
+        self.model = model
+        self.sources_hash = sources_hash
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "ComplianceCell":
+        validate_cell(data, where)
+        return cls(data["score"], data["justification"], data.get("sources"), data.get("source_ids"),
+                   data.get("fetched_at"), data.get("model"), data.get("sources_hash"), extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"score": self.score}
+        put_optional(out, "sources", self.sources)
+        put_optional(out, "source_ids", self.source_ids)
+        out["justification"] = self.justification
+        put_optional(out, "fetched_at", self.fetched_at)
+        put_optional(out, "model", self.model)
+        put_optional(out, "sources_hash", self.sources_hash)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+class Control:
+    __slots__ = ("name", "compliance", "extra")
+    FIELDS = frozenset(("name", "compliance"))
+
+    def __init__(self, name: str, compliance: Dict[str, ComplianceCell], extra: Dict = None):
+        self.name = name
+        self.compliance = compliance
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "Control":
+        check(isinstance(data, dict), where, "control must be an object")
+        check(isinstance(data.get("name"), str) and data["name"] != "", where, "control name must be a non-empty string")
+        where = f"{where} / '{data['name']}'"
+        compliance = data.get("compliance")
+        check(isinstance(compliance, dict), where, "compliance must be an object keyed by lab")
+        cells = {lab: ComplianceCell.from_dict(cell, f"{where} / {lab}") for lab, cell in compliance.items()}
+        return cls(data["name"], cells, extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"name": self.name, "compliance": {lab: cell.to_dict() for lab, cell in self.compliance.items()}}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+class Subcategory:
+    __slots__ = ("name", "controls", "extra")
+    FIELDS = frozenset(("name", "controls"))
+
+    def __init__(self, name: str, controls: List[Control], extra: Dict = None):
+        self.name = name
+        self.controls = controls
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "Subcategory":
+        check(isinstance(data, dict), where, "subcategory must be an object")
+        # Categories without subdivisions use a single subcategory named ""
+        check(isinstance(data.get("name"), str), where, "subcategory name must be a string")
+        where = f"{where} / {data['name']}" if data["name"] else where
+        check(isinstance(data.get("controls"), list), where, "controls must be a list")
+        controls = [Control.from_dict(control, where) for control in data["controls"]]
+        return cls(data["name"], controls, extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"name": self.name, "controls": [control.to_dict() for control in self.controls]}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+class Category:
+    __slots__ = ("name", "subcategories", "extra")
+    FIELDS = frozenset(("name", "subcategories"))
+
+    def __init__(self, name: str, subcategories: List[Subcategory], extra: Dict = None):
+        self.name = name
+        self.subcategories = subcategories
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "Category":
+        check(isinstance(data, dict), where, "category must be an object")
+        check(isinstance(data.get("name"), str) and data["name"] != "", where, "category name must be a non-empty string")
+        where = f"{where} / {data['name']}"
+        check(isinstance(data.get("subcategories"), list), where, "subcategories must be a list")
+        subcategories = [Subcategory.from_dict(subcategory, where) for subcategory in data["subcategories"]]
+        return cls(data["name"], subcategories, extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"name": self.name, "subcategories": [subcategory.to_dict() for subcategory in self.subcategories]}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+class Level:
+    """One security level (SL1-SL5) of the compliance data."""
+    __slots__ = ("level", "description", "categories", "extra")
+    FIELDS = frozenset(("level", "description", "categories"))
+
+    def __init__(self, level: int, description: str, categories: List[Category], extra: Dict = None):
+        self.level = level
+        self.description = description
+        self.categories = categories
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str = "") -> "Level":
+        check(isinstance(data, dict), where or "level", "level must be an object")
+        level = data.get("level")
+        check(isinstance(level, int) and not isinstance(level, bool) and level >= 1, where or "level",
+              f"level must be a positive integer, got {level!r}")
+        where = f"SL{level}"
+        check(isinstance(data.get("description", ""), str), where, "description must be a string")
+        check(isinstance(data.get("categories"), list), where, "categories must be a list")
+        categories = [Category.from_dict(category, where) for category in data["categories"]]
+        return cls(level, data.get("description", ""), categories, extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {
+            "level": self.level,
+            "description": self.description,
+            "categories": [category.to_dict() for category in self.categories]
+        }
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+def levels_from_dicts(compliance_data: List[Dict]) -> List[Level]:
+    check(isinstance(compliance_data, list), "compliance data", "must be a list of levels")
+    levels = [Level.from_dict(sl_entry, f"level #{i + 1}") for i, sl_entry in enumerate(compliance_data)]
+    seen = set()
+    for level in levels:
+        check(level.level not in seen, f"SL{level.level}", "level appears more than once")
+        seen.add(level.level)
+    return levels
+
+
+def levels_to_dicts(levels: List[Level]) -> List[Dict]:
+    return [level.to_dict() for level in levels]
+
+
+def load_levels(path: str) -> List[Level]:
+    """Read and validate a compliance data file as stored (sources as registry IDs)."""
+    return levels_from_dicts(load_file(path))
+
+
+def save_levels(levels: List[Level], path: str, compact: bool = False):
+    atomic_write_json(levels_to_dicts(levels), path, compact)
+
+
+# --- Stakeholder network ---
+
+class Node:
+    __slots__ = ("id", "name", "category", "description", "size", "url", "research", "sources", "source_ids",
+                 "degree", "weighted_degree", "betweenness", "community", "x", "y", "fx", "fy", "extra")
+    HEAD_FIELDS = ("id", "name", "category", "description", "size", "url", "research")
+    # Written by the scraper after the curated fields: cited sources, graph analytics, layout
+    TAIL_FIELDS = ("sources", "source_ids", "degree", "weighted_degree", "betweenness", "community", "x", "y", "fx", "fy")
+    FIELDS = frozenset(HEAD_FIELDS + TAIL_FIELDS)
+
+    def __init__(self, id: str, name: str, category: str, description: str = "", size: float = 20, url: str = "",
+                 research: List[str] = None, sources: List[Dict] = None, source_ids: List[str] = None,
+                 degree: int = None, weighted_degree: float = None, betweenness: float = None, community: int = None,
+                 x: float = None, y: float = None, fx: float = None, fy: float = None, extra: Dict = None):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.description = description
+        self.size = size
+        self.url = url
+        self.research = research
+        self.sources = sources
+        self.source_ids = source_ids
+        self.degree = degree
+        self.weighted_degree = weighted_degree
+        self.betweenness = betweenness
+        self.community = community
+        self.x = x
+        self.y = y
+        self.fx = fx
+        self.fy = fy
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "Node":
+        validate_node(data, where)
+        return cls(data["id"], data["name"], data["category"], data.get("description", ""), data.get("size", 20),
+                   data.get("url", ""), data.get("research"), data.get("sources"), data.get("source_ids"),
+                   data.get("degree"), data.get("weighted_degree"), data.get("betweenness"), data.get("community"),
+                   data.get("x"), data.get("y"), data.get("fx"), data.get("fy"),
+                   extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "description": self.description,
+            "size": self.size,
+            "url": self.url
+        }
+        put_optional(out, "research", self.research)
+        # Curated per-category fields (tenure, education, ...) sit between the common ones and the sources
+        if self.extra:
+            out.update(self.extra)
+        for field in self.TAIL_FIELDS:
+            put_optional(out, field, getattr(self, field))
+        return out
+
+
+class Link:
+    __slots__ = ("source", "target", "strength", "weight", "extra")
+    FIELDS = frozenset(("source", "target", "strength", "weight"))
+
+    def __init__(self, source: str, target: str, strength: int = 3, weight: int = None, extra: Dict = None):
+        self.source = source
+        self.target = target
+        self.strength = strength
+        self.weight = weight
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict, where: str) -> "Link":
+        validate_link(data, where)
+        return cls(data["source"], data["target"], data.get("strength", 3), data.get("weight"), extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"source": self.source, "target": self.target, "strength": self.strength}
+        put_optional(out, "weight", self.weight)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+class Network:
+    """A stakeholder network file: nodes, links, the sources they cite, citation text and metadata."""
+    __slots__ = ("nodes", "links", "sources", "citation", "metadata", "extra")
+    FIELDS = frozenset(("nodes", "links", "sources", "citation", "metadata"))
+
+    def __init__(self, nodes: List[Node], links: List[Link], sources: List[Dict] = None, citation: str = None,
+                 metadata: Dict = None, extra: Dict = None):
+        self.nodes = nodes
+        self.links = links
+        self.sources = sources
+        self.citation = citation
+        self.metadata = metadata
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Network":
+        check(isinstance(data, dict), "network", "must be an object")
+        check(isinstance(data.get("nodes"), list), "network", "nodes must be a list")
+        check(isinstance(data.get("links"), list), "network", "links must be a list")
+        nodes = [Node.from_dict(node, f"node #{i + 1}") for i, node in enumerate(data["nodes"])]
+        links = [Link.from_dict(link, f"link #{i + 1}") for i, link in enumerate(data["links"])]
+        ids = set()
+        for node in nodes:
+            check(node.id not in ids, f"node '{node.id}'", "id appears more than once")
+            ids.add(node.id)
+        for link in links:
+            for end in (link.source, link.target):
+                check(end in ids, f"link {link.source} -> {link.target}", f"unknown node '{end}'")
+        sources = data.get("sources")
+        check(sources is None or (isinstance(sources, list) and all(isinstance(entry, dict) and "id" in entry for entry in sources)),
+              "network", "sources must be a list of source entries")
+        if sources is not None:
+            source_ids = {entry["id"] for entry in sources}
+            for node in nodes:
+                for source_id in node.source_ids or []:
+                    check(source_id in source_ids, f"node '{node.id}'", f"cites source '{source_id}' missing from the sources table")
+        check(data.get("metadata") is None or isinstance(data["metadata"], dict), "network", "metadata must be an object")
+        return cls(nodes, links, sources, data.get("citation"), data.get("metadata"), extra_fields(data, cls.FIELDS))
+
+    def to_dict(self) -> Dict:
+        out = {"nodes": [node.to_dict() for node in self.nodes], "links": [link.to_dict() for link in self.links]}
+        put_optional(out, "sources", self.sources)
+        put_optional(out, "citation", self.citation)
+        put_optional(out, "metadata", self.metadata)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+
+def load_network(path: str) -> Network:
+    """Read and validate a network file as stored (sources as registry IDs)."""
+    return Network.from_dict(load_file(path))
+
+
+def save_network(network: Network, path: str, compact: bool = False):
+    atomic_write_json(network.to_dict(), path, compact)
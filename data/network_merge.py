@@ -0,0 +1,211 @@
+"""
+Incremental merge of a fresh stakeholder scrape into an existing network file.
+New nodes are resolved against the existing ones (so "AWS" lands on an existing
+"amazon-web-services-(aws)" node), upserted by ID and linked by node pair. Hand-curated
+values in the existing file win unless a field is explicitly overwritten, and every run
+records what it added, changed and removed in a delta file next to the snapshot.
+"""
+
+import copy
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from entity_resolution import ORGANIZATION, PERSON, EntityResolver
+
+# Node categories produced by the scraper; only these are ever pruned
+SCRAPED_CATEGORIES = {"contractors", "security_personnel", "cloud_infrastructure", "power_infrastructure", "security_contractors"}
+PERSON_CATEGORIES = {"security_personnel", "executive"}
+# Fields that may be named in --overwrite (plus "strength" for links)
+NODE_FIELDS = ["name", "category", "description", "size", "url", "research", "sources"]
+OVERWRITABLE_FIELDS = NODE_FIELDS + ["strength"]
+
+
+def delta_path_for(output_file: str) -> str:
+    """Delta file that sits next to a network file, e.g. data/sl5-stakeholder-network.delta.json."""
+    root, _ = os.path.splitext(output_file)
+    return f"{root}.delta.json"
+
+
+def node_kind(node: Dict) -> str:
+    return PERSON if node.get("category") in PERSON_CATEGORIES else ORGANIZATION
+
+
+def link_key(link: Dict) -> Tuple[str, str]:
+    """Undirected key for a link."""
+    return tuple(sorted((link["source"], link["target"])))
+
+
+def resolve_ids(existing_nodes: List[Dict], nodes: List[Dict], pinned_ids: Iterable[str]) -> Dict[str, str]:
+    """Map each scraped node ID to the ID of the existing node it names (or a fresh, non-clashing ID)."""
+    resolver = EntityResolver()
+    pinned_ids = set(pinned_ids)
+    for node in existing_nodes:
+        resolver.register(node["id"], node["name"], node_kind(node), pinned=node["id"] in pinned_ids)
+    mapping = {}
+    for node in nodes:
+        if node["id"] in pinned_ids or node["category"] in ("core", "ai_labs"):
+            mapping[node["id"]] = node["id"]
+        else:
+            mapping[node["id"]], _ = resolver.resolve(node["name"], node_kind(node))
+    return mapping
+
+
+def merge_duplicate_nodes(nodes: Dict[str, Dict], links: Dict[Tuple[str, str], Dict], pinned_ids: Iterable[str]) -> List[Dict]:
+    """
+    Fold existing nodes that name the same entity (files written before entity resolution
+    carry e.g. both "Mortenson" and "M.A. Mortenson Company") into the first of them, in
+    place: fields merge as for a scraped node, links move over and parallel ones combine,
+    keeping the stronger strength and adding up weights. Returns [{id, into}] per folded node.
+    """
+    resolver = EntityResolver()
+    pinned_ids = set(pinned_ids)
+    merged = []
+    for node_id, node in list(nodes.items()):
+        if node_id in pinned_ids or node.get("category") in ("core", "ai_labs"):
+            resolver.register(node_id, node["name"], node_kind(node), pinned=True)
+            continue
+        into = resolver.match(node["name"], node_kind(node))
+        if into is None:
+            resolver.register(node_id, node["name"], node_kind(node))
+            continue
+        merge_node_fields(nodes[into], node, ())
+        del nodes[node_id]
+        merged.append({"id": node_id, "into": into})
+    if not merged:
+        return merged
+
+    id_map = {entry["id"]: entry["into"] for entry in merged}
+    for key, link in list(links.items()):
+        if key[0] not in id_map and key[1] not in id_map:
+            continue
+        del links[key]
+        link = dict(link, source=id_map.get(link["source"], link["source"]), target=id_map.get(link["target"], link["target"]))
+        key = link_key(link)
+        if key[0] == key[1]:
+            continue
+        current = links.get(key)
+        if current is None:
+            links[key] = link
+            continue
+        if "strength" in link:
+            current["strength"] = max(current.get("strength", link["strength"]), link["strength"])
+        if "weight" in link or "weight" in current:
+            current["weight"] = current.get("weight", 1) + link.get("weight", 1)
+    return merged
+
+
+def merge_node_fields(existing: Dict, node: Dict, overwrite: Iterable[str]) -> Dict:
+    """
+    Upsert `node` into `existing` in place; returns {field: {'old', 'new'}} for what changed.
+    Overwritten fields take the scraped value. Otherwise empty scalars are filled in and
+    list fields gain the scraped items they lack, so curated values are never lost.
+    """
+    changes = {}
+    for field in NODE_FIELDS:
+        old, new = existing.get(field), node.get(field)
+        if field in overwrite:
+            value = copy.deepcopy(new)
+        elif field == "research":
+            value = list(dict.fromkeys((old or []) + (new or [])))
+        elif field == "sources":
+            urls = {source.get("url") for source in old or []}
+            value = list(old or [])
+            for source in new or []:
+                if source.get("url") not in urls:
+                    urls.add(source.get("url"))
+                    value.append(dict(source, text=f"Source {len(value) + 1}"))
+        else:
+            value = old if old not in (None, "") else new
+        if value != old:
+            changes[field] = {"old": old, "new": value}
+            existing[field] = value
+    return changes
+
+
+def merge_network(existing: Dict, nodes: List[Dict], links: List[Dict], updated_lab_ids: Iterable[str],
+                  overwrite: Iterable[str] = (), prune_scope: Optional[Dict[str, Set[str]]] = None
+                  ) -> Tuple[List[Dict], List[Dict], Dict]:
+    """
+    Merge a scrape (nodes, links) of the labs in `updated_lab_ids` into the `existing`
+    network dict, after folding together existing nodes that name the same entity. `prune_scope` maps a lab ID to the node categories its searches in this
+    scrape fully cover; links from that lab to nodes of those categories that the scrape no
+    longer produced are removed, and scraped-category nodes left without any link are
+    removed too. Returns (nodes, links, delta).
+    """
+    updated_lab_ids = set(updated_lab_ids)
+    overwrite = set(overwrite)
+    merged_nodes = {node["id"]: copy.deepcopy(node) for node in existing.get("nodes", [])}
+    merged_links = {link_key(link): copy.deepcopy(link) for link in existing.get("links", [])}
+    delta = {
+        "nodes": {"added": [], "changed": [], "removed": []},
+        "links": {"added": [], "changed": [], "removed": []}
+    }
+    merged = merge_duplicate_nodes(merged_nodes, merged_links, updated_lab_ids | {"sl5-core"})
+    if merged:
+        delta["nodes"]["merged"] = merged
+
+    id_map = resolve_ids(list(merged_nodes.values()), nodes, updated_lab_ids | {"sl5-core"})
+    for node in nodes:
+        node = dict(node, id=id_map[node["id"]])
+        if node["id"] not in merged_nodes:
+            merged_nodes[node["id"]] = copy.deepcopy(node)
+            delta["nodes"]["added"].append(node)
+            continue
+        changes = merge_node_fields(merged_nodes[node["id"]], node, overwrite)
+        if changes:
+            delta["nodes"]["changed"].append({"id": node["id"], "fields": changes})
+
+    scraped_keys = set()
+    for link in links:
+        link = dict(link, source=id_map.get(link["source"], link["source"]), target=id_map.get(link["target"], link["target"]))
+        key = link_key(link)
+        if key[0] == key[1]:
+            continue
+        scraped_keys.add(key)
+        current = merged_links.get(key)
+        if current is None:
+            merged_links[key] = link
+            delta["links"]["added"].append(link)
+            continue
+        # Weight is always the scraped mention count; a curated strength is kept unless overwritten
+        changes = {}
+        for field in ("strength", "weight"):
+            if field == "strength" and field in current and field not in overwrite:
+                continue
+            if current.get(field) != link[field]:
+                changes[field] = {"old": current.get(field), "new": link[field]}
+                current[field] = link[field]
+        if changes:
+            delta["links"]["changed"].append({"source": current["source"], "target": current["target"], "fields": changes})
+
+    if prune_scope:
+        for key, link in list(merged_links.items()):
+            lab_end = next((end for end in key if end in prune_scope), None)
+            if lab_end is None or key in scraped_keys:
+                continue
+            other = key[1] if key[0] == lab_end else key[0]
+            if merged_nodes.get(other, {}).get("category") in prune_scope[lab_end] & SCRAPED_CATEGORIES:
+                del merged_links[key]
+                delta["links"]["removed"].append(link)
+        linked = {end for key in merged_links for end in key}
+        for node_id, node in list(merged_nodes.items()):
+            if node_id not in linked and node.get("category") in SCRAPED_CATEGORIES:
+                del merged_nodes[node_id]
+                delta["nodes"]["removed"].append(node_id)
+
+    return list(merged_nodes.values()), list(merged_links.values()), delta
+
+
+def build_delta_file(delta: Dict, labs: List[str], snapshot_file: str) -> Dict:
+    """Wrap a merge delta with the context needed to read it on its own."""
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "snapshot": snapshot_file,
+        "labs_updated": labs,
+        "summary": {
+            f"{kind}_{action}": len(items)
+            for kind, actions in delta.items() for action, items in actions.items()
+        },
+        **delta
+    }
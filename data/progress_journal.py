@@ -0,0 +1,148 @@
+"""
+Append-only progress journal for the compliance scraper.
+Each finished cell is appended as one JSON line instead of rewriting the whole data file;
+the journal is replayed on startup and folded back into the JSON file atomically.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from serialization import dumps
+
+
+def journal_path_for(data_file: str) -> str:
+    """Journal file that sits next to a data file, e.g. data/compliance-data.journal.jsonl."""
+    root, _ = os.path.splitext(data_file)
+    return f"{root}.journal.jsonl"
+
+
+def atomic_write_json(data, filename: str, compact: bool = False):
+    """
+    Write JSON (indented, or with no whitespace when `compact`) to a temp file in the same
+    directory, fsync it, then rename over `filename`.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps(data, compact))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the mode of the file being replaced, or honour the umask
+        if os.path.exists(filename):
+            mode = os.stat(filename).st_mode & 0o777
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def index_controls(compliance_data: List[Dict]) -> Dict[tuple, Dict]:
+    """Map (level, category, subcategory, control name) to the control dict it identifies."""
+    index = {}
+    for sl_entry in compliance_data:
+        for category in sl_entry["categories"]:
+            for subcategory in category["subcategories"]:
+                for control in subcategory["controls"]:
+                    key = (sl_entry["level"], category["name"], subcategory["name"], control["name"])
+                    index[key] = control
+    return index
+
+
+class ProgressJournal:
+    """
+    Appends one JSON line per finished cell. Lines are flushed immediately so a crashed
+    process loses nothing, and fsync'd in batches (every `fsync_every` records or
+    `fsync_interval` seconds) so power loss costs at most one batch.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval: float = 5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.lock = threading.Lock()
+        self.file = open(path, "a")
+
+    def append(self, sl_level: int, category: str, subcategory: str, control: str, lab: str, cell: Dict):
+        record = {
+            "level": sl_level,
+            "category": category,
+            "subcategory": subcategory,
+            "control": control,
+            "lab": lab,
+            "cell": cell
+        }
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync_locked()
+
+    def sync_locked(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        with self.lock:
+            if self.unsynced:
+                self.sync_locked()
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            if self.unsynced:
+                self.sync_locked()
+            self.file.close()
+
+
+def replay_journal(path: str, compliance_data: List[Dict]) -> int:
+    """
+    Apply journal records to `compliance_data` in order. A torn final line (from a crash
+    mid-append) is ignored. Returns the number of records applied.
+    """
+    if not os.path.exists(path):
+        return 0
+    index = index_controls(compliance_data)
+    applied = 0
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Warning: Ignoring unreadable journal line {line_number} in '{path}'.", file=sys.stderr)
+                continue
+            key = (record["level"], record["category"], record["subcategory"], record["control"])
+            control = index.get(key)
+            if control is None:
+                print(f"Warning: Journal entry for unknown control {key} ignored.", file=sys.stderr)
+                continue
+            # Records hold the whole cell, so fields it no longer has (e.g. a placeholder's stamps) go too
+            control["compliance"][record["lab"]] = record["cell"]
+            applied += 1
+    return applied
+
+
+def compact_journal(compliance_data: List[Dict], data_file: str, journal_path: str, write=atomic_write_json):
+    """Atomically write the folded data file with `write(data, path)`, then discard the journal it now contains."""
+    write(compliance_data, data_file)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
@@ -0,0 +1,325 @@
+"""
+Shared rate limiting for the SL5 scrapers.
+Provides an adaptive token bucket, jittered exponential backoff with retry-after support,
+and a circuit breaker that pauses calls while the API keeps failing and stops the run only
+when it is still failing after several probes.
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+import anthropic
+
+# HTTP statuses that signal the API wants us to slow down
+THROTTLE_STATUS_CODES = {429, 529}
+# HTTP statuses worth retrying (throttling plus transient server-side failures)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+# How often calls waiting on an open circuit breaker check whether its probe has decided
+PROBE_POLL_SECONDS = 1.0
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised by CircuitBreaker.before_call while calls are being rejected; RateLimiter waits
+    those out and only lets it through once the breaker has given up.
+    """
+
+
+def status_code_of(exc: Exception) -> Optional[int]:
+    """Return the HTTP status code carried by an Anthropic API error, if any."""
+    return getattr(exc, "status_code", None)
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Read the `retry-after` header (in seconds) from an API error response, if present."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Whether an exception is a transient failure worth retrying."""
+    if isinstance(exc, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    return status_code_of(exc) in RETRYABLE_STATUS_CODES
+
+
+def is_service_failure(exc: Exception) -> bool:
+    """
+    Whether an exception says the API is unreachable or overloaded (transport errors, 429,
+    5xx, 529), which is what the circuit breaker counts, rather than that the request was wrong.
+    """
+    if isinstance(exc, anthropic.APIConnectionError):
+        return True
+    status = status_code_of(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose refill rate adapts to the API's feedback: proportional
+    increase on success (the rate grows by `increase` of itself), multiplicative decrease on
+    429/529 at most once per `decrease_interval` (a burst of throttled in-flight calls is one
+    signal), and a shared pause when the server sends `retry-after`.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, min_rate: float = 0.05, max_rate: float = 20.0,
+                 increase: float = 0.05, decrease: float = 0.5, decrease_interval: float = 5.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+        self.decreased_at = None
+        self.tokens = float(burst)
+        self.paused_until = 0.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def start_at(self, concurrency: int):
+        """
+        Open at the run's concurrency: every worker may start at once and the bucket admits
+        `concurrency` requests per second, so the API's throttling sets the pace, not the bucket.
+        """
+        with self.lock:
+            self.burst = max(self.burst, concurrency)
+            self.rate = min(self.max_rate, max(self.rate, float(concurrency)))
+            self.tokens = float(self.burst)
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * (1 + self.increase))
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        with self.lock:
+            now = time.monotonic()
+            if self.decreased_at is None or now - self.decreased_at >= self.decrease_interval:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.decreased_at = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed attempts and rejects calls for
+    `reset_timeout` seconds; after that a single probe call decides whether to close again,
+    and every other call is rejected while the probe is in flight. After `max_failed_probes`
+    probes in a row have failed it gives up: every call is rejected for good.
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 60.0, max_failed_probes: int = 5):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_failed_probes = max_failed_probes
+        self.consecutive_failures = 0
+        self.failed_probes = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def given_up_error(self) -> CircuitOpenError:
+        return CircuitOpenError(f"Circuit breaker still open after {self.failed_probes} failed probes "
+                                f"({self.consecutive_failures} consecutive API failures)")
+
+    def wait_time(self) -> float:
+        """
+        Seconds a rejected call should wait before trying again: until the probe is due, or a
+        short poll while another call's probe is in flight. Raises CircuitOpenError once given up.
+        """
+        with self.lock:
+            if self.failed_probes >= self.max_failed_probes:
+                raise self.given_up_error()
+            if self.probing:
+                return min(PROBE_POLL_SECONDS, self.reset_timeout)
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError while open; returns True when this call is the half-open probe."""
+        with self.lock:
+            if self.failed_probes >= self.max_failed_probes:
+                raise self.given_up_error()
+            if self.probing:
+                raise CircuitOpenError("Circuit breaker half-open, waiting for its probe call")
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Circuit breaker open after {self.consecutive_failures} consecutive API failures"
+                )
+            # Half-open: only this call goes through, and its outcome closes or re-opens the breaker
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.failed_probes = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_answer(self):
+        """The API answered with an error about the request itself: not a failure, but a probe's proof of life."""
+        with self.lock:
+            if self.probing:
+                self.consecutive_failures = 0
+                self.failed_probes = 0
+                self.opened_at = None
+                self.probing = False
+
+    def release_probe(self):
+        """The probe was abandoned (cancelled or interrupted) without a verdict; the next call probes instead."""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.probing:
+                # The probe failed: stay open for another reset_timeout
+                self.probing = False
+                self.failed_probes += 1
+                self.opened_at = time.monotonic()
+                if self.failed_probes < self.max_failed_probes:
+                    print(f"Circuit breaker probe failed ({self.failed_probes}/{self.max_failed_probes}); "
+                          f"pausing calls for another {self.reset_timeout:.0f}s.", file=sys.stderr)
+            elif self.consecutive_failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"Circuit breaker tripped after {self.consecutive_failures} consecutive API failures; "
+                      f"pausing calls for {self.reset_timeout:.0f}s before a probe.", file=sys.stderr)
+
+
+class RateLimiter:
+    """
+    Wraps API calls with the token bucket, retries and circuit breaker.
+    One instance is meant to be shared by every call a scraper makes.
+    """
+
+    def __init__(self, bucket: TokenBucket = None, breaker: CircuitBreaker = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt: int, exc: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's retry-after."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def record_error(self, exc: Exception, probe: bool = False):
+        if is_service_failure(exc):
+            self.breaker.record_failure()
+        elif status_code_of(exc) is not None:
+            # e.g. 400 invalid_request: the request is at fault, not the API
+            self.breaker.record_answer()
+        elif probe:
+            self.breaker.release_probe()
+        if status_code_of(exc) in THROTTLE_STATUS_CODES:
+            self.bucket.on_throttle(retry_after_seconds(exc))
+
+    def record_ok(self):
+        self.breaker.record_success()
+        self.bucket.on_success()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """
+        Call `fn` under the limiter, retrying transient failures. Re-raises the last error.
+        While the circuit breaker is open the call waits for it; CircuitOpenError means it gave up.
+        """
+        attempt = 0
+        while True:
+            try:
+                probe = self.breaker.before_call()
+            except CircuitOpenError:
+                time.sleep(self.breaker.wait_time())
+                continue
+            try:
+                self.bucket.acquire()
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.record_error(e, probe)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                print(f"Transient API error ({e.__class__.__name__}), retrying in {delay:.1f}s "
+                      f"[{attempt + 1}/{self.max_retries}]", file=sys.stderr)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.record_ok()
+            return result
+
+    async def call_async(self, fn: Callable, *args, **kwargs):
+        """Async counterpart of call() for coroutine functions such as AsyncAnthropic methods."""
+        attempt = 0
+        while True:
+            try:
+                probe = self.breaker.before_call()
+            except CircuitOpenError:
+                await asyncio.sleep(self.breaker.wait_time())
+                continue
+            try:
+                await self.bucket.acquire_async()
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self.record_error(e, probe)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                print(f"Transient API error ({e.__class__.__name__}), retrying in {delay:.1f}s "
+                      f"[{attempt + 1}/{self.max_retries}]", file=sys.stderr)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.record_ok()
+            return result
@@ -0,0 +1,108 @@
+"""
+Append-only store of raw stakeholder search results.
+Every search result is appended as one JSON line the moment it arrives, keyed by lab and
+category and stamped with when it was fetched. A scrape resumes from the results fetched
+within --max-age (an interrupted run's) instead of paying for them again and searches the
+older ones again; the network JSON can be rebuilt from the whole store offline after changes
+to the graph builder.
+"""
+
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from freshness import parse_fetched_at
+
+
+def raw_results_path_for(output_file: str) -> str:
+    """Store that sits next to a network file, e.g. data/sl5-stakeholder-network.raw.jsonl."""
+    root, _ = os.path.splitext(output_file)
+    return f"{root}.raw.jsonl"
+
+
+class RawResultStore:
+    """
+    Latest result per (lab, kind); lab is None for searches that span all labs. Records are
+    fsync'd one by one since each stands for a paid web search. Later records for the same
+    key supersede earlier ones. With load=False existing records are not read (a fresh
+    scrape); they are superseded on disk as new results are appended.
+    """
+
+    def __init__(self, path: str, load: bool = True):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.superseded = 0
+        if load:
+            self.load()
+
+    def load(self):
+        """Read the store; a torn final line (from a crash mid-append) is ignored."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Ignoring unreadable raw result line {line_number} in '{self.path}'.", file=sys.stderr)
+                    continue
+                key = (entry["lab"], entry["kind"])
+                if key in self.entries:
+                    self.superseded += 1
+                self.entries[key] = entry
+
+    def get(self, lab: Optional[str], kind: str, since: Optional[datetime] = None) -> Optional[Dict]:
+        """The stored result for a search, or None if it has not been run (or not since `since`)."""
+        entry = self.entries.get((lab, kind))
+        if entry is None or (since is not None and parse_fetched_at(entry.get("fetched_at")) < since):
+            return None
+        return entry["result"]
+
+    def put(self, lab: Optional[str], kind: str, result: Dict, model: str):
+        """Persist one search result before anything else is done with it."""
+        entry = {
+            "lab": lab,
+            "kind": kind,
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "model": model,
+            "result": result
+        }
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if (lab, kind) in self.entries:
+                self.superseded += 1
+            self.entries[(lab, kind)] = entry
+
+    def labs(self) -> List[str]:
+        """Labs with at least one stored result."""
+        return list(dict.fromkeys(lab for lab, _ in self.entries if lab is not None))
+
+    def compact(self):
+        """Rewrite the store with only the latest entry per search, if anything was superseded."""
+        with self.lock:
+            if not self.superseded:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.superseded = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
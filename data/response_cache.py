@@ -0,0 +1,186 @@
+"""
+Content-addressed on-disk cache for Claude responses.
+Entries are keyed on a hash of the full request (model, prompt, tools config, ...) and hold the
+raw response content blocks, so re-running a scraper after a parser or graph-builder change
+replays earlier answers instead of paying for them again.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pydantic
+from anthropic.types import ContentBlock
+
+DEFAULT_CACHE_DIR = "data/.cache/responses"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_MB = 512
+
+# Cache modes selected from the command line
+MODE_NORMAL = "normal"          # read hits, store misses
+MODE_CACHE_ONLY = "cache_only"  # never call the API; a miss is an error
+MODE_REFRESH = "refresh"        # ignore existing entries, always call the API and overwrite
+
+content_block_adapter = pydantic.TypeAdapter(ContentBlock)
+
+
+class CacheMissError(Exception):
+    """Raised in cache-only mode when a request has no usable cache entry."""
+
+
+def request_key(request: Dict) -> str:
+    """Stable SHA-256 of a messages.create request (model, messages, tools, max_tokens, ...)."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    One JSON file per request hash under `directory`. Entries older than `ttl_seconds` are
+    treated as misses; when the total size passes `max_bytes` the least recently used
+    entries (by file mtime, refreshed on every hit) are evicted.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_DAYS * 86400,
+                 max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, mode: str = MODE_NORMAL):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # key -> (size in bytes, last used timestamp); built once, then kept in sync
+        self.entries = {}
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self.load_index()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def load_index(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                self.entries[name[:-5]] = (stat.st_size, stat.st_mtime)
+                self.total_bytes += stat.st_size
+
+    def lookup(self, request: Dict) -> Optional[List]:
+        """
+        Return cached content blocks for `request`, or None if the API should be called.
+        Raises CacheMissError in cache-only mode when there is no fresh entry.
+        """
+        if self.mode == MODE_REFRESH:
+            return None
+        key = request_key(request)
+        content = self.read(key)
+        with self.lock:
+            if content is not None:
+                self.hits += 1
+                return content
+            self.misses += 1
+        if self.mode == MODE_CACHE_ONLY:
+            raise CacheMissError(f"No cached response for request {key[:12]}")
+        return None
+
+    def contains(self, request: Dict) -> bool:
+        """Whether lookup() would answer `request` from the cache; doesn't count a hit or refresh the entry."""
+        return self.mode != MODE_REFRESH and self.fresh_entry(self.path_for(request_key(request))) is not None
+
+    def fresh_entry(self, path: str) -> Optional[Dict]:
+        """The cache entry at `path`, or None if it is missing, unreadable or older than the TTL."""
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable cache entry '{path}': {e}", file=sys.stderr)
+            return None
+        created_at = entry.get("created_at") if isinstance(entry, dict) else None
+        if not isinstance(created_at, (int, float)) or "content" not in entry:
+            print(f"Warning: Ignoring malformed cache entry '{path}'.", file=sys.stderr)
+            return None
+        if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+            return None
+        return entry
+
+    def read(self, key: str) -> Optional[List]:
+        path = self.path_for(key)
+        entry = self.fresh_entry(path)
+        if entry is None:
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        with self.lock:
+            if key in self.entries:
+                self.entries[key] = (self.entries[key][0], now)
+        return [content_block_adapter.validate_python(block) for block in entry["content"]]
+
+    def store(self, request: Dict, content: List):
+        """Persist the content blocks of a successful response for `request`."""
+        key = request_key(request)
+        entry = {
+            "created_at": time.time(),
+            "model": request.get("model"),
+            "content": [block.model_dump(mode="json") for block in content]
+        }
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            previous = self.entries.get(key)
+            if previous:
+                self.total_bytes -= previous[0]
+            self.entries[key] = (size, time.time())
+            self.total_bytes += size
+            self.evict_locked()
+
+    def evict_locked(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            del self.entries[key]
+            self.total_bytes -= size
+
+    def summary(self) -> str:
+        return (f"Response cache: {self.hits} hits, {self.misses} misses, "
+                f"{len(self.entries)} entries ({self.total_bytes / (1024 * 1024):.1f} MB)")
+
+
+def add_cache_arguments(parser):
+    """Register the cache command-line switches shared by both scrapers."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--cache-only", action="store_true", help="Only use cached responses; never call the API.")
+    group.add_argument("--refresh", action="store_true", help="Ignore cached responses and overwrite them with fresh ones.")
+    group.add_argument("--no-cache", action="store_true", help="Disable the response cache entirely.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Response cache directory (default: {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                        help=f"Treat cached responses older than this as stale (default: {DEFAULT_TTL_DAYS}).")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help=f"Evict least recently used entries beyond this size (default: {DEFAULT_MAX_MB}).")
+
+
+def cache_from_args(args) -> Optional[ResponseCache]:
+    """Build the ResponseCache described by parsed command-line arguments (None with --no-cache)."""
+    if args.no_cache:
+        return None
+    mode = MODE_CACHE_ONLY if args.cache_only else MODE_REFRESH if args.refresh else MODE_NORMAL
+    return ResponseCache(args.cache_dir, args.cache_ttl_days * 86400, int(args.cache_max_mb * 1024 * 1024), mode)
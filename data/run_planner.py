@@ -0,0 +1,201 @@
+"""
+Dry-run planning for the SL5 scrapers (the `plan` command).
+Given the requests a run would send, estimates tokens, web searches, cost and wall-clock
+time without calling the API. Per-call figures come from earlier runs' telemetry
+(data/.metrics) when there is enough of it for a call kind, otherwise from heuristics based
+on the request itself (prompt length, max_tokens, the web search tool's max_uses).
+Requests already in the response cache are listed but cost nothing.
+"""
+
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from telemetry import BATCH_DISCOUNT, METRICS_DIR, TOKEN_FIELDS, call_cost
+
+# Kinds with fewer successful calls than this in the metrics history fall back to heuristics
+MIN_HISTORY_CALLS = 5
+# Heuristics: rough characters per token, tokens of search results fed back per web search,
+# share of max_tokens a typical answer uses, and time per call
+CHARS_PER_TOKEN = 4
+TOKENS_PER_SEARCH = 6000
+OUTPUT_FILL = 0.5
+BASE_CALL_SECONDS = 8.0
+SECONDS_PER_SEARCH = 4.0
+OUTPUT_TOKENS_PER_SECOND = 50.0
+# The shared limiter's token bucket (rate_limiter.TokenBucket defaults, raised to the run's
+# concurrency by start_at): starting rate, burst, proportional increase per success and ceiling,
+# in requests per second
+LIMITER_RATE = 2.0
+LIMITER_BURST = 4
+LIMITER_INCREASE = 0.05
+LIMITER_MAX_RATE = 20.0
+# Shortest prefix the API caches for the scrapers' models; shorter cache_control prefixes are billed as input
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def load_history(script: str, model: str, metrics_dir: str = METRICS_DIR) -> Dict[str, Dict]:
+    """
+    Mean tokens, web searches and wall time per call kind over every recorded API call
+    of `script` with `model` that succeeded and reported its final usage (not cut-off streams).
+    """
+    totals = {}
+    for path in sorted(glob.glob(os.path.join(metrics_dir, f"{script}-*.jsonl"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"Warning: Skipping unreadable metrics file '{path}': {e}", file=sys.stderr)
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if (record.get("source") != "api" or record.get("status") != "ok" or record.get("model") != model
+                    or record.get("truncated")):
+                continue
+            kind = totals.setdefault(record["kind"], {"calls": 0, "web_searches": 0, "wall_seconds": 0.0,
+                                                      **{field: 0 for field in TOKEN_FIELDS}})
+            kind["calls"] += 1
+            kind["web_searches"] += record.get("web_searches", 0)
+            kind["wall_seconds"] += record.get("wall_seconds") or 0.0
+            for field in TOKEN_FIELDS:
+                kind[field] += record.get(field, 0)
+    return {kind: {field: (value / values["calls"] if field != "calls" else value) for field, value in values.items()}
+            for kind, values in totals.items()}
+
+
+def text_length(value) -> int:
+    """Characters of text in a system prompt or message content (string or list of blocks)."""
+    if isinstance(value, str):
+        return len(value)
+    return sum(len(block.get("text", "")) for block in value or [] if isinstance(block, dict))
+
+
+def heuristic_call(request: Dict) -> Dict:
+    """Per-call estimate from the request alone, assuming every allowed web search is used."""
+    searches = sum(tool.get("max_uses", 1) for tool in request.get("tools", []) if tool.get("name") == "web_search")
+    prompt_tokens = sum(text_length(message["content"]) for message in request["messages"]) // CHARS_PER_TOKEN
+    output_tokens = int(request["max_tokens"] * OUTPUT_FILL)
+    return {
+        "input_tokens": prompt_tokens + searches * TOKENS_PER_SEARCH,
+        "output_tokens": output_tokens,
+        "web_searches": searches,
+        "wall_seconds": BASE_CALL_SECONDS + searches * SECONDS_PER_SEARCH + output_tokens / OUTPUT_TOKENS_PER_SECOND,
+    }
+
+
+def cached_prefix_tokens(request: Dict) -> int:
+    """Tokens of the system prompt when it is marked for prompt caching and long enough to be cached, else 0."""
+    system = request.get("system")
+    if not isinstance(system, list) or not any("cache_control" in block for block in system):
+        return 0
+    tokens = text_length(system) // CHARS_PER_TOKEN
+    return tokens if tokens >= MIN_CACHEABLE_TOKENS else 0
+
+
+def limiter_seconds(calls: int, concurrency: int = 1) -> float:
+    """Least time the shared limiter needs to admit `calls` requests at `concurrency`, if none is throttled."""
+    seconds = 0.0
+    rate = min(LIMITER_MAX_RATE, max(LIMITER_RATE, float(concurrency)))
+    for _ in range(max(0, calls - max(LIMITER_BURST, concurrency))):
+        seconds += 1 / rate
+        rate = min(LIMITER_MAX_RATE, rate * (1 + LIMITER_INCREASE))
+    return seconds
+
+
+def estimate_run(planned: List[Tuple[str, Dict, bool]], script: str, model: str, concurrency: int = 1,
+                 batch: bool = False, metrics_dir: str = METRICS_DIR) -> Dict:
+    """
+    Estimate a run from `planned` (kind, request, cached) tuples. Cached requests cost
+    nothing. Wall time assumes `concurrency` calls in flight, bounded below by the shared
+    limiter's pacing; batch runs are billed at the batch discount and have no wall estimate.
+    """
+    history = load_history(script, model, metrics_dir)
+    kinds = {}
+    written_prefixes = set()
+    for kind, request, cached in planned:
+        entry = kinds.setdefault(kind, {"calls": 0, "cached": 0, "web_searches": 0.0, "call_seconds": 0.0,
+                                        **{field: 0.0 for field in TOKEN_FIELDS}})
+        entry["calls"] += 1
+        if cached:
+            entry["cached"] += 1
+            continue
+        recorded = history.get(kind)
+        if recorded and recorded["calls"] >= MIN_HISTORY_CALLS:
+            entry["basis"] = f"{recorded['calls']} recorded calls"
+            per_call = recorded
+        else:
+            entry["basis"] = "heuristic"
+            per_call = heuristic_call(request)
+            # The first call with each distinct system prefix writes it to the cache; the rest read it.
+            # A system prompt too short to be cached is billed as plain input on every call
+            prefix = cached_prefix_tokens(request)
+            uncached_system = text_length(request.get("system")) // CHARS_PER_TOKEN - prefix
+            system_key = json.dumps(request.get("system"), sort_keys=True)
+            first = prefix > 0 and system_key not in written_prefixes
+            written_prefixes.add(system_key)
+            per_call = dict(per_call, input_tokens=per_call["input_tokens"] + uncached_system,
+                            cache_creation_input_tokens=prefix if first else 0,
+                            cache_read_input_tokens=0 if first else prefix)
+        for field in TOKEN_FIELDS:
+            entry[field] += per_call.get(field, 0)
+        entry["web_searches"] += per_call["web_searches"]
+        entry["call_seconds"] += per_call["wall_seconds"]
+
+    for entry in kinds.values():
+        entry["cost_usd"] = call_cost(dict(entry, model=model, source="batch" if batch else "api"))
+    totals = {field: sum(entry[field] for entry in kinds.values())
+              for field in ["calls", "cached", "web_searches", "call_seconds", "cost_usd"] + TOKEN_FIELDS}
+    api_calls = totals["calls"] - totals["cached"]
+    wall_seconds = None
+    if not batch:
+        in_flight = max(1, concurrency)
+        # However many workers there are, the run takes at least as long as one average call
+        longest = max((entry["call_seconds"] / (entry["calls"] - entry["cached"])
+                       for entry in kinds.values() if entry["calls"] > entry["cached"]), default=0.0)
+        wall_seconds = max(totals["call_seconds"] / in_flight, longest if api_calls else 0.0, limiter_seconds(api_calls, in_flight))
+    return {"script": script, "model": model, "concurrency": concurrency, "batch": batch,
+            "kinds": kinds, "totals": totals, "api_calls": api_calls, "wall_seconds": wall_seconds}
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def print_plan(estimate: Dict):
+    """Per-kind table of planned calls with estimated tokens, searches and cost, then the run totals."""
+    if not estimate["totals"]["calls"]:
+        print("Nothing to do: no pending cells or searches.")
+        return
+    print(f"{'kind':<16} {'calls':>6} {'cached':>6} {'in tok':>10} {'out tok':>9} {'cache rd':>10} {'searches':>8} {'cost':>9}  basis")
+    rows = list(estimate["kinds"].items()) + [("total", estimate["totals"])]
+    for kind, entry in rows:
+        print(f"{kind:<16} {entry['calls']:>6} {entry['cached']:>6} {entry['input_tokens']:>10.0f} "
+              f"{entry['output_tokens']:>9.0f} {entry['cache_read_input_tokens']:>10.0f} {entry['web_searches']:>8.0f} "
+              f"${entry['cost_usd']:>8.2f}  {entry.get('basis', '')}")
+    if estimate["batch"]:
+        print(f"Message Batch: billed at {BATCH_DISCOUNT:.0%} of the interactive price; results usually arrive "
+              f"within an hour, at most 24h.")
+    elif estimate["api_calls"]:
+        print(f"Estimated wall time at concurrency {estimate['concurrency']}: {format_duration(estimate['wall_seconds'])} "
+              f"({estimate['api_calls']} API calls, ~{format_duration(estimate['totals']['call_seconds'] / estimate['api_calls'])} each)")
+    else:
+        print("Nothing to call: every planned request is answered from the response cache.")
+    print("Estimates only; retries, fallbacks and answers far from the usual length are not accounted for.")
+
+
+def plan_entry_label(kind: str, label: str, cached: bool) -> str:
+    return f"  {kind:<16} {label}" + ("  (cached)" if cached else "")
+
+
+def is_cached(response_cache, request: Dict) -> bool:
+    """Whether `response_cache` (may be None) would answer `request` without an API call."""
+    return response_cache is not None and response_cache.contains(request)
@@ -0,0 +1,45 @@
+"""
+JSON backend for the data files.
+Uses orjson when it is installed and the stdlib json module otherwise. Both write UTF-8
+with the same layout (two-space indent, or no whitespace at all in compact mode). Floats
+are the exception: orjson writes exponents without a sign or padding (1e16, not 1e+16),
+spells out small numbers that json writes with an exponent (0.000025, not 2.5e-05) and
+writes NaN as null. The data files only hold floats rounded to a few decimals, which
+both backends write the same way.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(data: Any, compact: bool = False) -> bytes:
+    """Serialize to UTF-8 bytes: indented for files kept in git, compact for files only a browser reads."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: stringify int keys the way json does
+        option = orjson.OPT_NON_STR_KEYS | (0 if compact else orjson.OPT_INDENT_2)
+        return orjson.dumps(data, option=option)
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    return text.encode("utf-8")
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path: str) -> Any:
+    """Read a JSON file as UTF-8 whatever the locale."""
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -1,10 +1,26 @@
-import json
 import anthropic
-import time # For rate limiting
 import argparse # For command-line arguments
 import os # For checking file existence and environment variables
 import sys # For exiting the script on error
-import re   # For regular expressions
+import asyncio # For the --concurrency worker pool
+import hashlib # For hashing each cell's sources
+import time # For streaming latency measurements
+from datetime import datetime, timedelta, timezone # For per-cell fetch timestamps and --max-age
+
+from rate_limiter import RateLimiter, CircuitOpenError # Shared adaptive rate limiting / retries
+from progress_journal import ProgressJournal, journal_path_for, replay_journal, compact_journal, index_controls # Append-only progress
+from response_cache import CacheMissError, add_cache_arguments, cache_from_args # On-disk response cache
+from message_batches import batch_state_path_for, run_batch # Message Batches API (--batch)
+from task_index import build_task_index, filter_tasks, filter_shard, parse_shard, shard_output_path, merge_shards # Sharding / merge
+from json_extract import IncrementalJSONExtractor, first_json_object, response_text # Robust / streaming JSON extraction
+from compliance_export import export_compliance, print_export_summary # Compact score matrix + detail shards for the heatmap
+from source_registry import SOURCES_FILE, SourceRegistry, load_compliance_data, save_compliance_data, search_result_titles # Interned sources
+from validation import ValidationError, validate_compliance_data # Checked on load
+from freshness import cutoff_for, last_commit_time, parse_fetched_at, parse_max_age, parse_timestamp # Fetch timestamps and --max-age
+from evidence_corpus import add_evidence_arguments, evidence_from_args # Stored web search results (--rescore)
+from run_planner import estimate_run, is_cached, plan_entry_label, print_plan # Dry-run estimates (plan)
+from telemetry import (INVALID_SCORE, NO_JSON, PARTIAL, VALID, Telemetry, add_telemetry_arguments, counting_attempts,
+                       note_cache_hit, note_outcome, note_response, telemetry_from_args) # Per-call metrics
 
 # --- Configuration ---
 # Retrieve API key from environment variable
@@ -14,189 +30,981 @@ CLAUDE_MODEL = "claude-sonnet-4-20250514"
 AI_LABS = ["OpenAI", "Anthropic", "Google", "xAI", "Meta"]
 # The script will now read from and write to this file
 INPUT_OUTPUT_FILE = "data/compliance-data.json"
+# Web search tool definition shared by every compliance query
+WEB_SEARCH_TOOL = {
+    "type": "web_search_20250305",
+    "name": "web_search",
+    "max_uses": 3 # Limit searches per query to avoid excessive billing
+}
+# Multi-lab mode (--multi-lab) scores every pending lab for a control in one request
+MULTI_LAB_MAX_TOKENS = 2048
+MULTI_LAB_WEB_SEARCH_TOOL = {
+    "type": "web_search_20250305",
+    "name": "web_search",
+    "max_uses": 5
+}
+# --rescore: best-matching passages from the evidence corpus sent in place of web searches, and
+# how many that mention the lab a cell needs before it is scored without a live search
+EVIDENCE_PASSAGES = 8
+MIN_EVIDENCE_PASSAGES = 3
+API_KEY_MISSING_JUSTIFICATION = "API key not set, skipping API call."
+# Instructions shared by every request; sent as a cached system prefix per SL (see build_system_blocks)
+COMPLIANCE_SYSTEM_PROMPT = """You assess the publicly documented security posture of frontier AI labs against the controls in the RAND report "Securing AI Model Weights" (RAND RR-A2977-1). Each request names one or more labs, one control, and the Security Level (SL1-SL5) the control belongs to. Base every assessment on publicly available information only, using web search to find it.
+
+Scoring rubric (compliance score in 25% increments):
+- 0: No specific public information addresses this control for the lab, or public information indicates the control is not in place.
+- 25: Indirect or generic evidence only (e.g. broad security statements, certifications that only loosely cover the control).
+- 50: Public evidence that the control is partly in place, or in place for some systems but not for model weights.
+- 75: Clear public evidence that the control is in place for model weights, with gaps or missing detail relative to the SL expectation.
+- 100: Strong, specific public evidence that the control is fully implemented to the level expected at this SL.
 
-# Initialize Anthropic client
+Output format: respond with a single JSON object within a ```json code block and nothing that contradicts it.
+- Single-lab requests: an object with 'score' (integer), 'justification' (string, 1-3 concise sentences) and 'sources' (array of URL strings).
+  Example JSON: {"score": 75, "justification": "...", "sources": ["url1", "url2"]}
+- Multi-lab requests: an object keyed by the exact lab names given, where each value has the single-lab fields.
+  Example JSON: {"OpenAI": {"score": 75, "justification": "...", "sources": ["url1"]}, "Anthropic": {"score": 50, "justification": "...", "sources": ["url2"]}}
+If no specific public information directly addressing the control is found for a lab, default its score to 0 and use {"score": 0, "justification": "No specific public information found.", "sources": []}."""
+# Justification prefix written by older versions when a call failed; such cells are re-queried
+API_ERROR_JUSTIFICATION_PREFIX = "Error during API call"
+
+# Anthropic client, created on first use by get_client() so the module imports without a key
+# SDK-level retries are disabled; the shared limiter owns retries, backoff and pacing
 client = None
-if ANTHROPIC_API_KEY: # Check if the environment variable is set
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-else:
-    print("WARNING: ANTHROPIC_API_KEY environment variable is not set. API calls will be skipped.", file=sys.stderr)
+limiter = RateLimiter()
+# Response cache; configured from the command line in the main block
+response_cache = None
+# SL level -> description from the data file, added to the cached system prefix
+level_descriptions = {}
+# SL level -> [(category / subcategory, [control names])] from the data file; each level's requests list
+# its controls in their cached system prefix as reference, which takes the prefix past the API's
+# minimum cacheable length without adding instructions
+control_catalogue = {}
+# Interned source registry (data/sources.json); loaded in the main block
+source_registry = None
+# Token counts reported by the API (cache_* show how much of the prefix was written/read from the prompt cache)
+token_usage = {"input_tokens": 0, "output_tokens": 0, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+# Per-call metrics (wall time, tokens, searches, retries, parse outcome); configured in the main block
+telemetry = Telemetry("compliance", CLAUDE_MODEL)
+# --stream: use the messages stream API and stop reading as soon as the result JSON object closes
+use_streaming = False
+# (time to first token, time to result) in seconds for every streamed call
+stream_timings = []
+# Evidence corpus the search results of every answer are added to; loaded in the main block
+evidence_corpus = None
+# --rescore: passages needed to score a cell from the corpus (None: always search live)
+min_evidence = None
 
-def get_compliance_info(ai_lab: str, control_name: str, sl_level: int) -> dict:
+def get_client():
+    """The shared Anthropic client, created on first use; None when ANTHROPIC_API_KEY is not set."""
+    global client
+    if client is None and ANTHROPIC_API_KEY:
+        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+    return client
+
+def build_system_blocks(sl_level: int) -> list:
     """
-    Uses Anthropic Claude with web search to find compliance information for a given AI lab and control.
-    Returns a dictionary with 'score', 'justification' and 'sources'.
-    """
-    # Skip API call if client is not initialized (due to missing API key)
-    if client is None:
-        return {
-            "score": 0,
-            "justification": "API key not set, skipping API call.",
-            "sources": []
-        }
-
-    query_prompt = (
-        f"Based on publicly available information, assess {ai_lab}'s compliance or posture regarding "
-        f"'{control_name}' related to AI model weights security, as might be expected for Security Level {sl_level} "
-        "as described in the RAND report 'Securing AI Model Weights'. "
-        "Provide a compliance score in 25% increments (0, 25, 50, 75, or 100). "
-        "Also, provide a brief, concise justification (1-3 sentences) and the URLs of your sources as a JSON list. "
-        "Output the response in a single JSON object within a code block with 'score' (integer), 'justification' (string), and 'sources' (array of strings) fields. "
-        "Example JSON: {\"score\": 75, \"justification\": \"...\", \"sources\": [\"url1\", \"url2\"]}. "
-        "If no specific public information directly addressing this control for this lab is found, default the score to 0 and respond with "
-        "{\"score\": 0, \"justification\": \"No specific public information found.\", \"sources\": []}."
+    Static system prefix shared by every compliance request at `sl_level`, marked for prompt
+    caching. It carries the RAND framing, scoring rubric, output schemas, the SL level
+    descriptions and the level's controls loaded from the data file, so only the small
+    per-cell user message changes between calls.
+    """
+    text = COMPLIANCE_SYSTEM_PROMPT
+    if level_descriptions:
+        text += "\n\nSecurity Levels (from the RAND report):\n" + "\n".join(
+            f"- SL{level}: {description}" for level, description in sorted(level_descriptions.items())
+        )
+    if control_catalogue.get(sl_level):
+        text += f"\n\nSL{sl_level} controls by category (for reference; each request names the control to assess):\n" + "\n".join(
+            f"- {group}: {'; '.join(names)}" for group, names in control_catalogue[sl_level]
+        )
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+def build_compliance_prompt(ai_lab: str, control_name: str, sl_level: int) -> str:
+    """Build the per-cell user message for a lab/control/SL level (the system prefix holds the rest)."""
+    return (
+        f"Assess {ai_lab}'s compliance or posture regarding '{control_name}' "
+        f"as might be expected for Security Level {sl_level}. Respond with a single-lab JSON object."
+    )
+
+def build_compliance_request(ai_lab: str, control_name: str, sl_level: int) -> dict:
+    """Keyword arguments for messages.create for one cell; also the response cache key."""
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 1024,
+        "system": build_system_blocks(sl_level),
+        "messages": [
+            {"role": "user", "content": build_compliance_prompt(ai_lab, control_name, sl_level)}
+        ],
+        "tools": [WEB_SEARCH_TOOL]
+    }
+
+def build_evidence_prompt(ai_lab: str, control_name: str, sl_level: int, passages: list) -> str:
+    """Per-cell user message for --rescore: the assessment grounded in passages from the evidence corpus."""
+    evidence = "\n".join(f"[{number}] {passage['title'] or passage['url']} ({passage['url']}): {passage['text']}"
+                         for number, passage in enumerate(passages, 1))
+    return (
+        f"Assess {ai_lab}'s compliance or posture regarding '{control_name}' "
+        f"as might be expected for Security Level {sl_level}, using only the evidence below, collected from earlier "
+        f"web searches. Cite the URLs of the passages you rely on as sources. Respond with a single-lab JSON object.\n\n"
+        f"Evidence:\n{evidence}"
+    )
+
+def build_cell_request(ai_lab: str, control_name: str, sl_level: int) -> tuple:
+    """
+    (telemetry kind, messages.create kwargs) for one cell: with --rescore and enough
+    passages about the lab in the evidence corpus, a request carrying those passages and
+    no web search tool; otherwise the live web search request.
+    """
+    if min_evidence and evidence_corpus is not None:
+        passages = evidence_corpus.search(control_name, EVIDENCE_PASSAGES, lab=ai_lab)
+        if len(passages) >= min_evidence:
+            return "rescore", {
+                "model": CLAUDE_MODEL,
+                "max_tokens": 1024,
+                "system": build_system_blocks(sl_level),
+                "messages": [
+                    {"role": "user", "content": build_evidence_prompt(ai_lab, control_name, sl_level, passages)}
+                ]
+            }
+    return "single_lab", build_compliance_request(ai_lab, control_name, sl_level)
+
+def note_evidence(content_blocks, labs: list):
+    """Add the search results of an answer about `labs` to the evidence corpus, if one is open."""
+    if evidence_corpus is not None:
+        evidence_corpus.add(content_blocks, labs)
+
+def parse_compliance_response(content_blocks, control_name: str, call: dict = None) -> dict:
+    """
+    Extract 'score', 'justification' and 'sources' from the content blocks of a Claude response.
+    Shared by the sync and async query paths so both produce identical cells. The parse
+    outcome is noted on the telemetry record `call`, if given.
+    """
+    # Default values in case parsing fails or no relevant info is found
+    score = 0
+    justification = "Could not parse response or no relevant text."
+    sources = []
+
+    note_source_titles(content_blocks)
+    # Citations split the answer over several text blocks, so search the joined text
+    text = response_text(content_blocks)
+    parsed_json = first_json_object(text, is_single_lab_result)
+    if parsed_json is not None:
+        if isinstance(parsed_json["score"], int) and parsed_json["score"] in [0, 25, 50, 75, 100]:
+            score = parsed_json["score"]
+            note_outcome(call, VALID)
+        else:
+            print(f"Warning: LLM returned invalid score '{parsed_json['score']}' for control '{control_name}'. Defaulting to 0%.", file=sys.stderr)
+            note_outcome(call, INVALID_SCORE)
+        if "justification" in parsed_json:
+            justification = parsed_json["justification"]
+        if "sources" in parsed_json and isinstance(parsed_json["sources"], list):
+            sources = parsed_json["sources"]
+    else:
+        note_outcome(call, NO_JSON)
+        if "No specific public information found." in text:
+            justification = "No specific public information found."
+    # web_search_tool_result content type is handled by the LLM embedding sources in its JSON.
+
+    # Deduplicate sources, keeping first-seen order so repeated runs serialize identically
+    sources = list(dict.fromkeys(sources))
+
+    return {"score": score, "justification": justification, "sources": sources}
+
+def note_source_titles(content_blocks):
+    """Keep the page titles of the web search results, so cited URLs get a title in the source registry."""
+    if source_registry is not None:
+        source_registry.note_titles(search_result_titles(content_blocks))
+
+def build_multi_lab_prompt(labs: list, control_name: str, sl_level: int) -> str:
+    """Build the user message asking Claude to score every lab in `labs` for one control at once."""
+    return (
+        f"Assess the compliance or posture of each of these AI labs: {', '.join(labs)}, "
+        f"regarding '{control_name}' as might be expected for Security Level {sl_level}. "
+        "Respond with a multi-lab JSON object keyed by the exact lab names above."
+    )
+
+def build_multi_lab_request(labs: list, control_name: str, sl_level: int) -> dict:
+    """Keyword arguments for messages.create for a multi-lab query."""
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": MULTI_LAB_MAX_TOKENS,
+        "system": build_system_blocks(sl_level),
+        "messages": [
+            {"role": "user", "content": build_multi_lab_prompt(labs, control_name, sl_level)}
+        ],
+        "tools": [MULTI_LAB_WEB_SEARCH_TOOL]
+    }
+
+def is_single_lab_result(obj: dict) -> bool:
+    """Whether a JSON object from the response is a single-lab result (has a score)."""
+    return "score" in obj
+
+def multi_lab_result_check(labs: list):
+    """Predicate accepting the multi-lab JSON object, i.e. one keyed by at least one of `labs`."""
+    return lambda obj: any(lab in obj for lab in labs)
+
+def validate_lab_entry(entry) -> bool:
+    """Whether one lab's entry in a multi-lab response is a usable compliance cell."""
+    return (
+        isinstance(entry, dict)
+        and isinstance(entry.get("score"), int)
+        and entry["score"] in [0, 25, 50, 75, 100]
+        and isinstance(entry.get("justification"), str)
+        and entry["justification"] != ""
+        and isinstance(entry.get("sources", []), list)
     )
 
+def parse_multi_lab_response(content_blocks, labs: list, control_name: str, call: dict = None) -> dict:
+    """Return {lab: info} for every lab whose entry in the multi-lab JSON object is valid."""
+    results = {}
+    note_source_titles(content_blocks)
+    parsed_json = first_json_object(response_text(content_blocks), multi_lab_result_check(labs))
+    if parsed_json is None:
+        note_outcome(call, NO_JSON)
+        return results
+    for lab in labs:
+        entry = parsed_json.get(lab)
+        if validate_lab_entry(entry):
+            sources = [url for url in entry.get("sources", []) if isinstance(url, str)]
+            results[lab] = {
+                "score": entry["score"],
+                "justification": entry["justification"],
+                "sources": list(dict.fromkeys(sources))
+            }
+        elif entry is not None:
+            print(f"Warning: Invalid multi-lab entry for {lab} on control '{control_name}', will query individually.", file=sys.stderr)
+    note_outcome(call, VALID if len(results) == len(labs) else PARTIAL)
+    return results
+
+def record_usage(usage):
+    """Add the token counts from a response's `usage` to the run totals."""
+    if usage is None:
+        return
+    for field in token_usage:
+        token_usage[field] += getattr(usage, field, None) or 0
+
+def format_token_usage() -> str:
+    return (f"Tokens: {token_usage['input_tokens']} input, {token_usage['output_tokens']} output, "
+            f"{token_usage['cache_creation_input_tokens']} prompt-cache write, "
+            f"{token_usage['cache_read_input_tokens']} prompt-cache read")
+
+def text_delta(event):
+    """The text carried by a stream event, or None for events without answer text."""
+    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+        return event.delta.text
+    return None
+
+def record_stream_timing(started: float, first_token: float, result_at: float):
+    stream_timings.append((
+        (first_token or result_at) - started,
+        result_at - started
+    ))
+
+def stream_response(request: dict, is_result):
+    """
+    Stream one request and stop reading once the incremental extractor has closed a JSON
+    object accepted by `is_result`; the rest of the answer (usually closing prose) is never
+    waited for. Returns the message snapshot received so far and whether the stream was cut
+    off: a cut-off message has no stop_reason or final usage, so it must not be cached or
+    metered as a complete answer.
+    """
+    extractor = IncrementalJSONExtractor()
+    started = time.monotonic()
+    first_token = None
+    truncated = False
+    with get_client().messages.stream(**request) as stream:
+        for event in stream:
+            text = text_delta(event)
+            if text is None:
+                continue
+            if first_token is None:
+                first_token = time.monotonic()
+            if any(is_result(obj) for obj in extractor.feed(text)):
+                truncated = True
+                break
+        message = stream.current_message_snapshot
+    record_stream_timing(started, first_token, time.monotonic())
+    return message, truncated
+
+async def stream_response_async(async_client, request: dict, is_result):
+    """Async counterpart of stream_response."""
+    extractor = IncrementalJSONExtractor()
+    started = time.monotonic()
+    first_token = None
+    truncated = False
+    async with async_client.messages.stream(**request) as stream:
+        async for event in stream:
+            text = text_delta(event)
+            if text is None:
+                continue
+            if first_token is None:
+                first_token = time.monotonic()
+            if any(is_result(obj) for obj in extractor.feed(text)):
+                truncated = True
+                break
+        message = stream.current_message_snapshot
+    record_stream_timing(started, first_token, time.monotonic())
+    return message, truncated
+
+def format_stream_timings() -> str:
+    """Median and p95 time-to-first-token / time-to-result over the streamed calls."""
+    def percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    first_tokens = [first_token for first_token, _ in stream_timings]
+    results = [result for _, result in stream_timings]
+    return (f"Streaming ({len(stream_timings)} calls): time to first token p50 {percentile(first_tokens, 0.5):.2f}s, "
+            f"p95 {percentile(first_tokens, 0.95):.2f}s; time to result p50 {percentile(results, 0.5):.2f}s, "
+            f"p95 {percentile(results, 0.95):.2f}s")
+
+def fetch_response_content(request: dict, is_result=is_single_lab_result, call: dict = None):
+    """
+    Return the content blocks for a messages.create request, from the response cache when
+    possible, otherwise from the API under the shared limiter. Returns None when there is
+    no cached answer and no client (API key not set). With --stream the answer is cut off
+    once a JSON object accepted by `is_result` has been received; such cut-off answers are
+    not cached, and their usage is noted as incomplete. Attempts, usage and cache hits are
+    noted on the telemetry record `call`, if given.
+    """
+    content = response_cache.lookup(request) if response_cache else None
+    if content is None:
+        api_client = get_client()
+        if api_client is None:
+            return None
+        truncated = False
+        if use_streaming:
+            response, truncated = limiter.call(counting_attempts(call, stream_response), request, is_result)
+        else:
+            response = limiter.call(counting_attempts(call, api_client.messages.create), **request)
+        record_usage(response.usage)
+        note_response(call, response, truncated)
+        content = response.content
+        if response_cache and not truncated:
+            response_cache.store(request, content)
+    else:
+        note_cache_hit(call)
+    return content
+
+async def fetch_response_content_async(async_client, request: dict, is_result=is_single_lab_result, call: dict = None):
+    """Async counterpart of fetch_response_content."""
+    content = response_cache.lookup(request) if response_cache else None
+    if content is None:
+        if async_client is None:
+            return None
+        truncated = False
+        if use_streaming:
+            response, truncated = await limiter.call_async(counting_attempts(call, stream_response_async), async_client, request, is_result)
+        else:
+            response = await limiter.call_async(counting_attempts(call, async_client.messages.create), **request)
+        record_usage(response.usage)
+        note_response(call, response, truncated)
+        content = response.content
+        if response_cache and not truncated:
+            response_cache.store(request, content)
+    else:
+        note_cache_hit(call)
+    return content
+
+def get_compliance_info(ai_lab: str, control_name: str, sl_level: int) -> dict:
+    """
+    Uses Anthropic Claude with web search to find compliance information for a given AI lab and control.
+    Returns a dictionary with 'score', 'justification' and 'sources', or None if the call failed
+    after retries (so the cell is left untouched and picked up again on the next run).
+    Raises CircuitOpenError when the API has been failing persistently.
+    """
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": query_prompt}
-            ],
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 3 # Limit searches per query to avoid excessive billing
-            }]
-        )
+        kind, request = build_cell_request(ai_lab, control_name, sl_level)
+        with telemetry.call(kind, f"SL{sl_level} - {ai_lab} - '{control_name}'",
+                            level=sl_level, lab=ai_lab, control=control_name) as call:
+            content = fetch_response_content(request, call=call)
+            # Skip API call if client is not initialized (due to missing API key)
+            if content is None:
+                return {
+                    "score": 0,
+                    "justification": API_KEY_MISSING_JUSTIFICATION,
+                    "sources": []
+                }
+            note_evidence(content, [ai_lab])
+            return parse_compliance_response(content, control_name, call)
+
+    except CacheMissError:
+        print(f"Cache miss for {ai_lab} - '{control_name}' (--cache-only), leaving cell unchanged.", file=sys.stderr)
+        return None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error querying Claude for {ai_lab} - '{control_name}': {e}", file=sys.stderr)
+        return None
 
-        # Default values in case parsing fails or no relevant info is found
-        score = 0
-        justification = "Could not parse response or no relevant text."
-        sources = []
-        
-        # Regex to find JSON wrapped in markdown code block (```json...```)
-        json_pattern = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
-
-        # Iterate through content blocks to find the JSON
-        for content_block in response.content:
-            if content_block.type == "text":
-                match = json_pattern.search(content_block.text)
-                if match:
-                    json_str = match.group(1)
-                    try:
-                        parsed_json = json.loads(json_str)
-                        if "score" in parsed_json and isinstance(parsed_json["score"], int):
-                            # Validate score is within allowed increments
-                            if parsed_json["score"] in [0, 25, 50, 75, 100]:
-                                score = parsed_json["score"]
-                            else:
-                                print(f"Warning: LLM returned invalid score '{parsed_json['score']}' for control '{control_name}'. Defaulting to 0%.", file=sys.stderr)
-                        if "justification" in parsed_json:
-                            justification = parsed_json["justification"]
-                        if "sources" in parsed_json and isinstance(parsed_json["sources"], list):
-                            sources = parsed_json["sources"]
-                        break # Found and parsed the JSON, no need to check further text blocks
-                    except json.JSONDecodeError:
-                        print(f"Warning: Failed to parse JSON from LLM response for '{control_name}': {json_str}", file=sys.stderr)
-                else:
-                    # If no JSON block is found, check for "No specific public information found."
-                    if "No specific public information found." in content_block.text:
-                        justification = "No specific public information found."
-                    # If it's just conversational text, it will fall back to initial justification.
-            # web_search_tool_result content type is handled by the LLM embedding sources in its JSON.
-
-        # Deduplicate sources
-        sources = list(set(sources))
-
-        return {"score": score, "justification": justification, "sources": sources}
+async def get_compliance_info_async(async_client, ai_lab: str, control_name: str, sl_level: int) -> dict:
+    """Async counterpart of get_compliance_info used by the --concurrency worker pool."""
+    try:
+        kind, request = build_cell_request(ai_lab, control_name, sl_level)
+        with telemetry.call(kind, f"SL{sl_level} - {ai_lab} - '{control_name}'",
+                            level=sl_level, lab=ai_lab, control=control_name) as call:
+            content = await fetch_response_content_async(async_client, request, call=call)
+            if content is None:
+                return {
+                    "score": 0,
+                    "justification": API_KEY_MISSING_JUSTIFICATION,
+                    "sources": []
+                }
+            note_evidence(content, [ai_lab])
+            return parse_compliance_response(content, control_name, call)
 
+    except CacheMissError:
+        print(f"Cache miss for {ai_lab} - '{control_name}' (--cache-only), leaving cell unchanged.", file=sys.stderr)
+        return None
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"Error querying Claude for {ai_lab} - '{control_name}': {e}", file=sys.stderr)
-        return {"score": 0, "justification": f"Error during API call: {e}", "sources": []}
+        return None
+
+def get_multi_lab_compliance_info(labs: list, control_name: str, sl_level: int) -> dict:
+    """
+    Score several labs for one control with a single request (--multi-lab).
+    Returns {lab: info} for the labs whose entry validated; missing labs should be
+    re-queried individually with get_compliance_info.
+    """
+    try:
+        with telemetry.call("multi_lab", f"SL{sl_level} - {', '.join(labs)} - '{control_name}'",
+                            level=sl_level, labs=labs, control=control_name) as call:
+            content = fetch_response_content(build_multi_lab_request(labs, control_name, sl_level),
+                                             multi_lab_result_check(labs), call)
+            if content is None:
+                return {}
+            note_evidence(content, labs)
+            return parse_multi_lab_response(content, labs, control_name, call)
+
+    except CacheMissError:
+        print(f"Cache miss for multi-lab query '{control_name}' (--cache-only).", file=sys.stderr)
+        return {}
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error querying Claude for multi-lab query '{control_name}': {e}", file=sys.stderr)
+        return {}
+
+async def get_multi_lab_compliance_info_async(async_client, labs: list, control_name: str, sl_level: int) -> dict:
+    """Async counterpart of get_multi_lab_compliance_info."""
+    try:
+        with telemetry.call("multi_lab", f"SL{sl_level} - {', '.join(labs)} - '{control_name}'",
+                            level=sl_level, labs=labs, control=control_name) as call:
+            content = await fetch_response_content_async(async_client, build_multi_lab_request(labs, control_name, sl_level),
+                                                         multi_lab_result_check(labs), call)
+            if content is None:
+                return {}
+            note_evidence(content, labs)
+            return parse_multi_lab_response(content, labs, control_name, call)
+
+    except CacheMissError:
+        print(f"Cache miss for multi-lab query '{control_name}' (--cache-only).", file=sys.stderr)
+        return {}
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error querying Claude for multi-lab query '{control_name}': {e}", file=sys.stderr)
+        return {}
+
+def load_compliance_file(path: str) -> list:
+    """Load a compliance data file with sources expanded, exiting with the location of the problem if it is invalid."""
+    compliance_data = load_compliance_data(path, source_registry)
+    try:
+        validate_compliance_data(compliance_data)
+    except ValidationError as e:
+        print(f"Error: '{path}' is not valid compliance data: {e}", file=sys.stderr)
+        sys.exit(1)
+    return compliance_data
 
 # Function to save current progress
-def save_progress(data, filename):
+def save_progress(data, filename, journal_path):
+    """Fold the in-memory data into `filename` atomically and drop the journal it supersedes."""
     try:
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=2)
+        compact_journal(data, filename, journal_path,
+                        write=lambda compliance_data, path: save_compliance_data(compliance_data, path, source_registry))
         print(f"\nProgress saved to '{filename}'.")
     except Exception as e:
         print(f"Error saving progress to '{filename}': {e}", file=sys.stderr)
 
 
+def is_cell_done(lab_compliance) -> bool:
+    """A cell is done if its justification is not empty AND not a placeholder left by a skipped/failed call."""
+    return bool(lab_compliance and lab_compliance["justification"] and
+                lab_compliance["justification"] != API_KEY_MISSING_JUSTIFICATION and
+                not lab_compliance["justification"].startswith(API_ERROR_JUSTIFICATION_PREFIX))
+
+def comma_list(value: str) -> list:
+    """argparse type for comma-separated lists such as --labs OpenAI,Meta."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def cell_fetched_at(lab_compliance) -> datetime:
+    """When a cell was last fetched; cells without a timestamp count as infinitely old."""
+    return parse_fetched_at((lab_compliance or {}).get("fetched_at"))
+
+def collect_pending_cells(compliance_data, process_all: bool = False, limit: int = None, shard: tuple = None,
+                          max_age: timedelta = None, levels: list = None, labs: list = None, categories: list = None,
+                          verbose: bool = True) -> list:
+    """
+    Flatten the SL level / category / subcategory / control tree into the task index and return
+    the CellTasks that still need querying, stalest first (file order among equally old cells).
+    A cell is pending if it has never been processed, if --all is set, or if it is older than
+    `max_age`. `levels`/`labs`/`categories` and `shard` narrow the candidate cells; `limit`
+    caps how many controls get queried. `verbose` prints the cells skipped and the limit.
+    """
+    tasks = filter_tasks(build_task_index(compliance_data, AI_LABS), levels, labs, categories)
+    if shard:
+        tasks = filter_shard(tasks, shard)
+    cutoff = cutoff_for(max_age)
+    pending = []
+    for task in tasks:
+        lab_compliance = task.control["compliance"].get(task.lab)
+        # If --all flag is NOT present, skip cells that are already processed (and fresh enough)
+        if not process_all and is_cell_done(lab_compliance) and \
+           (cutoff is None or cell_fetched_at(lab_compliance) >= cutoff):
+            if verbose:
+                print(f"Skipping SL{task.level} - {task.lab} - '{task.control['name']}' (already processed).")
+            continue
+        pending.append(task)
+    pending.sort(key=lambda task: cell_fetched_at(task.control["compliance"].get(task.lab)))
+
+    if limit:
+        # Check if limit is reached before processing the control
+        allowed_controls = []
+        for task in pending:
+            if not any(control is task.control for control in allowed_controls):
+                if len(allowed_controls) >= limit:
+                    if verbose:
+                        print(f"Limit of {limit} controls reached. Stopping processing.")
+                    break
+                allowed_controls.append(task.control)
+        pending = [task for task in pending if any(control is task.control for control in allowed_controls)]
+    return pending
+
+def sources_hash(sources: list) -> str:
+    """Short hash of a cell's sources, to spot refreshes that changed the evidence."""
+    return hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()[:16]
+
+def apply_compliance_info(control: dict, lab: str, info: dict):
+    """
+    Write a query result back into the control's compliance cell for `lab`. Answers from the
+    API are stamped with when and how they were fetched; the no-API-key placeholder is not.
+    """
+    cell = control["compliance"][lab]
+    cell["score"] = info["score"]
+    cell["justification"] = info["justification"]
+    cell["sources"] = info["sources"]
+    if info["justification"] == API_KEY_MISSING_JUSTIFICATION:
+        # Nothing was fetched: drop stamps left by an earlier answer this placeholder replaces
+        for field in ("fetched_at", "model", "sources_hash"):
+            cell.pop(field, None)
+        return
+    cell["fetched_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    cell["model"] = CLAUDE_MODEL
+    cell["sources_hash"] = sources_hash(info["sources"])
+
+def backfill_stamps(compliance_data, fetched_at: datetime, model: str) -> int:
+    """
+    Stamp answered cells that predate fetch stamps with `fetched_at` and `model`, and hash
+    their sources, so --max-age ages them from then instead of treating them as never fetched.
+    Cells that already have a stamp and unanswered cells are left alone. Returns the number stamped.
+    """
+    stamp = fetched_at.astimezone(timezone.utc).isoformat(timespec="seconds")
+    stamped = 0
+    for sl_entry in compliance_data:
+        for category in sl_entry["categories"]:
+            for subcategory in category["subcategories"]:
+                for control in subcategory["controls"]:
+                    for cell in control["compliance"].values():
+                        if not is_cell_done(cell) or cell.get("fetched_at"):
+                            continue
+                        cell["fetched_at"] = stamp
+                        cell["model"] = model
+                        cell["sources_hash"] = sources_hash(cell["sources"])
+                        stamped += 1
+    return stamped
+
+def record_result(journal: ProgressJournal, cell: tuple, info: dict, stats: dict):
+    """Apply a query result to its cell and append it to the progress journal."""
+    sl_level, category_name, subcategory_name, control, lab = cell
+    if info is None:
+        stats["queries_failed"] += 1
+        return
+    apply_compliance_info(control, lab, info)
+    journal.append(sl_level, category_name, subcategory_name, control["name"], lab, control["compliance"][lab])
+
+def group_cells_by_control(pending) -> list:
+    """Group pending cells that share a control, for --multi-lab queries, in order of first appearance."""
+    groups = {}
+    for cell in pending:
+        groups.setdefault(id(cell.control), []).append(cell)
+    return list(groups.values())
+
+def query_group(group, journal: ProgressJournal, stats: dict):
+    """
+    Query one group of cells for the same control: a single multi-lab request when the group
+    holds several labs, then individual queries for any lab it did not answer validly.
+    """
+    sl_level, _, _, control, _ = group[0]
+    results = {}
+    if len(group) > 1:
+        labs = [cell[4] for cell in group]
+        print(f"Querying for SL{sl_level} - {', '.join(labs)} - '{control['name']}' (multi-lab)...")
+        results = get_multi_lab_compliance_info(labs, control["name"], sl_level)
+        stats["queries_made"] += 1
+    for cell in group:
+        lab = cell[4]
+        info = results.get(lab)
+        if info is None:
+            print(f"Querying for SL{sl_level} - {lab} - '{control['name']}'...")
+            info = get_compliance_info(lab, control["name"], sl_level)
+            stats["queries_made"] += 1
+        record_result(journal, cell, info, stats)
+
+async def query_group_async(async_client, group, journal: ProgressJournal, stats: dict):
+    """Async counterpart of query_group."""
+    sl_level, _, _, control, _ = group[0]
+    results = {}
+    if len(group) > 1:
+        labs = [cell[4] for cell in group]
+        print(f"Querying for SL{sl_level} - {', '.join(labs)} - '{control['name']}' (multi-lab)...")
+        results = await get_multi_lab_compliance_info_async(async_client, labs, control["name"], sl_level)
+        stats["queries_made"] += 1
+    for cell in group:
+        lab = cell[4]
+        info = results.get(lab)
+        if info is None:
+            print(f"Querying for SL{sl_level} - {lab} - '{control['name']}'...")
+            info = await get_compliance_info_async(async_client, lab, control["name"], sl_level)
+            stats["queries_made"] += 1
+        record_result(journal, cell, info, stats)
+
+def build_group_request(group) -> tuple:
+    """(telemetry kind, label, messages.create kwargs) for one query group, as every run mode sends it."""
+    sl_level, _, _, control, _ = group[0]
+    labs = [cell[4] for cell in group]
+    if len(labs) > 1:
+        return ("multi_lab", f"SL{sl_level} - {', '.join(labs)} - '{control['name']}'",
+                build_multi_lab_request(labs, control["name"], sl_level))
+    kind, request = build_cell_request(labs[0], control["name"], sl_level)
+    return kind, f"SL{sl_level} - {labs[0]} - '{control['name']}'", request
+
+def print_compliance_plan(groups, concurrency: int, batch: bool, list_calls: bool):
+    """
+    The `plan` command: what a run with the same options would query and an estimate of its
+    tokens, searches, cost and wall time. Labs a multi-lab answer misses (queried again
+    individually) are not counted.
+    """
+    planned = []
+    for group in groups:
+        kind, label, request = build_group_request(group)
+        planned.append((kind, label, request, is_cached(response_cache, request)))
+    print(f"{sum(len(group) for group in groups)} pending cells in {len(planned)} requests.")
+    if list_calls:
+        for kind, label, _, cached in planned:
+            print(plan_entry_label(kind, label, cached))
+    print_plan(estimate_run([(kind, request, cached) for kind, _, request, cached in planned], "compliance", CLAUDE_MODEL,
+                            concurrency, batch))
+
+def run_sequential(groups, journal: ProgressJournal, stats: dict):
+    """Query each group of cells one at a time, counting API requests in stats["queries_made"]."""
+    for group in groups:
+        query_group(group, journal, stats)
+
+async def run_concurrent(groups, journal: ProgressJournal, concurrency: int, stats: dict):
+    """
+    Query groups of cells with a bounded pool of `concurrency` workers sharing one task queue.
+    Every result is written into the same compliance cell the sequential path would use, so
+    the compacted file only depends on the responses, not on completion order.
+    """
+    # No client is needed when every answer comes from the cache (--cache-only without a key)
+    async_client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=0) if ANTHROPIC_API_KEY else None
+    queue = asyncio.Queue()
+    for group in groups:
+        queue.put_nowait(group)
+
+    async def worker():
+        while True:
+            try:
+                group = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await query_group_async(async_client, group, journal, stats)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        if async_client is not None:
+            await async_client.close()
+
+def apply_group_content(cells, content, journal: ProgressJournal, stats: dict, call: dict = None) -> list:
+    """
+    Validate the response content for a group of cells through the same parsers the
+    interactive paths use and record the results. Returns the cells still unanswered.
+    """
+    sl_level, _, _, control, _ = cells[0]
+    if content is None:
+        return list(cells)
+    note_evidence(content, [cell[4] for cell in cells])
+    if len(cells) > 1:
+        results = parse_multi_lab_response(content, [cell[4] for cell in cells], control["name"], call)
+        leftovers = []
+        for cell in cells:
+            if cell[4] in results:
+                record_result(journal, cell, results[cell[4]], stats)
+            else:
+                leftovers.append(cell)
+        return leftovers
+    record_result(journal, cells[0], parse_compliance_response(content, control["name"], call), stats)
+    return []
+
+def run_message_batch(groups, compliance_data, journal: ProgressJournal, stats: dict, state_path: str):
+    """
+    Process pending groups through the Message Batches API (--batch). Cached answers are
+    applied directly; the rest are submitted as one batch. With --multi-lab, labs whose
+    entry failed validation are resubmitted as a second batch of single-lab requests.
+    """
+    controls = index_controls(compliance_data)
+
+    def cells_for(meta):
+        control = controls[(meta["level"], meta["category"], meta["subcategory"], meta["control"])]
+        return [(meta["level"], meta["category"], meta["subcategory"], control, lab) for lab in meta["labs"]]
+
+    while groups:
+        requests = {}
+        leftovers = []
+        for group in groups:
+            sl_level, category_name, subcategory_name, control, _ = group[0]
+            labs = [cell[4] for cell in group]
+            _, _, params = build_group_request(group)
+            try:
+                content = response_cache.lookup(params) if response_cache else None
+            except CacheMissError:
+                print(f"Cache miss for SL{sl_level} - '{control['name']}' (--cache-only), leaving cells unchanged.", file=sys.stderr)
+                stats["queries_failed"] += len(group)
+                continue
+            if content is not None:
+                leftovers.extend(apply_group_content(group, content, journal, stats))
+                continue
+            meta = {"level": sl_level, "category": category_name, "subcategory": subcategory_name,
+                    "control": control["name"], "labs": labs}
+            requests[f"cell-{len(requests)}"] = {"params": params, "meta": meta}
+
+        for meta, params, message in run_batch(get_client(), limiter, requests, state_path):
+            stats["queries_made"] += 1
+            content = message.content if message is not None else None
+            if message is not None:
+                record_usage(message.usage)
+                if response_cache:
+                    response_cache.store(params, content)
+            cells = cells_for(meta)
+            kind = "multi_lab" if len(cells) > 1 else "single_lab" if "tools" in params else "rescore"
+            call = telemetry.batch_record(kind, f"SL{meta['level']} - {', '.join(meta['labs'])} - '{meta['control']}'",
+                                          message, level=meta["level"], labs=meta["labs"], control=meta["control"])
+            unanswered = apply_group_content(cells, content, journal, stats, call)
+            telemetry.add(call)
+            if content is None:
+                stats["queries_failed"] += len(unanswered)
+            elif len(cells) > 1:
+                leftovers.extend(unanswered)
+
+        # Second round: single-lab requests for labs a multi-lab answer did not cover
+        groups = [[cell] for cell in leftovers]
+        if groups:
+            print(f"Resubmitting {len(groups)} cells as single-lab requests...")
+
+
 # --- Main script execution ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate AI lab security compliance data.")
     parser.add_argument("--limit", type=int, help="Limit the number of controls to process for testing.")
     parser.add_argument("--all", action="store_true", help="Process all controls, even those with existing data.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of concurrent API workers (default: 1, sequential).")
+    parser.add_argument("--batch", action="store_true", help="Submit all pending cells as one Message Batch job and wait for the results.")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and finish each cell as soon as its result JSON closes (ignored with --batch).")
+    parser.add_argument("--multi-lab", action="store_true", help="Score all pending labs for a control in one request, falling back to single-lab queries for invalid entries.")
+    parser.add_argument("--shard", type=parse_shard, help="Only process shard i of n (e.g. 2/4); output goes to a per-shard file unless --output is given.")
+    parser.add_argument("--max-age", type=parse_max_age, help="Also re-query processed cells fetched longer ago than this (e.g. 30d, 12h, 2w); stalest cells go first.")
+    parser.add_argument("--levels", type=lambda value: [int(level) for level in comma_list(value)], help="Only process these SL levels, e.g. 4,5.")
+    parser.add_argument("--labs", type=comma_list, help="Only process these labs, e.g. OpenAI,Meta.")
+    parser.add_argument("--categories", type=comma_list, help="Only process these categories, e.g. 'Weight Security,Network Security'.")
+    parser.add_argument("--output", help=f"Write results to this file instead of '{INPUT_OUTPUT_FILE}'.")
+    parser.add_argument("--no-export", action="store_true", help=f"Don't refresh the heatmap's score matrix and detail shards after updating '{INPUT_OUTPUT_FILE}'.")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    add_evidence_arguments(parser)
+    parser.add_argument("--rescore", action="store_true",
+                        help="Score cells from passages in the evidence corpus instead of new web searches; cells with too little evidence still search live.")
+    parser.add_argument("--min-evidence", type=int, default=MIN_EVIDENCE_PASSAGES,
+                        help=f"With --rescore, passages about the lab a cell needs to skip the live search (default: {MIN_EVIDENCE_PASSAGES}).")
+    subparsers = parser.add_subparsers(dest="command")
+    plan_parser = subparsers.add_parser("plan", help="List the cells a run with the same options would query and estimate its "
+                                                     "tokens, searches, cost and wall time, without calling the API.")
+    plan_parser.add_argument("--list", action="store_true", help="List every planned request.")
+    merge_parser = subparsers.add_parser("merge", help="Merge shard outputs into one compliance data file.")
+    merge_parser.add_argument("shard_files", nargs="+", help="Shard output files written by --shard runs.")
+    merge_parser.add_argument("--base", default=INPUT_OUTPUT_FILE, help=f"File the shards were started from (default: {INPUT_OUTPUT_FILE}).")
+    merge_parser.add_argument("--output", default=argparse.SUPPRESS, help="Merged output file (default: the --base file).")
+    merge_parser.add_argument("--on-conflict", choices=["fail", "first", "last"], default="fail",
+                              help="How to resolve a cell changed differently by several shards (default: fail, nothing is written).")
+    backfill_parser = subparsers.add_parser("backfill", help="Stamp answered cells that have no fetch stamp, so --max-age can age them.")
+    backfill_parser.add_argument("--fetched-at", type=parse_timestamp, help=f"When those cells were fetched, as an ISO date or time "
+                                                                              f"(default: when '{INPUT_OUTPUT_FILE}' was last committed).")
+    backfill_parser.add_argument("--model", default=CLAUDE_MODEL, help=f"Model recorded for those cells (default: {CLAUDE_MODEL}).")
     args = parser.parse_args()
+    if args.rescore and args.multi_lab:
+        parser.error("--rescore scores cells one at a time; drop --multi-lab")
+    if args.rescore and args.no_evidence:
+        parser.error("--rescore needs the evidence corpus; drop --no-evidence")
+
+    if args.command == "merge":
+        merge_output = args.output or args.base
+        source_registry = SourceRegistry(SOURCES_FILE)
+        base_data = load_compliance_file(args.base)
+        shard_data = {shard_file: load_compliance_file(shard_file) for shard_file in args.shard_files}
+        try:
+            merged, conflicts = merge_shards(base_data, shard_data, AI_LABS, args.on_conflict)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        for conflict in conflicts:
+            print(f"Conflict: SL{conflict['level']} - {conflict['lab']} - '{conflict['control']}' "
+                  f"({conflict['cell_id']}) changed by {', '.join(conflict['shards'])}", file=sys.stderr)
+        if conflicts and args.on_conflict == "fail":
+            print(f"{len(conflicts)} conflicting cells; nothing written. Re-run with --on-conflict first|last to resolve.", file=sys.stderr)
+            sys.exit(1)
+        save_compliance_data(merged, merge_output, source_registry)
+        print(f"Merged {len(args.shard_files)} shards into '{merge_output}'.")
+        if merge_output == INPUT_OUTPUT_FILE and not args.no_export:
+            print("Exported heatmap data:")
+            print_export_summary(export_compliance(merged, source_registry, labs=AI_LABS))
+        sys.exit(0)
+
+    if args.command == "backfill":
+        backfill_output = args.output or INPUT_OUTPUT_FILE
+        fetched_at = args.fetched_at or last_commit_time(INPUT_OUTPUT_FILE)
+        if fetched_at is None:
+            print(f"Error: no git history for '{INPUT_OUTPUT_FILE}'; pass --fetched-at.", file=sys.stderr)
+            sys.exit(1)
+        source_registry = SourceRegistry(SOURCES_FILE)
+        compliance_data = load_compliance_file(INPUT_OUTPUT_FILE)
+        stamped = backfill_stamps(compliance_data, fetched_at, args.model)
+        if not stamped:
+            print("Every answered cell already has a fetch stamp; nothing written.")
+            sys.exit(0)
+        save_compliance_data(compliance_data, backfill_output, source_registry)
+        print(f"Stamped {stamped} cells as fetched at {fetched_at.isoformat(timespec='seconds')} by {args.model} in '{backfill_output}'.")
+        if backfill_output == INPUT_OUTPUT_FILE and not args.no_export:
+            print("Exported heatmap data:")
+            print_export_summary(export_compliance(compliance_data, source_registry, labs=AI_LABS))
+        sys.exit(0)
+
+    response_cache = cache_from_args(args)
+    use_streaming = args.stream
+    evidence_corpus = evidence_from_args(args)
+    min_evidence = args.min_evidence if args.rescore else None
+    output_file = args.output or (shard_output_path(INPUT_OUTPUT_FILE, args.shard) if args.shard else INPUT_OUTPUT_FILE)
 
     # Check if the input JSON file exists
     if not os.path.exists(INPUT_OUTPUT_FILE):
         print(f"Error: The input JSON file '{INPUT_OUTPUT_FILE}' does not exist.", file=sys.stderr)
         sys.exit(1)
 
-    # Load existing compliance data from the JSON file
-    compliance_data = []
-    with open(INPUT_OUTPUT_FILE, "r") as f:
-        compliance_data = json.load(f)
-    print(f"Loaded existing compliance data from '{INPUT_OUTPUT_FILE}'.")
+    # Load existing compliance data from the JSON file (or from an earlier run's output, to resume it)
+    input_file = output_file if os.path.exists(output_file) else INPUT_OUTPUT_FILE
+    source_registry = SourceRegistry(SOURCES_FILE)
+    compliance_data = load_compliance_file(input_file)
+    print(f"Loaded existing compliance data from '{input_file}'.")
+    level_descriptions.update({sl_entry["level"]: sl_entry["description"] for sl_entry in compliance_data if sl_entry.get("description")})
+    control_catalogue.update({
+        sl_entry["level"]: [(f"{category['name']} / {subcategory['name']}" if subcategory["name"] else category["name"],
+                             [control["name"] for control in subcategory["controls"]])
+                            for category in sl_entry["categories"] for subcategory in category["subcategories"]]
+        for sl_entry in compliance_data
+    })
+
+    # Replay results journaled by an interrupted run, then fold them into the JSON file
+    journal_path = journal_path_for(output_file)
+    replayed = replay_journal(journal_path, compliance_data)
+    if replayed:
+        print(f"Replayed {replayed} journaled results from '{journal_path}'.")
+        if args.command != "plan":
+            save_progress(compliance_data, output_file, journal_path)
+
+    if args.command == "plan":
+        pending = collect_pending_cells(compliance_data, args.all, args.limit, args.shard,
+                                        args.max_age, args.levels, args.labs, args.categories, verbose=False)
+        print_compliance_plan(group_cells_by_control(pending) if args.multi_lab else [[cell] for cell in pending],
+                              args.concurrency, args.batch, args.list)
+        sys.exit(0)
+
+    telemetry = telemetry_from_args(args, "compliance", CLAUDE_MODEL)
+    limiter.bucket.start_at(args.concurrency)
+    if get_client() is None:
+        print("WARNING: ANTHROPIC_API_KEY environment variable is not set. API calls will be skipped.", file=sys.stderr)
 
     print(f"Starting compliance data generation for {len(AI_LABS)} labs and {len(compliance_data)} SL levels...")
-    total_queries_made = 0
-    controls_processed_count = 0
+    stats = {"queries_made": 0, "queries_failed": 0}
+    pending = collect_pending_cells(compliance_data, args.all, args.limit, args.shard,
+                                    args.max_age, args.levels, args.labs, args.categories)
+    if args.shard:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(pending)} pending cells, writing to '{output_file}'.")
+    journal = ProgressJournal(journal_path)
+    groups = group_cells_by_control(pending) if args.multi_lab else [[cell] for cell in pending]
 
     try: # Wrap the main processing loop in a try-except for KeyboardInterrupt
-        for sl_entry in compliance_data:
-            sl_level = sl_entry["level"]
-            for category in sl_entry["categories"]:
-                for subcategory in category["subcategories"]:
-                    for control in subcategory["controls"]:
-                        # Check if limit is reached before processing the control
-                        if args.limit and controls_processed_count >= args.limit:
-                            print(f"Limit of {args.limit} controls reached. Stopping processing.")
-                            raise KeyboardInterrupt # Use KeyboardInterrupt to trigger final save and exit
-                        
-                        control_name = control["name"]
-                        for lab in AI_LABS:
-                            # Determine if this control/lab combination should be skipped
-                            should_skip = False
-                            if not args.all: # If --all flag is NOT present, check if already processed
-                                lab_compliance = control["compliance"].get(lab)
-                                # Skip if justification is not empty AND not the 'API key not set' message
-                                if lab_compliance and lab_compliance["justification"] and \
-                                   lab_compliance["justification"] != "API key not set, skipping API call.":
-                                    should_skip = True
-
-                            if should_skip:
-                                print(f"Skipping SL{sl_level} - {lab} - '{control_name}' (already processed).")
-                                continue # Skip this specific lab/control if already processed
-
-                            # Only make API call if client is initialized
-                            if client is not None:
-                                print(f"Querying for SL{sl_level} - {lab} - '{control_name}'...")
-                                info = get_compliance_info(lab, control_name, sl_level)
-                                control["compliance"][lab]["score"] = info["score"]
-                                control["compliance"][lab]["justification"] = info["justification"]
-                                control["compliance"][lab]["sources"] = info["sources"]
-                                total_queries_made += 1
-                                # Save after each API call for a specific lab/control
-                                save_progress(compliance_data, INPUT_OUTPUT_FILE)
-                                time.sleep(1) # Small delay to respect API rate limits
-                            else:
-                                print(f"Skipping API call for {lab} - '{control_name}' (API key not set). Compliance data for this control/lab will not be updated from API.")
-                                # Ensure the structure is correct even if skipped, without overwriting existing data if loaded
-                                # Only set if currently empty or if --all is true (to reset it)
-                                if not control["compliance"][lab]["justification"] or args.all:
-                                    control["compliance"][lab]["score"] = 0
-                                    control["compliance"][lab]["justification"] = "API key not set, skipping API call."
-                                    control["compliance"][lab]["sources"] = []
-                        
-                        controls_processed_count += 1
+        if get_client() is None and not args.cache_only:
+            for sl_level, _, _, control, lab in pending:
+                print(f"Skipping API call for {lab} - '{control['name']}' (API key not set). Compliance data for this control/lab will not be updated from API.")
+                # Ensure the structure is correct even if skipped, without overwriting existing data if loaded
+                # Only set if currently empty or if --all is true (to reset it)
+                if not control["compliance"][lab]["justification"] or args.all:
+                    apply_compliance_info(control, lab, {"score": 0, "justification": API_KEY_MISSING_JUSTIFICATION, "sources": []})
+        elif args.batch:
+            if get_client() is None:
+                print("Error: --batch requires ANTHROPIC_API_KEY to be set.", file=sys.stderr)
+            else:
+                run_message_batch(groups, compliance_data, journal, stats, batch_state_path_for(output_file))
+        elif args.concurrency > 1:
+            print(f"Running {len(groups)} query groups with {args.concurrency} concurrent workers...")
+            asyncio.run(run_concurrent(groups, journal, args.concurrency, stats))
+        else:
+            run_sequential(groups, journal, stats)
     except KeyboardInterrupt:
         print("\nProcess interrupted by user (Ctrl+C). Saving current progress...")
-        # Progress is already saved after each call, so this just ensures a final message.
+        # Results are already journaled after each call, so this just ensures a final message.
+    except CircuitOpenError as e:
+        print(f"\nStopping: {e}. Re-run later to resume from the saved progress.", file=sys.stderr)
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}", file=sys.stderr)
     finally:
-        # Final save in case any last updates before interruption/error (though per-call save is primary)
-        save_progress(compliance_data, INPUT_OUTPUT_FILE) 
+        # Compact the journal into the JSON file (the journal alone is enough to resume if this fails)
+        journal.close()
+        if evidence_corpus is not None:
+            evidence_corpus.compact()
+        save_progress(compliance_data, output_file, journal_path)
 
     print(f"\nProcessing complete.")
-    print(f"Total API queries made: {total_queries_made}")
+    print(f"Total API queries made: {stats['queries_made']}")
+    print(format_token_usage())
+    if stream_timings:
+        print(format_stream_timings())
+    if response_cache:
+        print(response_cache.summary())
+    if evidence_corpus is not None:
+        print(evidence_corpus.summary())
+    telemetry.close()
+    print(telemetry.summary())
+    if args.prometheus:
+        telemetry.write_prometheus(args.prometheus)
+        print(f"Prometheus metrics written to '{args.prometheus}'.")
+    if stats["queries_failed"]:
+        print(f"Failed queries (left unchanged, retried on next run): {stats['queries_failed']}")
     if args.limit:
-        print(f"Processed {controls_processed_count} controls (limited by --limit {args.limit}).")
-    print(f"Final updated compliance data saved to '{INPUT_OUTPUT_FILE}'.")
+        print(f"Processed at most {args.limit} controls (limited by --limit {args.limit}).")
+    print(f"Final updated compliance data saved to '{output_file}'.")
+    # Only the canonical file feeds the heatmap; shard and --output runs are exported after merging
+    if output_file == INPUT_OUTPUT_FILE and not args.no_export:
+        print("Exported heatmap data:")
+        print_export_summary(export_compliance(compliance_data, source_registry, labs=AI_LABS))
     print("Remember to review the 'score', 'justification', and 'sources' fields as LLM-generated content may vary and require manual verification.")
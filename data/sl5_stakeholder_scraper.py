@@ -5,24 +5,59 @@ Gathers comprehensive information about AI labs, contractors, security personnel
 using Claude API with web search capabilities.
 """
 
-import json
 import anthropic
-import time
 import argparse
 import os
 import sys
-import re
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rate_limiter import RateLimiter, CircuitOpenError
+from response_cache import CacheMissError, add_cache_arguments, cache_from_args
+from message_batches import batch_state_path_for, run_batch
+from json_extract import first_json_object, response_text
+from raw_results import RawResultStore, raw_results_path_for
+from freshness import cutoff_for, parse_max_age
+from progress_journal import atomic_write_json
+from serialization import load_file
+from validation import ValidationError, validate_network
+from network_merge import OVERWRITABLE_FIELDS, build_delta_file, delta_path_for, merge_network
+from graph_layout import apply_layout
+from graph_analytics import apply_analytics
+from source_registry import (SOURCES_FILE, SourceRegistry, expand_node_sources, intern_node_sources, search_result_titles,
+                             sources_path_for)
+from evidence_corpus import add_evidence_arguments, evidence_from_args
+from run_planner import estimate_run, is_cached, plan_entry_label, print_plan
+from telemetry import (NO_JSON, VALID, Telemetry, add_telemetry_arguments, counting_attempts, note_cache_hit,
+                       note_outcome, note_response, telemetry_from_args)
+from entity_resolution import ORGANIZATION, PERSON, AliasMatcher, EntityResolver, LinkSet, merge_node, slugify
 
 # --- Configuration ---
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 OUTPUT_FILE = "data/sl5-stakeholder-network.json"
+# Stored raw results older than this are searched again (--max-age); long enough to resume an interrupted run
+DEFAULT_MAX_AGE = timedelta(days=1)
+# Network files whose sources go in the shared registry (data/sources.json); any other
+# --output gets a registry of its own next to it
+SHARED_REGISTRY_OUTPUTS = [OUTPUT_FILE, "public/stakeholder-map/data/sl5-stakeholder-network.json"]
 
 # Primary AI Labs to investigate
 AI_LABS = ["OpenAI", "Anthropic", "Google DeepMind", "xAI", "Meta AI"]
 
+# Other names the labs go by in search results, used to link contractors to the labs their
+# projects and descriptions mention (all-caps aliases only match in capitals)
+LAB_ALIASES = {
+    "OpenAI": ["Open AI"],
+    "Anthropic": [],
+    "Google DeepMind": ["DeepMind", "Google", "Google Brain"],
+    "xAI": ["X.AI"],
+    "Meta AI": ["Meta", "Facebook", "FAIR"],
+}
+
 # Categories of stakeholders to research
 STAKEHOLDER_CATEGORIES = [
     "datacenter_contractors",
@@ -33,13 +68,142 @@ STAKEHOLDER_CATEGORIES = [
     "security_contractors"
 ]
 
-# Initialize Anthropic client
+# Searches in flight at once (the shared limiter still paces the actual requests)
+DEFAULT_CONCURRENCY = 8
+
+# Web search tool definition shared by every stakeholder search
+WEB_SEARCH_TOOL = {
+    "type": "web_search_20250305",
+    "name": "web_search",
+    "max_uses": 5
+}
+
+# Instructions and JSON schemas shared by every search, marked as a cached system prefix. At ~680 tokens
+# it is below the API's 1024-token minimum, so it is billed as input (a run makes ~16 searches)
+STAKEHOLDER_SYSTEM_PROMPT = """You research the stakeholder network around frontier AI labs for the SL5 (Security Level 5) project, which follows the RAND report "Securing AI Model Weights". Use web search to find publicly reported, verifiable information and cite the URLs you relied on in each entry's "sources".
+
+Respond with a single JSON object within a ```json code block, following the schema named in the request. Use empty arrays when nothing is found, and omit fields you cannot fill rather than guessing.
+
+Schema "contractors":
+{
+    "contractors": [
+        {
+            "name": "Company Name",
+            "description": "Brief description including specializations",
+            "projects": ["Project details"],
+            "specializations": ["SCIF", "Hyperscale", etc],
+            "contract_value": "If known",
+            "other_clients": ["Other AI labs they work with"],
+            "url": "Company website",
+            "sources": ["URL1", "URL2"]
+        }
+    ]
+}
+
+Schema "security_staff":
+{
+    "security_staff": [
+        {
+            "name": "Full Name",
+            "title": "Official Title",
+            "description": "Background and responsibilities",
+            "previous_roles": ["Previous positions"],
+            "linkedin": "LinkedIn URL if available",
+            "initiatives": ["Key security initiatives"],
+            "sources": ["URL1", "URL2"]
+        }
+    ]
+}
+
+Schema "infrastructure":
+{
+    "infrastructure": {
+        "cloud_providers": [
+            {
+                "name": "Provider name",
+                "relationship": "Description of partnership",
+                "services": ["Specific services used"],
+                "scale": "Size/scale if known",
+                "sources": ["URLs"]
+            }
+        ],
+        "datacenters": [
+            {
+                "location": "City, State/Country",
+                "size": "MW or sq ft",
+                "contractor": "Who built it",
+                "special_features": ["SCIF", "Air-gapped", etc],
+                "sources": ["URLs"]
+            }
+        ],
+        "power_cooling": [
+            {
+                "vendor": "Company name",
+                "services": "What they provide",
+                "projects": ["Specific projects"],
+                "sources": ["URLs"]
+            }
+        ]
+    }
+}
+
+Schema "specialized_contractors":
+{
+    "specialized_contractors": [
+        {
+            "name": "Company name",
+            "specialty": "What they specialize in",
+            "ai_projects": ["Known AI lab projects"],
+            "background": "Company background",
+            "certifications": ["Security clearances, certifications"],
+            "url": "Website",
+            "sources": ["URLs"]
+        }
+    ]
+}"""
+
+# Anthropic client, created on first use by get_client() so the module imports without a key
+# SDK-level retries are disabled; the shared limiter owns retries, backoff and pacing
 client = None
-if ANTHROPIC_API_KEY:
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-else:
-    print("ERROR: ANTHROPIC_API_KEY environment variable is not set.", file=sys.stderr)
-    sys.exit(1)
+limiter = RateLimiter()
+# Response cache; configured from the command line in main()
+response_cache = None
+# Token counts reported by the API (cache_* show how much of the prefix was written/read from the prompt cache)
+token_usage = {"input_tokens": 0, "output_tokens": 0, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+usage_lock = threading.Lock()
+# Raw search results, persisted as they arrive; opened in main()
+raw_store = None
+# Stored results fetched before this are searched again (None: every stored result counts, as in rebuild); set in main()
+stored_since = None
+# Interned source registry (data/sources.json); loaded in main()
+source_registry = None
+# Per-call metrics (wall time, tokens, searches, retries, parse outcome); configured in main()
+telemetry = Telemetry("stakeholder", CLAUDE_MODEL)
+# Evidence corpus the search results of every answer are added to; opened in main()
+evidence_corpus = None
+
+def fresh_result(lab: Optional[str], kind: str) -> Optional[Dict]:
+    """The stored result for a search if it was fetched within --max-age, else None (search it again)."""
+    return raw_store.get(lab, kind, since=stored_since)
+
+def registry_for_output(output_file: str) -> SourceRegistry:
+    """
+    The shared source registry for the repo's own network files. Any other output gets a
+    registry next to it, seeded from the shared one so known titles carry over, and
+    data/sources.json is left alone.
+    """
+    if os.path.abspath(output_file) in {os.path.abspath(path) for path in SHARED_REGISTRY_OUTPUTS}:
+        return SourceRegistry(SOURCES_FILE)
+    registry = SourceRegistry(sources_path_for(output_file))
+    registry.update(SourceRegistry(SOURCES_FILE).entries.values())
+    return registry
+
+def get_client():
+    """The shared Anthropic client, created on first use; None when ANTHROPIC_API_KEY is not set."""
+    global client
+    if client is None and ANTHROPIC_API_KEY:
+        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+    return client
 
 def create_node(node_id: str, name: str, category: str, description: str = "", 
                 size: int = 20, url: str = "", research: List[str] = None, 
@@ -65,33 +229,89 @@ def create_link(source: str, target: str, strength: int = 3) -> Dict:
     }
 
 def parse_json_from_response(text: str) -> Optional[Dict]:
-    """Extract JSON from Claude's response, handling markdown code blocks."""
-    # Try to find JSON in code blocks first
-    json_pattern = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
-    match = json_pattern.search(text)
-    
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            print(f"Failed to parse JSON from code block", file=sys.stderr)
-    
-    # Try to find raw JSON in the text
+    """Return the first non-empty JSON object in Claude's response text (fenced or bare)."""
+    return first_json_object(text, bool)
+
+def record_usage(usage):
+    """Add the token counts from a response's `usage` to the run totals."""
+    if usage is None:
+        return
+    with usage_lock:
+        for field in token_usage:
+            token_usage[field] += getattr(usage, field, None) or 0
+
+def build_search_request(query_prompt: str) -> Dict:
+    """Keyword arguments for messages.create for one web-search prompt."""
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 2048,
+        "system": [{"type": "text", "text": STAKEHOLDER_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": query_prompt}],
+        "tools": [WEB_SEARCH_TOOL]
+    }
+
+def extract_search_result(content, call: Dict = None, lab: Optional[str] = None) -> Optional[Dict]:
+    """
+    Return the first JSON object found in the text blocks of a response, or None if the
+    answer has none (NO_JSON). The parse outcome is noted on the telemetry record `call`,
+    if given, and the search results go to the evidence corpus tagged with `lab`.
+    """
+    if source_registry is not None:
+        source_registry.note_titles(search_result_titles(content))
+    if evidence_corpus is not None:
+        evidence_corpus.add(content, [lab] if lab else [])
+    # Citations split the answer over several text blocks, so search the joined text
+    result = parse_json_from_response(response_text(content))
+    note_outcome(call, VALID if result else NO_JSON)
+    return result or None
+
+def run_web_search(query_prompt: str, empty_result: Dict, description: str) -> Dict:
+    """
+    Send a web-search prompt to Claude under the shared rate limiter and return the first
+    JSON object found in the response text, or `empty_result` if none could be obtained.
+    CircuitOpenError propagates so the caller can stop the run instead of collecting empties.
+    """
+    result = fetch_search_result(query_prompt, description)
+    return empty_result if result is None else result
+
+def fetch_search_result(query_prompt: str, description: str, kind: str = "search",
+                        lab: Optional[str] = None) -> Optional[Dict]:
+    """
+    Like run_web_search, but returns None when the search failed or its answer had no JSON.
+    Only answers with JSON are written to the response cache, so a retry asks again.
+    """
+    request = build_search_request(query_prompt)
     try:
-        # Find JSON-like structures
-        json_start = text.find('{')
-        if json_start >= 0:
-            json_end = text.rfind('}') + 1
-            if json_end > json_start:
-                return json.loads(text[json_start:json_end])
-    except json.JSONDecodeError:
-        pass
-    
-    return None
+        with telemetry.call(kind, description, lab=lab) as call:
+            content = response_cache.lookup(request) if response_cache else None
+            cached = content is not None
+            if not cached:
+                response = limiter.call(counting_attempts(call, get_client().messages.create), **request)
+                record_usage(response.usage)
+                note_response(call, response)
+                content = response.content
+            else:
+                note_cache_hit(call)
+            
+            result = extract_search_result(content, call, lab)
+            if result is None:
+                print(f"No JSON in the answer searching {description}.", file=sys.stderr)
+            elif response_cache and not cached:
+                response_cache.store(request, content)
+            return result
+        
+    except CacheMissError:
+        print(f"Cache miss searching {description} (--cache-only).", file=sys.stderr)
+        return None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error searching {description}: {e}", file=sys.stderr)
+        return None
 
-def search_datacenter_contractors(ai_lab: str) -> Dict:
-    """Search for datacenter contractors working with a specific AI lab."""
-    query_prompt = f"""
+def datacenter_contractors_prompt(ai_lab: str) -> str:
+    """Prompt for search_datacenter_contractors()."""
+    return f"""
     Search for information about datacenter construction contractors working with {ai_lab}. 
     Focus on:
     1. Which contractors are building datacenters for {ai_lab}
@@ -102,50 +322,16 @@ def search_datacenter_contractors(ai_lab: str) -> Dict:
     
     For Meta specifically, find information about their 5GW datacenter projects and contractors.
     
-    Provide response as JSON with this structure:
-    {{
-        "contractors": [
-            {{
-                "name": "Company Name",
-                "description": "Brief description including specializations",
-                "projects": ["Project details"],
-                "specializations": ["SCIF", "Hyperscale", etc],
-                "contract_value": "If known",
-                "other_clients": ["Other AI labs they work with"],
-                "url": "Company website",
-                "sources": ["URL1", "URL2"]
-            }}
-        ]
-    }}
+    Provide response as JSON following the "contractors" schema.
     """
-    
-    try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2048,
-            messages=[{"role": "user", "content": query_prompt}],
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }]
-        )
-        
-        for content_block in response.content:
-            if content_block.type == "text":
-                result = parse_json_from_response(content_block.text)
-                if result:
-                    return result
-        
-        return {"contractors": []}
-        
-    except Exception as e:
-        print(f"Error searching contractors for {ai_lab}: {e}", file=sys.stderr)
-        return {"contractors": []}
 
-def search_security_personnel(ai_lab: str) -> Dict:
-    """Search for senior security staff at AI labs."""
-    query_prompt = f"""
+def search_datacenter_contractors(ai_lab: str) -> Dict:
+    """Search for datacenter contractors working with a specific AI lab."""
+    return run_web_search(datacenter_contractors_prompt(ai_lab), {"contractors": []}, f"contractors for {ai_lab}")
+
+def security_personnel_prompt(ai_lab: str) -> str:
+    """Prompt for search_security_personnel()."""
+    return f"""
     Search for information about senior security personnel at {ai_lab}. 
     Focus on:
     1. Chief Information Security Officer (CISO)
@@ -161,49 +347,16 @@ def search_security_personnel(ai_lab: str) -> Dict:
     - Key responsibilities
     - Notable security initiatives they've led
     
-    Provide response as JSON:
-    {{
-        "security_staff": [
-            {{
-                "name": "Full Name",
-                "title": "Official Title",
-                "description": "Background and responsibilities",
-                "previous_roles": ["Previous positions"],
-                "linkedin": "LinkedIn URL if available",
-                "initiatives": ["Key security initiatives"],
-                "sources": ["URL1", "URL2"]
-            }}
-        ]
-    }}
+    Provide response as JSON following the "security_staff" schema.
     """
-    
-    try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2048,
-            messages=[{"role": "user", "content": query_prompt}],
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }]
-        )
-        
-        for content_block in response.content:
-            if content_block.type == "text":
-                result = parse_json_from_response(content_block.text)
-                if result:
-                    return result
-        
-        return {"security_staff": []}
-        
-    except Exception as e:
-        print(f"Error searching security personnel for {ai_lab}: {e}", file=sys.stderr)
-        return {"security_staff": []}
 
-def search_infrastructure_relationships(ai_lab: str) -> Dict:
-    """Search for cloud infrastructure and datacenter relationships."""
-    query_prompt = f"""
+def search_security_personnel(ai_lab: str) -> Dict:
+    """Search for senior security staff at AI labs."""
+    return run_web_search(security_personnel_prompt(ai_lab), {"security_staff": []}, f"security personnel for {ai_lab}")
+
+def infrastructure_relationships_prompt(ai_lab: str) -> str:
+    """Prompt for search_infrastructure_relationships()."""
+    return f"""
     Search for detailed information about {ai_lab}'s infrastructure partnerships:
     1. Cloud service providers (AWS, Azure, GCP, etc.)
     2. Colocation facilities used
@@ -219,66 +372,16 @@ def search_infrastructure_relationships(ai_lab: str) -> Dict:
     - Cooling and power infrastructure vendors
     - Special security requirements (SCIF, air-gapped facilities)
     
-    Provide response as JSON:
-    {{
-        "infrastructure": {{
-            "cloud_providers": [
-                {{
-                    "name": "Provider name",
-                    "relationship": "Description of partnership",
-                    "services": ["Specific services used"],
-                    "scale": "Size/scale if known",
-                    "sources": ["URLs"]
-                }}
-            ],
-            "datacenters": [
-                {{
-                    "location": "City, State/Country",
-                    "size": "MW or sq ft",
-                    "contractor": "Who built it",
-                    "special_features": ["SCIF", "Air-gapped", etc],
-                    "sources": ["URLs"]
-                }}
-            ],
-            "power_cooling": [
-                {{
-                    "vendor": "Company name",
-                    "services": "What they provide",
-                    "projects": ["Specific projects"],
-                    "sources": ["URLs"]
-                }}
-            ]
-        }}
-    }}
+    Provide response as JSON following the "infrastructure" schema.
     """
-    
-    try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2048,
-            messages=[{"role": "user", "content": query_prompt}],
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }]
-        )
-        
-        for content_block in response.content:
-            if content_block.type == "text":
-                result = parse_json_from_response(content_block.text)
-                if result:
-                    return result
-        
-        return {"infrastructure": {"cloud_providers": [], "datacenters": [], "power_cooling": []}}
-        
-    except Exception as e:
-        print(f"Error searching infrastructure for {ai_lab}: {e}", file=sys.stderr)
-        return {"infrastructure": {"cloud_providers": [], "datacenters": [], "power_cooling": []}}
 
-def search_hidden_relationships() -> Dict:
-    """Search for less obvious relationships and contractors in the AI infrastructure space."""
-    query_prompt = """
+def search_infrastructure_relationships(ai_lab: str) -> Dict:
+    """Search for cloud infrastructure and datacenter relationships."""
+    return run_web_search(infrastructure_relationships_prompt(ai_lab), {"infrastructure": {"cloud_providers": [], "datacenters": [], "power_cooling": []}}, f"infrastructure for {ai_lab}")
+
+def hidden_relationships_prompt() -> str:
+    """Prompt for search_hidden_relationships()."""
+    return """
     Search for lesser-known contractors and relationships in AI datacenter construction:
     1. Specialized SCIF contractors working on AI facilities
     2. Security system integrators for AI labs
@@ -294,54 +397,130 @@ def search_hidden_relationships() -> Dict:
     - Specialized engineering firms
     - Recent contract awards not widely publicized
     
-    Provide response as JSON:
-    {{
-        "specialized_contractors": [
-            {{
-                "name": "Company name",
-                "specialty": "What they specialize in",
-                "ai_projects": ["Known AI lab projects"],
-                "background": "Company background",
-                "certifications": ["Security clearances, certifications"],
-                "url": "Website",
-                "sources": ["URLs"]
-            }}
-        ]
-    }}
+    Provide response as JSON following the "specialized_contractors" schema.
     """
+
+def search_hidden_relationships() -> Dict:
+    """Search for less obvious relationships and contractors in the AI infrastructure space."""
+    return run_web_search(hidden_relationships_prompt(), {"specialized_contractors": []}, "hidden relationships")
+
+# Per-lab searches, keyed by the result field each one fills in lab_data
+LAB_SEARCHES = {
+    "contractors": (datacenter_contractors_prompt, {"contractors": []}),
+    "security_staff": (security_personnel_prompt, {"security_staff": []}),
+    "infrastructure": (infrastructure_relationships_prompt, {"infrastructure": {"cloud_providers": [], "datacenters": [], "power_cooling": []}}),
+}
+# Node categories each search produces (used to scope --prune to what was re-searched)
+SEARCH_CATEGORIES = {
+    "contractors": {"contractors"},
+    "security_staff": {"security_personnel"},
+    "infrastructure": {"cloud_infrastructure", "power_infrastructure"},
+    "specialized": {"contractors", "security_contractors"},
+}
+
+def merge_search_result(all_data: Dict, lab: Optional[str], kind: str, result: Dict):
+    """Store one search result in all_data; empty results are dropped, as before."""
+    if kind == "specialized":
+        if result.get("specialized_contractors"):
+            all_data["specialized"] = result
+    elif result.get(kind):
+        all_data.setdefault(lab, {})[kind] = result[kind]
+
+def describe_search_result(kind: str, result: Dict) -> str:
+    """Short 'found ...' summary of one search result for progress output."""
+    if kind == "infrastructure":
+        infrastructure = result.get("infrastructure") or {}
+        return (f"{len(infrastructure.get('cloud_providers', []))} cloud providers, "
+                f"{len(infrastructure.get('datacenters', []))} datacenters, "
+                f"{len(infrastructure.get('power_cooling', []))} power/cooling vendors")
+    field = "specialized_contractors" if kind == "specialized" else kind
+    return f"{len(result.get(field) or [])} {field.replace('_', ' ')}"
+
+def collect_with_message_batch(labs_to_process: List[str], skip_hidden: bool, state_path: str) -> Dict:
+    """
+    Run every lab search (plus the hidden-relationships search) as one Message Batch job
+    and assemble the same all_data structure the interactive path builds. Answers without
+    JSON are neither stored nor cached, so the next run searches again.
+    """
+    all_data = {lab: {} for lab in labs_to_process}
+    searches = [(lab, kind, prompt_fn(lab)) for lab in labs_to_process for kind, (prompt_fn, _) in LAB_SEARCHES.items()]
+    if not skip_hidden:
+        searches.append((None, "specialized", hidden_relationships_prompt()))
     
-    try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2048,
-            messages=[{"role": "user", "content": query_prompt}],
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }]
-        )
-        
-        for content_block in response.content:
-            if content_block.type == "text":
-                result = parse_json_from_response(content_block.text)
-                if result:
-                    return result
-        
-        return {"specialized_contractors": []}
-        
-    except Exception as e:
-        print(f"Error searching hidden relationships: {e}", file=sys.stderr)
-        return {"specialized_contractors": []}
+    def merge(meta: Dict, result: Dict):
+        merge_search_result(all_data, meta["lab"], meta["kind"], result)
+    
+    def merge_new(meta: Dict, result: Dict):
+        raw_store.put(meta["lab"], meta["kind"], result, CLAUDE_MODEL)
+        merge(meta, result)
+    
+    requests = {}
+    for lab, kind, query_prompt in searches:
+        params = build_search_request(query_prompt)
+        meta = {"lab": lab, "kind": kind}
+        stored = fresh_result(lab, kind)
+        if stored is not None:
+            merge(meta, stored)
+            continue
+        try:
+            content = response_cache.lookup(params) if response_cache else None
+        except CacheMissError:
+            print(f"Cache miss for {kind} search ({lab or 'all labs'}) (--cache-only).", file=sys.stderr)
+            continue
+        result = extract_search_result(content, lab=lab) if content is not None else None
+        if result is not None:
+            merge_new(meta, result)
+        else:
+            requests[f"search-{len(requests)}"] = {"params": params, "meta": meta}
+    
+    for meta, params, message in run_batch(get_client(), limiter, requests, state_path):
+        call = telemetry.batch_record(meta["kind"], f"{meta['kind']} for {meta['lab'] or 'all labs'}", message, lab=meta["lab"])
+        if message is None:
+            telemetry.add(call)
+            continue
+        record_usage(message.usage)
+        result = extract_search_result(message.content, call, meta["lab"])
+        if result is not None:
+            if response_cache:
+                response_cache.store(params, message.content)
+            merge_new(meta, result)
+        else:
+            print(f"No JSON in the answer for {meta['kind']} for {meta['lab'] or 'all labs'}; the next run retries it.",
+                  file=sys.stderr)
+        telemetry.add(call)
+    
+    # Keep the "specialized" entry last, as the interactive path does
+    if "specialized" in all_data:
+        all_data["specialized"] = all_data.pop("specialized")
+    return all_data
 
-def build_network_data(all_data: Dict) -> Tuple[List[Dict], List[Dict]]:
-    """Convert collected data into nodes and links for the network visualization."""
-    nodes = []
-    links = []
-    node_ids = set()
+def build_network_data(all_data: Dict, known_lab_ids: Iterable[str] = ()) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Convert collected data into nodes and links for the network visualization.
+    Every mention goes through entity resolution, so the same company or person found by
+    several searches becomes one node, and repeated edges become one weighted link.
+    `known_lab_ids` are lab nodes of the network this is merged into, which the
+    hidden-relationship contractors may link to even if their lab wasn't searched now.
+    """
+    known_lab_ids = set(known_lab_ids)
+    resolver = EntityResolver()
+    lab_matcher = AliasMatcher({lab: LAB_ALIASES.get(lab, []) for lab in AI_LABS})
+    nodes = {}
+    links = LinkSet()
+    
+    def add_entity(name: str, kind: str, category: str, description: str, size: int, url: str,
+                   research: List[str], source_urls: List[str]) -> str:
+        entity_id, _ = resolver.resolve(name, kind)
+        sources = [{"text": f"Source {i+1}", "url": url} for i, url in enumerate(source_urls or [])]
+        node = create_node(entity_id, name, category, description, size, url, research, sources)
+        if entity_id in nodes:
+            merge_node(nodes[entity_id], node)
+        else:
+            nodes[entity_id] = node
+        return entity_id
     
     # Add SL5 core node
-    nodes.append(create_node(
+    nodes["sl5-core"] = create_node(
         "sl5-core",
         "SL5 Project",
         "core",
@@ -350,233 +529,267 @@ def build_network_data(all_data: Dict) -> Tuple[List[Dict], List[Dict]]:
         "",
         [],
         [{"text": "RAND Report: Securing AI Model Weights", "url": "https://www.rand.org/pubs/research_reports/RRA2977-1.html"}]
-    ))
-    node_ids.add("sl5-core")
+    )
+    resolver.register("sl5-core", "SL5 Project", pinned=True)
+    
+    # Lab nodes are pinned: other names only resolve to them by exact name or alias
+    lab_ids = {}
+    for lab_name in AI_LABS:
+        lab_ids[lab_name] = resolver.register(slugify(lab_name), lab_name, pinned=True)
+    
+    # Create AI lab nodes first, so a lab named in another lab's results links to its lab node
+    # ("specialized" holds the cross-lab search, not a lab)
+    searched_labs = [lab_name for lab_name in all_data if lab_name != "specialized"]
+    for lab_name in searched_labs:
+        if lab_name not in lab_ids:
+            lab_ids[lab_name] = resolver.register(slugify(lab_name), lab_name, pinned=True)
+        lab_id = lab_ids[lab_name]
+        nodes[lab_id] = create_node(
+            lab_id,
+            lab_name,
+            "ai_labs",
+            f"Major AI research lab and model developer",
+            40,
+            "",
+            [],
+            []
+        )
+        links.add("sl5-core", lab_id, 5)
     
     # Process AI labs and their data
-    for lab_name, lab_data in all_data.items():
-        # Create AI lab node
-        lab_id = lab_name.lower().replace(" ", "-").replace(".", "")
-        if lab_id not in node_ids:
-            nodes.append(create_node(
-                lab_id,
-                lab_name,
-                "ai_labs",
-                f"Major AI research lab and model developer",
-                40,
-                "",
-                [],
-                []
-            ))
-            node_ids.add(lab_id)
-            links.append(create_link("sl5-core", lab_id, 5))
+    for lab_name in searched_labs:
+        lab_data = all_data[lab_name]
+        lab_id = lab_ids[lab_name]
         
         # Add contractors
-        if "contractors" in lab_data:
-            for contractor in lab_data["contractors"]:
-                contractor_id = contractor["name"].lower().replace(" ", "-").replace(".", "")
-                if contractor_id not in node_ids:
-                    sources = [{"text": f"Source {i+1}", "url": url} 
-                              for i, url in enumerate(contractor.get("sources", []))]
-                    
-                    nodes.append(create_node(
-                        contractor_id,
-                        contractor["name"],
-                        "contractors",
-                        contractor.get("description", ""),
-                        25,
-                        contractor.get("url", ""),
-                        contractor.get("projects", []),
-                        sources
-                    ))
-                    node_ids.add(contractor_id)
-                
-                links.append(create_link(lab_id, contractor_id, 4))
+        for contractor in lab_data.get("contractors", []):
+            contractor_id = add_entity(
+                contractor["name"], ORGANIZATION, "contractors", contractor.get("description", ""), 25,
+                contractor.get("url", ""), contractor.get("projects", []), contractor.get("sources", [])
+            )
+            links.add(lab_id, contractor_id, 4)
         
         # Add security personnel
-        if "security_staff" in lab_data:
-            for person in lab_data["security_staff"]:
-                person_id = person["name"].lower().replace(" ", "-")
-                if person_id not in node_ids:
-                    sources = [{"text": f"Source {i+1}", "url": url} 
-                              for i, url in enumerate(person.get("sources", []))]
-                    
-                    nodes.append(create_node(
-                        person_id,
-                        person["name"],
-                        "security_personnel",
-                        f"{person.get('title', '')} - {person.get('description', '')}",
-                        20,
-                        person.get("linkedin", ""),
-                        person.get("initiatives", []),
-                        sources
-                    ))
-                    node_ids.add(person_id)
-                
-                links.append(create_link(lab_id, person_id, 4))
+        for person in lab_data.get("security_staff", []):
+            person_id = add_entity(
+                person["name"], PERSON, "security_personnel",
+                f"{person.get('title', '')} - {person.get('description', '')}", 20,
+                person.get("linkedin", ""), person.get("initiatives", []), person.get("sources", [])
+            )
+            links.add(lab_id, person_id, 4)
         
         # Add infrastructure relationships
-        if "infrastructure" in lab_data:
-            infra = lab_data["infrastructure"]
-            
-            # Cloud providers
-            for provider in infra.get("cloud_providers", []):
-                provider_id = provider["name"].lower().replace(" ", "-")
-                if provider_id not in node_ids:
-                    sources = [{"text": f"Source {i+1}", "url": url} 
-                              for i, url in enumerate(provider.get("sources", []))]
-                    
-                    nodes.append(create_node(
-                        provider_id,
-                        provider["name"],
-                        "cloud_infrastructure",
-                        provider.get("relationship", ""),
-                        35,
-                        "",
-                        provider.get("services", []),
-                        sources
-                    ))
-                    node_ids.add(provider_id)
-                
-                links.append(create_link(lab_id, provider_id, 5))
-            
-            # Power/cooling vendors
-            for vendor in infra.get("power_cooling", []):
-                vendor_id = vendor["vendor"].lower().replace(" ", "-")
-                if vendor_id not in node_ids:
-                    sources = [{"text": f"Source {i+1}", "url": url} 
-                              for i, url in enumerate(vendor.get("sources", []))]
-                    
-                    nodes.append(create_node(
-                        vendor_id,
-                        vendor["vendor"],
-                        "power_infrastructure",
-                        vendor.get("services", ""),
-                        25,
-                        "",
-                        vendor.get("projects", []),
-                        sources
-                    ))
-                    node_ids.add(vendor_id)
-                
-                links.append(create_link(lab_id, vendor_id, 3))
+        infra = lab_data.get("infrastructure", {})
+        
+        # Cloud providers
+        for provider in infra.get("cloud_providers", []):
+            provider_id = add_entity(
+                provider["name"], ORGANIZATION, "cloud_infrastructure", provider.get("relationship", ""), 35,
+                "", provider.get("services", []), provider.get("sources", [])
+            )
+            links.add(lab_id, provider_id, 5)
+        
+        # Power/cooling vendors
+        for vendor in infra.get("power_cooling", []):
+            vendor_id = add_entity(
+                vendor["vendor"], ORGANIZATION, "power_infrastructure", vendor.get("services", ""), 25,
+                "", vendor.get("projects", []), vendor.get("sources", [])
+            )
+            links.add(lab_id, vendor_id, 3)
     
     # Add specialized contractors
     if "specialized" in all_data:
         for contractor in all_data["specialized"]["specialized_contractors"]:
-            contractor_id = contractor["name"].lower().replace(" ", "-")
-            if contractor_id not in node_ids:
-                sources = [{"text": f"Source {i+1}", "url": url} 
-                          for i, url in enumerate(contractor.get("sources", []))]
-                
-                category = "security_contractors" if "security" in contractor.get("specialty", "").lower() else "contractors"
-                
-                nodes.append(create_node(
-                    contractor_id,
-                    contractor["name"],
-                    category,
-                    f"{contractor.get('specialty', '')} - {contractor.get('background', '')}",
-                    20,
-                    contractor.get("url", ""),
-                    contractor.get("ai_projects", []),
-                    sources
-                ))
-                node_ids.add(contractor_id)
-                
-                # Link to relevant AI labs
-                for project in contractor.get("ai_projects", []):
-                    for lab in AI_LABS:
-                        if lab.lower() in project.lower():
-                            lab_id = lab.lower().replace(" ", "-").replace(".", "")
-                            links.append(create_link(lab_id, contractor_id, 3))
-                            break
-    
-    return nodes, links
-
-def main():
-    parser = argparse.ArgumentParser(description="Gather SL5 stakeholder network data using Claude API")
-    parser.add_argument("--limit", type=int, help="Limit number of AI labs to process")
-    parser.add_argument("--output", default=OUTPUT_FILE, help="Output JSON file path")
-    parser.add_argument("--skip-hidden", action="store_true", help="Skip searching for hidden relationships")
-    args = parser.parse_args()
-    
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    
-    print(f"Starting SL5 stakeholder data collection for {len(AI_LABS)} AI labs...")
-    print(f"Output will be saved to: {args.output}")
+            category = "security_contractors" if "security" in contractor.get("specialty", "").lower() else "contractors"
+            contractor_id = add_entity(
+                contractor["name"], ORGANIZATION, category,
+                f"{contractor.get('specialty', '')} - {contractor.get('background', '')}", 20,
+                contractor.get("url", ""), contractor.get("ai_projects", []), contractor.get("sources", [])
+            )
+            
+            # Link to every AI lab in the network its projects or description mention
+            mentioned = lab_matcher.find(
+                contractor.get("specialty", ""), contractor.get("background", ""), *contractor.get("ai_projects", [])
+            )
+            for lab in mentioned:
+                if lab_ids[lab] in nodes or lab_ids[lab] in known_lab_ids:
+                    links.add(lab_ids[lab], contractor_id, 3)
     
-    all_data = {}
-    labs_to_process = AI_LABS[:args.limit] if args.limit else AI_LABS
+    return list(nodes.values()), links.to_list()
+
+def run_search_task(lab: Optional[str], kind: str) -> Tuple[Optional[Dict], float]:
+    """
+    Run one lab x category search (or the hidden search when lab is None) and persist the
+    result to the raw store straight away. Returns (result, seconds); result is None if
+    the search failed or its answer had no JSON, in which case nothing is stored and the
+    next run retries it.
+    """
+    started = time.monotonic()
+    if kind == "specialized":
+        result = fetch_search_result(hidden_relationships_prompt(), "hidden relationships", kind)
+    else:
+        result = fetch_search_result(LAB_SEARCHES[kind][0](lab), f"{kind} for {lab}", kind, lab)
+    if result is not None:
+        raw_store.put(lab, kind, result, CLAUDE_MODEL)
+    return result, time.monotonic() - started
+
+def search_prompt(lab: Optional[str], kind: str) -> str:
+    """Prompt for one lab x category search, or the hidden search when kind is "specialized"."""
+    return hidden_relationships_prompt() if kind == "specialized" else LAB_SEARCHES[kind][0](lab)
+
+def print_search_plan(labs_to_process: List[str], skip_hidden: bool, concurrency: int, batch: bool, list_calls: bool):
+    """
+    The `plan` command: the searches a run with the same options would make (those without
+    a result stored within --max-age) and an estimate of their tokens, web searches, cost and wall time.
+    """
+    searches = [(lab, kind) for lab in labs_to_process for kind in LAB_SEARCHES]
+    if not skip_hidden:
+        searches.append((None, "specialized"))
+    planned = []
+    for lab, kind in searches:
+        if fresh_result(lab, kind) is not None:
+            continue
+        request = build_search_request(search_prompt(lab, kind))
+        planned.append((kind, f"{kind} for {lab or 'all labs'}", request, is_cached(response_cache, request)))
+    print(f"{len(planned)} of {len(searches)} searches pending ({len(searches) - len(planned)} stored within --max-age in '{raw_store.path}').")
+    if list_calls:
+        for kind, label, _, cached in planned:
+            print(plan_entry_label(kind, label, cached))
+    print_plan(estimate_run([(kind, request, cached) for kind, _, request, cached in planned], "stakeholder", CLAUDE_MODEL,
+                            concurrency, batch))
+
+def collect_concurrently(labs_to_process: List[str], skip_hidden: bool, concurrency: int) -> Dict:
+    """
+    Run every lab x category search plus the hidden-relationships search at once on a
+    thread pool of `concurrency` workers, printing each search as it finishes. Results
+    are assembled in lab order, with "specialized" last, whatever order they arrive in.
+    """
+    searches = [(lab, kind) for lab in labs_to_process for kind in LAB_SEARCHES]
+    if not skip_hidden:
+        searches.append((None, "specialized"))
+    pending = [(lab, kind) for lab, kind in searches if fresh_result(lab, kind) is None]
+    if len(pending) < len(searches):
+        print(f"Resuming: {len(searches) - len(pending)} of {len(searches)} searches stored within --max-age in '{raw_store.path}'.")
+    print(f"Running {len(pending)} searches with up to {concurrency} at a time...")
     
-    # Collect data for each AI lab
-    for i, lab in enumerate(labs_to_process):
-        print(f"\n[{i+1}/{len(labs_to_process)}] Processing {lab}...")
-        lab_data = {}
-        
-        # Search for contractors
-        print(f"  - Searching for datacenter contractors...")
-        contractors_data = search_datacenter_contractors(lab)
-        if contractors_data.get("contractors"):
-            lab_data["contractors"] = contractors_data["contractors"]
-            print(f"    Found {len(contractors_data['contractors'])} contractors")
-        time.sleep(2)  # Rate limiting
-        
-        # Search for security personnel
-        print(f"  - Searching for security personnel...")
-        security_data = search_security_personnel(lab)
-        if security_data.get("security_staff"):
-            lab_data["security_staff"] = security_data["security_staff"]
-            print(f"    Found {len(security_data['security_staff'])} security staff")
-        time.sleep(2)
-        
-        # Search for infrastructure relationships
-        print(f"  - Searching for infrastructure partnerships...")
-        infra_data = search_infrastructure_relationships(lab)
-        if infra_data.get("infrastructure"):
-            lab_data["infrastructure"] = infra_data["infrastructure"]
-            print(f"    Found {len(infra_data['infrastructure'].get('cloud_providers', []))} cloud providers")
-            print(f"    Found {len(infra_data['infrastructure'].get('datacenters', []))} datacenters")
-            print(f"    Found {len(infra_data['infrastructure'].get('power_cooling', []))} power/cooling vendors")
-        time.sleep(2)
-        
-        all_data[lab] = lab_data
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(run_search_task, lab, kind): (lab, kind) for lab, kind in pending}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                lab, kind = futures[future]
+                result, elapsed = future.result()
+                if result is None:
+                    failed += 1
+                    print(f"  [{done}/{len(pending)}] {kind} for {lab or 'all labs'}: failed ({elapsed:.1f}s)")
+                    continue
+                print(f"  [{done}/{len(pending)}] {kind} for {lab or 'all labs'}: "
+                      f"found {describe_search_result(kind, result)} ({elapsed:.1f}s)")
+        except (CircuitOpenError, KeyboardInterrupt):
+            # Don't start the searches still queued; finished and in-flight ones are already stored
+            for future in futures:
+                future.cancel()
+            raise
+    if failed:
+        print(f"{failed} searches failed and will be retried on the next run.", file=sys.stderr)
     
-    # Search for hidden/specialized relationships
-    if not args.skip_hidden:
-        print(f"\nSearching for specialized/hidden contractors...")
-        hidden_data = search_hidden_relationships()
-        if hidden_data.get("specialized_contractors"):
-            all_data["specialized"] = hidden_data
-            print(f"  Found {len(hidden_data['specialized_contractors'])} specialized contractors")
+    return assemble_all_data(labs_to_process, skip_hidden)
+
+def assemble_all_data(labs: List[str], skip_hidden: bool = False) -> Dict:
+    """Build all_data for `labs` from the raw store, in lab order with "specialized" last."""
+    all_data = {lab: {} for lab in labs}
+    for lab in labs:
+        for kind in LAB_SEARCHES:
+            result = raw_store.get(lab, kind)
+            if result is not None:
+                merge_search_result(all_data, lab, kind, result)
+    hidden = raw_store.get(None, "specialized")
+    if hidden is not None and not skip_hidden:
+        merge_search_result(all_data, None, "specialized", hidden)
+    return all_data
+
+def write_network(all_data: Dict, labs: List[str], output_file: str, merge: bool = False,
+                  overwrite: List[str] = (), prune: bool = False, layout: bool = True, pin_layout: bool = False):
+    """
+    Build the network from all_data and write it to `output_file` atomically, with a summary.
+    With `merge`, the scrape is upserted into the existing file instead of replacing it and
+    the changes are written to a delta file next to it. Degree, betweenness and community are
+    written onto the nodes and the graph-level analytics into the metadata. With `layout`, node
+    positions are precomputed (and with `pin_layout` fixed) so the map opens already settled.
+    """
+    existing = None
+    if merge and os.path.exists(output_file):
+        existing = load_file(output_file)
+        try:
+            validate_network(existing)
+        except ValidationError as e:
+            print(f"Error: Can't merge into '{output_file}', it is not a valid network: {e}", file=sys.stderr)
+            sys.exit(1)
     
-    # Build network visualization data
     print("\nBuilding network visualization data...")
-    nodes, links = build_network_data(all_data)
+    # Merged contractors link to the labs of the whole network, not only the ones searched now
+    known_lab_ids = [node["id"] for node in existing["nodes"] if node["category"] == "ai_labs"] if existing else []
+    nodes, links = build_network_data(all_data, known_lab_ids)
     
     # Create final output
     output_data = {
         "nodes": nodes,
         "links": links,
+        "sources": [],
         "citation": f"Data compiled from public sources via web search on {datetime.now().strftime('%Y-%m-%d')}. " +
                    "Information gathered using Claude AI with web search capabilities.",
-        "metadata": {
-            "generated_at": datetime.now().isoformat(),
-            "ai_labs_searched": labs_to_process,
-            "total_nodes": len(nodes),
-            "total_links": len(links),
-            "node_categories": list(set(node["category"] for node in nodes))
-        }
+        "metadata": {}
     }
     
+    if existing is not None:
+        # Merging works on {"text", "url"} sources; they are interned again on write
+        existing = expand_node_sources(existing, source_registry)
+        lab_ids = [slugify(lab) for lab in labs]
+        nodes, links, delta = merge_network(existing, nodes, links, lab_ids, overwrite, prune_scope(labs) if prune else None)
+        # Keep anything else the existing file carries (curated citation, extra keys)
+        output_data = dict(existing, nodes=nodes, links=links, metadata=dict(existing.get("metadata", {})))
+        labs = [lab for lab in AI_LABS if lab in labs or lab in output_data["metadata"].get("ai_labs_searched", [])]
+        delta_file = delta_path_for(output_file)
+        atomic_write_json(build_delta_file(delta, labs, output_file), delta_file)
+        print(f"Merged into existing network: " + ", ".join(
+            f"{len(items)} {kind} {action}" for kind, actions in delta.items() for action, items in actions.items()
+        ) + f" (delta written to '{delta_file}')")
+    elif merge:
+        print(f"No existing network at '{output_file}'; writing a new one.")
+    
+    output_data["metadata"].update({
+        "generated_at": datetime.now().isoformat(),
+        "ai_labs_searched": labs,
+        "total_nodes": len(nodes),
+        "total_links": len(links),
+        "node_categories": list(dict.fromkeys(node["category"] for node in nodes))
+    })
+    started = time.monotonic()
+    output_data["metadata"]["analytics"] = apply_analytics(nodes, links)
+    print(f"Computed graph analytics for {len(nodes)} nodes in {time.monotonic() - started:.1f}s")
+    if layout:
+        started = time.monotonic()
+        output_data["metadata"]["layout"] = apply_layout(nodes, links, pin=pin_layout)
+        print(f"Computed layout for {len(nodes)} nodes in {time.monotonic() - started:.1f}s")
+    else:
+        output_data["metadata"].pop("layout", None)
+    
+    # Nodes cite sources by ID; the file embeds the entries it cites so the map needs nothing else
+    output_data["sources"] = intern_node_sources(nodes, source_registry)
+    try:
+        validate_network(output_data)
+    except ValidationError as e:
+        print(f"Error: The built network is invalid, '{output_file}' left unchanged: {e}", file=sys.stderr)
+        sys.exit(1)
+    source_registry.save()
+    
     # Save to file
-    with open(args.output, "w") as f:
-        json.dump(output_data, f, indent=2)
+    atomic_write_json(output_data, output_file)
     
-    print(f"\n✓ Data collection complete!")
+    print(f"\n✓ Network written!")
     print(f"  - Total nodes: {len(nodes)}")
     print(f"  - Total links: {len(links)}")
-    print(f"  - Output saved to: {args.output}")
+    print(f"  - Output saved to: {output_file}")
     
     # Print category breakdown
     category_counts = {}
@@ -588,5 +801,139 @@ def main():
     for cat, count in sorted(category_counts.items()):
         print(f"  - {cat}: {count}")
 
+def prune_scope(labs: List[str]) -> Dict[str, set]:
+    """
+    Lab ID -> node categories covered by the fresh searches stored for that lab (the hidden
+    search covers every lab). A stale result whose new search failed still feeds the network
+    but never prunes it.
+    """
+    hidden = SEARCH_CATEGORIES["specialized"] if fresh_result(None, "specialized") is not None else set()
+    return {
+        slugify(lab): set(hidden).union(*(SEARCH_CATEGORIES[kind] for kind in LAB_SEARCHES if fresh_result(lab, kind) is not None))
+        for lab in labs
+    }
+
+def rebuild(output_file: str, raw_path: str, merge: bool = False, overwrite: List[str] = (), prune: bool = False,
+            layout: bool = True, pin_layout: bool = False):
+    """
+    Regenerate the network file from stored raw results only; no API calls are made. With
+    `merge` and no raw results, the existing network is rebuilt on its own.
+    """
+    global raw_store
+    if not os.path.exists(raw_path):
+        if not (merge and os.path.exists(output_file)):
+            print(f"Error: No stored raw results at '{raw_path}'.", file=sys.stderr)
+            sys.exit(1)
+        # Nothing new to merge: re-resolve the existing network and recompute analytics and layout
+        print(f"No stored raw results at '{raw_path}'; rebuilding '{output_file}' from the existing network only.")
+        write_network({}, [], output_file, merge, overwrite, False, layout, pin_layout)
+        return
+    raw_store = RawResultStore(raw_path)
+    labs = [lab for lab in AI_LABS if lab in raw_store.labs()]
+    print(f"Rebuilding '{output_file}' from {len(raw_store)} stored search results for {len(labs)} labs...")
+    write_network(assemble_all_data(labs), labs, output_file, merge, overwrite, prune, layout, pin_layout)
+
+def main():
+    global response_cache, raw_store, stored_since, source_registry, telemetry, evidence_corpus
+    parser = argparse.ArgumentParser(description="Gather SL5 stakeholder network data using Claude API")
+    parser.add_argument("--limit", type=int, help="Limit number of AI labs to process")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help="Output JSON file path (outside the repo's network files, cited sources are registered in a .sources.json next to it)")
+    parser.add_argument("--skip-hidden", action="store_true", help="Skip searching for hidden relationships")
+    parser.add_argument("--batch", action="store_true", help="Submit all searches as one Message Batch job and wait for the results")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Number of searches to run at once (default: {DEFAULT_CONCURRENCY}; 1 runs them one by one)")
+    parser.add_argument("--raw", help="Raw search result store (default: next to --output, e.g. data/sl5-stakeholder-network.raw.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore stored raw results and run every search again")
+    parser.add_argument("--max-age", type=parse_max_age, default=DEFAULT_MAX_AGE,
+                        help="Reuse stored raw results fetched within this long (e.g. 12h, 1d, 2w; default: 1d) and search "
+                             "older ones again, so an interrupted run resumes and a scheduled one refreshes")
+    parser.add_argument("--merge", action="store_true",
+                        help="Upsert the scraped labs into the existing --output network instead of replacing it, keeping curated fields; writes a .delta.json next to it")
+    parser.add_argument("--overwrite", type=lambda value: [field.strip() for field in value.split(",") if field.strip()], default=[],
+                        help=f"With --merge, replace these curated fields with scraped values (any of: {', '.join(OVERWRITABLE_FIELDS)})")
+    parser.add_argument("--prune", action="store_true",
+                        help="With --merge, drop scraped-category links from the updated labs that the new scrape no longer finds, and nodes left unlinked")
+    parser.add_argument("--no-layout", action="store_true", help="Don't precompute node positions; the map lays the graph out in the browser")
+    parser.add_argument("--pin-layout", action="store_true", help="Also fix nodes at their precomputed positions (fx/fy) until dragged")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    add_evidence_arguments(parser)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("rebuild", help="Regenerate the network file from stored raw results without calling the API")
+    plan_parser = subparsers.add_parser("plan", help="List the searches a run with the same options would make and estimate "
+                                                     "their tokens, searches, cost and wall time, without calling the API")
+    plan_parser.add_argument("--list", action="store_true", help="List every planned search")
+    args = parser.parse_args()
+    unknown_fields = set(args.overwrite) - set(OVERWRITABLE_FIELDS)
+    if unknown_fields:
+        parser.error(f"Unknown --overwrite field(s): {', '.join(sorted(unknown_fields))}")
+    raw_path = args.raw or raw_results_path_for(args.output)
+    source_registry = registry_for_output(args.output)
+    
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    
+    if args.command == "rebuild":
+        rebuild(args.output, raw_path, args.merge, args.overwrite, args.prune, not args.no_layout, args.pin_layout)
+        return
+    # A rebuild uses every stored result; runs only reuse the ones fetched within --max-age
+    stored_since = cutoff_for(args.max_age)
+    
+    if args.command == "plan":
+        response_cache = cache_from_args(args)
+        raw_store = RawResultStore(raw_path, load=not args.fresh)
+        print_search_plan(AI_LABS[:args.limit] if args.limit else AI_LABS, args.skip_hidden, args.concurrency,
+                          args.batch, args.list)
+        return
+    
+    if get_client() is None and not args.cache_only:
+        print("ERROR: ANTHROPIC_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+    response_cache = cache_from_args(args)
+    telemetry = telemetry_from_args(args, "stakeholder", CLAUDE_MODEL)
+    limiter.bucket.start_at(args.concurrency)
+    evidence_corpus = evidence_from_args(args)
+    # With --fresh, stored results are not read; new ones are appended and supersede them
+    raw_store = RawResultStore(raw_path, load=not args.fresh)
+    
+    print(f"Starting SL5 stakeholder data collection for {len(AI_LABS)} AI labs...")
+    print(f"Output will be saved to: {args.output}")
+    print(f"Raw search results are stored in: {raw_path}")
+    
+    labs_to_process = AI_LABS[:args.limit] if args.limit else AI_LABS
+    
+    # Collect data for each AI lab
+    try:
+        if args.batch:
+            all_data = collect_with_message_batch(labs_to_process, args.skip_hidden, batch_state_path_for(args.output))
+        else:
+            all_data = collect_concurrently(labs_to_process, args.skip_hidden, args.concurrency)
+    except CircuitOpenError as e:
+        # Don't overwrite the existing network with a partial scrape
+        print(f"\nStopping: {e}. Output file left unchanged; finished searches are stored and the next run resumes from them.", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Finished searches are stored in '{raw_path}'; re-run to resume.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        raw_store.compact()
+        telemetry.close()
+        if evidence_corpus is not None:
+            evidence_corpus.compact()
+    
+    write_network(all_data, labs_to_process, args.output, args.merge, args.overwrite, args.prune,
+                  not args.no_layout, args.pin_layout)
+    print(f"  - Tokens: {token_usage['input_tokens']} input, {token_usage['output_tokens']} output, "
+          f"{token_usage['cache_creation_input_tokens']} prompt-cache write, {token_usage['cache_read_input_tokens']} prompt-cache read")
+    if response_cache:
+        print(f"  - {response_cache.summary()}")
+    if evidence_corpus is not None:
+        print(f"  - {evidence_corpus.summary()}")
+    print(telemetry.summary())
+    if args.prometheus:
+        telemetry.write_prometheus(args.prometheus)
+        print(f"Prometheus metrics written to '{args.prometheus}'.")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
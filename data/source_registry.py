@@ -0,0 +1,255 @@
+"""
+Interned registry of cited sources.
+The compliance data and the stakeholder network cite the same vendor and lab pages over and
+over; in the files they refer to sources by ID and each URL is stored once in
+data/sources.json with its title, domain and the date it was first cited. IDs are derived
+from the URL, so separate processes (shards, hosts) assign the same ID without coordinating
+and their registries merge by union. The scrapers work on expanded data in memory: the
+load/save helpers below convert at the file boundary, and expand IDs for older consumers.
+"""
+
+import copy
+import hashlib
+import os
+import sys
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from progress_journal import atomic_write_json
+from serialization import load_file
+
+SOURCES_FILE = "data/sources.json"
+ID_LENGTH = 10
+# Registry fields embedded in a network file for the map (the rest stay in the registry)
+EMBEDDED_FIELDS = ["id", "url", "title"]
+
+
+def sources_path_for(data_file: str) -> str:
+    """Registry that sits next to a data file kept apart from the shared one, e.g. /tmp/network.sources.json."""
+    root, _ = os.path.splitext(data_file)
+    return f"{root}.sources.json"
+
+
+def source_key(url: Optional[str], title: Optional[str] = None) -> str:
+    """What a source is deduplicated on: the URL, or the title for curated citations without one."""
+    url = (url or "").strip()
+    return url if url else f"title:{(title or '').strip()}"
+
+
+def source_id(url: Optional[str], title: Optional[str] = None) -> str:
+    return hashlib.sha1(source_key(url, title).encode("utf-8")).hexdigest()[:ID_LENGTH]
+
+
+def source_domain(url: Optional[str]) -> str:
+    domain = urlparse((url or "").strip()).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def search_result_titles(content_blocks) -> Dict[str, str]:
+    """URL -> page title for the web search results in a response's content blocks."""
+    titles = {}
+    for block in content_blocks or []:
+        if getattr(block, "type", None) != "web_search_tool_result" or not isinstance(getattr(block, "content", None), list):
+            continue
+        for result in block.content:
+            url, title = getattr(result, "url", None), getattr(result, "title", None)
+            if url and title:
+                titles.setdefault(url.strip(), title.strip())
+    return titles
+
+
+class SourceRegistry:
+    """
+    Source entries by ID: {"id", "url", "title", "domain", "first_seen"}. Titles come from
+    web search results or curated citation text and are filled in when first known.
+    """
+
+    def __init__(self, path: str = SOURCES_FILE, load: bool = True):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.titles = {}
+        self.dirty = False
+        if load and path and os.path.exists(path):
+            self.entries = self.read(path)
+
+    @staticmethod
+    def read(path: str) -> Dict[str, Dict]:
+        return {entry["id"]: entry for entry in load_file(path)["sources"]}
+
+    def note_titles(self, titles: Dict[str, str]):
+        """Remember page titles seen in search results, for sources interned now or later."""
+        with self.lock:
+            for url, title in titles.items():
+                self.titles.setdefault(url, title)
+                entry = self.entries.get(source_id(url))
+                if entry is not None and not entry.get("title"):
+                    entry["title"] = title
+                    self.dirty = True
+
+    def intern(self, url: Optional[str], title: Optional[str] = None, seen: Optional[str] = None) -> str:
+        """
+        ID for a source, registering it on first sight. `seen` is the ISO date it was cited
+        (default today); an earlier date moves first_seen back.
+        """
+        url = (url or "").strip() or None
+        title = (title or "").strip() or None
+        entry_id = source_id(url, title)
+        seen = (seen or date.today().isoformat())[:10]
+        with self.lock:
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                self.entries[entry_id] = {
+                    "id": entry_id,
+                    "url": url,
+                    "title": title or self.titles.get(url),
+                    "domain": source_domain(url),
+                    "first_seen": seen
+                }
+                self.dirty = True
+                return entry_id
+            if source_key(entry["url"], entry["title"]) != source_key(url, title or entry["title"]):
+                raise ValueError(f"Source ID collision between '{entry['url']}' and '{url}'")
+            if not entry.get("title") and (title or self.titles.get(url)):
+                entry["title"] = title or self.titles.get(url)
+                self.dirty = True
+            if seen < entry["first_seen"]:
+                entry["first_seen"] = seen
+                self.dirty = True
+            return entry_id
+
+    def get(self, entry_id: str) -> Optional[Dict]:
+        return self.entries.get(entry_id)
+
+    def expand(self, ids: Iterable[str]) -> List[Dict]:
+        """Full entries for a list of IDs; unknown IDs are reported and dropped."""
+        entries = []
+        for entry_id in ids:
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                print(f"Warning: Unknown source ID '{entry_id}' (missing from '{self.path}').", file=sys.stderr)
+                continue
+            entries.append(entry)
+        return entries
+
+    def table(self, ids: Iterable[str]) -> List[Dict]:
+        """Entries for the given IDs, each once, in ID order (for embedding next to the data)."""
+        return [self.entries[entry_id] for entry_id in sorted(set(ids)) if entry_id in self.entries]
+
+    def update(self, entries: Iterable[Dict]):
+        """Take in entries from another registry or an embedded table."""
+        for entry in entries:
+            self.intern(entry.get("url"), entry.get("title"), entry.get("first_seen"))
+
+    def save(self):
+        """
+        Write the registry atomically. Entries written by another process since this one
+        loaded are read back in first, so concurrent runs only ever add to the file.
+        """
+        with self.lock:
+            if not self.dirty or not self.path:
+                return
+            on_disk = self.read(self.path) if os.path.exists(self.path) else {}
+            for entry_id, entry in on_disk.items():
+                current = self.entries.setdefault(entry_id, entry)
+                if not current.get("title") and entry.get("title"):
+                    current["title"] = entry["title"]
+                current["first_seen"] = min(current["first_seen"], entry["first_seen"])
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic_write_json({"sources": [self.entries[entry_id] for entry_id in sorted(self.entries)]}, self.path)
+            self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def replace_field(record: Dict, old: str, new: str, value):
+    """Swap field `old` for `new` in place, keeping its position so rewritten files diff cleanly."""
+    items = [(new, value) if key == old else (key, item) for key, item in record.items()]
+    record.clear()
+    record.update(items)
+
+
+# --- Compliance data: cells store "source_ids" on disk, "sources" (URLs) in memory ---
+
+def iter_cells(compliance_data: List[Dict]):
+    for sl_entry in compliance_data:
+        for category in sl_entry["categories"]:
+            for subcategory in category["subcategories"]:
+                for control in subcategory["controls"]:
+                    yield from control["compliance"].values()
+
+
+def intern_compliance_sources(compliance_data: List[Dict], registry: SourceRegistry) -> List[Dict]:
+    """A copy of the data with each cell's source URLs replaced by registry IDs."""
+    interned = copy.deepcopy(compliance_data)
+    for cell in iter_cells(interned):
+        if "sources" in cell:
+            ids = [registry.intern(url, seen=cell.get("fetched_at")) for url in cell["sources"]]
+            replace_field(cell, "sources", "source_ids", ids)
+    return interned
+
+
+def expand_compliance_sources(compliance_data: List[Dict], registry: SourceRegistry) -> List[Dict]:
+    """Replace each cell's source IDs with URLs, in place; files without IDs pass through unchanged."""
+    for cell in iter_cells(compliance_data):
+        if "source_ids" in cell:
+            replace_field(cell, "source_ids", "sources", [entry["url"] for entry in registry.expand(cell["source_ids"])])
+    return compliance_data
+
+
+def load_compliance_data(path: str, registry: SourceRegistry = None) -> List[Dict]:
+    """Read a compliance data file with every cell's sources expanded to URLs."""
+    compliance_data = load_file(path)
+    return expand_compliance_sources(compliance_data, registry or SourceRegistry())
+
+
+def save_compliance_data(compliance_data: List[Dict], path: str, registry: SourceRegistry):
+    """Write compliance data with interned sources; the registry is saved first so the file never cites unknown IDs."""
+    interned = intern_compliance_sources(compliance_data, registry)
+    registry.save()
+    atomic_write_json(interned, path)
+
+
+# --- Stakeholder network: nodes store "source_ids" and the file embeds the entries they cite ---
+
+def intern_node_sources(nodes: List[Dict], registry: SourceRegistry) -> List[Dict]:
+    """
+    Replace each node's {"text", "url"} sources with registry IDs, in place. Citation text
+    other than the generated "Source N" becomes the source's title. Returns the table of
+    entries the nodes cite, to embed in the network file so the map needs nothing else.
+    """
+    cited = []
+    for node in nodes:
+        if "sources" not in node:
+            continue
+        ids = []
+        for source in node["sources"]:
+            if isinstance(source, str):
+                source = {"url": source}
+            text = source.get("text") or ""
+            generated = text.startswith("Source ") and text[len("Source "):].isdigit()
+            ids.append(registry.intern(source.get("url"), None if generated else text))
+        replace_field(node, "sources", "source_ids", list(dict.fromkeys(ids)))
+        cited.extend(node["source_ids"])
+    return [{field: entry[field] for field in EMBEDDED_FIELDS} for entry in registry.table(cited)]
+
+
+def expand_node_sources(network: Dict, registry: SourceRegistry = None) -> Dict:
+    """
+    Give every node of a network dict {"text", "url"} sources again, in place, for code that
+    predates source IDs. IDs are looked up in the file's embedded table, then in `registry`.
+    """
+    registry = registry or SourceRegistry(path=None)
+    registry.update(network.get("sources", []))
+    for node in network.get("nodes", []):
+        if "source_ids" in node:
+            replace_field(node, "source_ids", "sources", [
+                {"text": entry["title"] or f"Source {i + 1}", "url": entry["url"]}
+                for i, entry in enumerate(registry.expand(node["source_ids"]))
+            ])
+    return network
@@ -0,0 +1,132 @@
+"""
+Flattened task index over compliance-data.json.
+Every (level, category, subcategory, control, lab) cell gets a stable ID derived from its
+coordinates, so work can be split into disjoint shards across processes or hosts and the
+shard outputs merged back into one file.
+"""
+
+import argparse
+import copy
+import hashlib
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class CellTask(NamedTuple):
+    """One compliance cell; `control` is the control dict inside the loaded data."""
+    level: int
+    category: str
+    subcategory: str
+    control: Dict
+    lab: str
+
+
+def control_id(level: int, category: str, subcategory: str, control_name: str) -> str:
+    """Stable ID for a control, independent of its position in the file."""
+    digest = hashlib.sha1(f"{level}\x1f{category}\x1f{subcategory}\x1f{control_name}".encode("utf-8")).hexdigest()
+    return f"sl{level}-{digest[:10]}"
+
+
+def cell_id(task: CellTask) -> str:
+    """Stable ID for a cell: its control's ID plus the lab."""
+    return f"{control_id(task.level, task.category, task.subcategory, task.control['name'])}-{task.lab.lower()}"
+
+
+def build_task_index(compliance_data: List[Dict], labs: List[str]) -> List[CellTask]:
+    """Flatten the level/category/subcategory/control tree into one task per lab, in file order."""
+    tasks = []
+    for sl_entry in compliance_data:
+        for category in sl_entry["categories"]:
+            for subcategory in category["subcategories"]:
+                for control in subcategory["controls"]:
+                    for lab in labs:
+                        tasks.append(CellTask(sl_entry["level"], category["name"], subcategory["name"], control, lab))
+    return tasks
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """argparse type for --shard i/n (1-based shard i of n)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', expected i/n such as 2/4")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', need 1 <= i <= n")
+    return index, count
+
+
+def filter_tasks(tasks: List[CellTask], levels: List[int] = None, labs: List[str] = None,
+                 categories: List[str] = None) -> List[CellTask]:
+    """Keep tasks matching the given levels, labs and category names (case-insensitive); None means any."""
+    lab_names = {lab.lower() for lab in labs} if labs else None
+    category_names = {category.lower() for category in categories} if categories else None
+    return [
+        task for task in tasks
+        if (not levels or task.level in levels)
+        and (lab_names is None or task.lab.lower() in lab_names)
+        and (category_names is None or task.category.lower() in category_names)
+    ]
+
+
+def shard_of(task: CellTask, count: int) -> int:
+    """
+    1-based shard a task belongs to. Hashing the control (not the cell) keeps all labs of a
+    control in the same shard so --multi-lab groups are never split.
+    """
+    digest = control_id(task.level, task.category, task.subcategory, task.control["name"])
+    return int(hashlib.sha1(digest.encode("utf-8")).hexdigest(), 16) % count + 1
+
+
+def filter_shard(tasks: List[CellTask], shard: Tuple[int, int]) -> List[CellTask]:
+    index, count = shard
+    return [task for task in tasks if shard_of(task, count) == index]
+
+
+def shard_output_path(data_file: str, shard: Tuple[int, int]) -> str:
+    """Default output file for a shard, e.g. data/compliance-data.shard-2-of-4.json."""
+    root, ext = os.path.splitext(data_file)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext or '.json'}"
+
+
+def cell_values(compliance_data: List[Dict], labs: List[str]) -> Dict[str, Dict]:
+    """Map cell ID to the compliance cell dict for every cell in the data."""
+    return {cell_id(task): task.control["compliance"].get(task.lab) for task in build_task_index(compliance_data, labs)}
+
+
+def merge_shards(base_data: List[Dict], shards: Dict[str, List[Dict]], labs: List[str],
+                 on_conflict: str = "fail") -> Tuple[List[Dict], List[Dict]]:
+    """
+    Merge shard outputs into a copy of `base_data`. A cell is taken from whichever shard
+    changed it relative to the base; if several shards changed it to different values the
+    cell is a conflict, resolved by `on_conflict` ('first' or 'last' shard wins, or 'fail'
+    to keep the base value). Returns (merged data, conflicts).
+    """
+    merged = copy.deepcopy(base_data)
+    base_cells = cell_values(base_data, labs)
+    shard_cells = {}
+    for name, data in shards.items():
+        cells = cell_values(data, labs)
+        if cells.keys() != base_cells.keys():
+            raise ValueError(f"Shard '{name}' does not have the same controls as the base file")
+        shard_cells[name] = cells
+
+    conflicts = []
+    for task in build_task_index(merged, labs):
+        key = cell_id(task)
+        changes = [(name, cells[key]) for name, cells in shard_cells.items() if cells[key] != base_cells[key]]
+        if not changes:
+            continue
+        distinct = [value for i, (_, value) in enumerate(changes) if value not in [v for _, v in changes[:i]]]
+        if len(distinct) > 1:
+            conflicts.append({
+                "cell_id": key,
+                "level": task.level,
+                "control": task.control["name"],
+                "lab": task.lab,
+                "shards": [name for name, _ in changes]
+            })
+            if on_conflict == "fail":
+                continue
+        value = changes[0][1] if on_conflict == "first" else changes[-1][1]
+        task.control["compliance"][task.lab] = copy.deepcopy(value)
+    return merged, conflicts
@@ -0,0 +1,281 @@
+"""
+Per-call telemetry for the SL5 scrapers.
+Every Messages API call (and every answer served from the response cache or a message batch)
+becomes one record: wall time, retries, token counts from `usage`, web searches run, estimated
+cost and how its answer parsed. Records are appended to a per-run JSONL file as they finish,
+summarised in a table at the end of the run, and optionally exported as a Prometheus textfile
+(for node_exporter's textfile collector) so slow controls and costly prompts stand out.
+"""
+
+import inspect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+METRICS_DIR = "data/.metrics"
+# USD per million tokens, and per web search, for the models the scrapers use
+MODEL_PRICES = {
+    "claude-sonnet-4-20250514": {"input_tokens": 3.00, "output_tokens": 15.00,
+                                 "cache_creation_input_tokens": 3.75, "cache_read_input_tokens": 0.30},
+}
+WEB_SEARCH_PRICE = 10.00 / 1000
+# Message Batches are billed at half price
+BATCH_DISCOUNT = 0.5
+TOKEN_FIELDS = ["input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"]
+# Parse outcomes
+VALID = "valid"
+INVALID_SCORE = "invalid_score"
+NO_JSON = "no_json"
+# Multi-lab answers that left some labs to be queried individually
+PARTIAL = "partial"
+# Calls listed in the summary as slowest / costliest
+SUMMARY_TOP = 5
+
+
+def metrics_path_for(script: str, started: datetime = None) -> str:
+    """Per-run metrics file, e.g. data/.metrics/compliance-20250101T120000Z.jsonl."""
+    started = started or datetime.now(timezone.utc)
+    return os.path.join(METRICS_DIR, f"{script}-{started.strftime('%Y%m%dT%H%M%SZ')}.jsonl")
+
+
+def call_cost(record: Dict) -> float:
+    prices = MODEL_PRICES.get(record.get("model"), {})
+    cost = sum(record.get(field, 0) * prices.get(field, 0) for field in TOKEN_FIELDS) / 1e6
+    cost += record.get("web_searches", 0) * WEB_SEARCH_PRICE
+    if record.get("source") == "batch":
+        cost *= BATCH_DISCOUNT
+    return cost
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """Collects call records for one run; thread-safe, and safe to share with asyncio tasks."""
+
+    def __init__(self, script: str, model: str, path: Optional[str] = None):
+        self.script = script
+        self.model = model
+        self.path = path
+        self.records = []
+        self.lock = threading.Lock()
+        self.file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file = open(path, "a", encoding="utf-8")
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    @contextmanager
+    def call(self, kind: str, label: str, **fields):
+        """
+        Record one call: yields the record for the caller (and the helpers below) to fill in,
+        and stores it when the block exits, marking it an error if the block raised.
+        """
+        record = {"script": self.script, "kind": kind, "label": label, **fields, "model": self.model,
+                  "source": "api", "status": "ok", "outcome": None, "attempts": 0, "web_searches": 0,
+                  **{field: 0 for field in TOKEN_FIELDS}}
+        record["started_at"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        started = time.monotonic()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{e.__class__.__name__}: {e}"[:300]
+            raise
+        finally:
+            record["wall_seconds"] = round(time.monotonic() - started, 4)
+            self.add(record)
+
+    def add(self, record: Dict):
+        record["retries"] = max(0, record.pop("attempts", 0) - 1)
+        record["cost_usd"] = round(call_cost(record), 6)
+        with self.lock:
+            self.records.append(record)
+            if self.file:
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.file.flush()
+
+    def batch_record(self, kind: str, label: str, message, **fields) -> Dict:
+        """
+        Record for a message batch result (no per-call wall time, billed at the batch
+        discount), to note the parse outcome on and then pass to add().
+        """
+        record = {"script": self.script, "kind": kind, "label": label, **fields, "model": self.model,
+                  "source": "batch", "status": "ok" if message is not None else "error", "outcome": None,
+                  "attempts": 1, "web_searches": 0, "wall_seconds": None, **{field: 0 for field in TOKEN_FIELDS},
+                  "started_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds")}
+        note_response(record, message)
+        return record
+
+    def summary(self) -> str:
+        """Totals per call kind, parse outcomes, and the slowest and costliest calls."""
+        with self.lock:
+            records = list(self.records)
+        if not records:
+            return "Telemetry: no calls recorded."
+        lines = [f"{'kind':<16} {'calls':>6} {'cached':>6} {'errors':>6} {'retries':>7} {'p50':>7} {'p95':>7} "
+                 f"{'in tok':>9} {'out tok':>8} {'cache rd':>9} {'searches':>8} {'cost':>9}"]
+        kinds = list(dict.fromkeys(record["kind"] for record in records)) + ["total"]
+        for kind in kinds:
+            group = [record for record in records if kind in ("total", record["kind"])]
+            timed = [record["wall_seconds"] for record in group if record["source"] == "api" and record["wall_seconds"] is not None]
+            lines.append(
+                f"{kind:<16} {len(group):>6} {sum(record['source'] == 'cache' for record in group):>6} "
+                f"{sum(record['status'] == 'error' for record in group):>6} {sum(record['retries'] for record in group):>7} "
+                f"{percentile(timed, 0.5):>6.2f}s {percentile(timed, 0.95):>6.2f}s "
+                f"{sum(record['input_tokens'] for record in group):>9} {sum(record['output_tokens'] for record in group):>8} "
+                f"{sum(record['cache_read_input_tokens'] for record in group):>9} "
+                f"{sum(record['web_searches'] for record in group):>8} ${sum(record['cost_usd'] for record in group):>8.3f}"
+            )
+        outcomes = {}
+        for record in records:
+            if record["outcome"]:
+                outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+        if outcomes:
+            lines.append("Parse outcomes: " + ", ".join(f"{outcome} {count}" for outcome, count in outcomes.items()))
+        truncated = sum(1 for record in records if record.get("truncated"))
+        if truncated:
+            lines.append(f"Streams cut off at their result: {truncated} (tokens and cost are lower bounds; answers not cached)")
+        api_calls = [record for record in records if record["source"] == "api" and record["status"] == "ok"]
+        billed = api_calls + [record for record in records if record["source"] == "batch"]
+        for title, candidates, key in (("Slowest calls", api_calls, "wall_seconds"), ("Costliest calls", billed, "cost_usd")):
+            top = sorted(candidates, key=lambda record: record[key] or 0, reverse=True)[:SUMMARY_TOP]
+            if top:
+                lines.append(f"{title}:")
+                for record in top:
+                    value = f"{record[key]:.2f}s" if key == "wall_seconds" else f"${record[key]:.4f}"
+                    lines.append(f"  {value:>9}  {record['kind']}: {record['label']}")
+        if self.path:
+            lines.append(f"Per-call metrics written to '{self.path}'.")
+        return "\n".join(lines)
+
+    def write_prometheus(self, path: str):
+        """Write run totals in the Prometheus text format, atomically (the textfile collector may read at any time)."""
+        with self.lock:
+            records = list(self.records)
+        script = self.script
+        metrics = {
+            "sl5_scraper_calls_total": ("counter", "Messages API calls, cache hits and batch results.", {}),
+            "sl5_scraper_retries_total": ("counter", "Retried attempts after transient API errors.", {}),
+            "sl5_scraper_call_seconds_sum": ("counter", "Wall time of API calls.", {}),
+            "sl5_scraper_call_seconds_count": ("counter", "Timed API calls.", {}),
+            "sl5_scraper_tokens_total": ("counter", "Tokens reported in usage.", {}),
+            "sl5_scraper_web_searches_total": ("counter", "Web searches run by the API.", {}),
+            "sl5_scraper_parse_outcomes_total": ("counter", "How answers parsed.", {}),
+            "sl5_scraper_cost_usd_total": ("counter", "Estimated cost in USD.", {}),
+        }
+
+        def add(name: str, labels: Dict[str, str], value: float):
+            key = tuple(sorted(dict(labels, script=script).items()))
+            samples = metrics[name][2]
+            samples[key] = samples.get(key, 0) + value
+
+        for record in records:
+            kind = record["kind"]
+            add("sl5_scraper_calls_total", {"kind": kind, "source": record["source"], "status": record["status"]}, 1)
+            add("sl5_scraper_retries_total", {"kind": kind}, record["retries"])
+            if record["source"] == "api" and record["wall_seconds"] is not None:
+                add("sl5_scraper_call_seconds_sum", {"kind": kind}, record["wall_seconds"])
+                add("sl5_scraper_call_seconds_count", {"kind": kind}, 1)
+            for field in TOKEN_FIELDS:
+                add("sl5_scraper_tokens_total", {"kind": kind, "type": field.replace("_tokens", "")}, record[field])
+            add("sl5_scraper_web_searches_total", {"kind": kind}, record["web_searches"])
+            if record["outcome"]:
+                add("sl5_scraper_parse_outcomes_total", {"kind": kind, "outcome": record["outcome"]}, 1)
+            add("sl5_scraper_cost_usd_total", {"kind": kind}, record["cost_usd"])
+
+        lines = []
+        for name, (metric_type, help_text, samples) in metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples.items():
+                label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+        lines.append("# HELP sl5_scraper_last_run_timestamp_seconds When the run finished.")
+        lines.append("# TYPE sl5_scraper_last_run_timestamp_seconds gauge")
+        lines.append(f'sl5_scraper_last_run_timestamp_seconds{{script="{script}"}} {time.time():.0f}')
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".prom-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+
+def counting_attempts(record: Optional[Dict], fn: Callable) -> Callable:
+    """Wrap `fn` so each call (each attempt the rate limiter makes) is counted in `record`; works for async fns too."""
+    if record is None:
+        return fn
+
+    def attempt(*args, **kwargs):
+        record["attempts"] += 1
+        return fn(*args, **kwargs)
+
+    if inspect.iscoroutinefunction(fn):
+        async def attempt_async(*args, **kwargs):
+            record["attempts"] += 1
+            return await fn(*args, **kwargs)
+        return attempt_async
+    return attempt
+
+
+def note_response(record: Optional[Dict], response, truncated: bool = False):
+    """
+    Copy token counts and the web search count from a Message into `record`. A truncated
+    message (a stream read only up to its result) never received its final usage: its token
+    counts are a lower bound, its searches are counted from its blocks, and the record is
+    marked `truncated` so estimates built from the metrics leave it out.
+    """
+    if record is None or response is None:
+        return
+    usage = getattr(response, "usage", None)
+    for field in TOKEN_FIELDS:
+        record[field] += getattr(usage, field, None) or 0
+    server_tool_use = None if truncated else getattr(usage, "server_tool_use", None)
+    searches = getattr(server_tool_use, "web_search_requests", None)
+    if searches is None:
+        searches = sum(1 for block in getattr(response, "content", None) or []
+                       if getattr(block, "type", None) == "server_tool_use" and getattr(block, "name", None) == "web_search")
+    record["web_searches"] += searches
+    if truncated:
+        record["truncated"] = True
+
+
+def note_cache_hit(record: Optional[Dict]):
+    if record is not None:
+        record["source"] = "cache"
+
+
+def note_outcome(record: Optional[Dict], outcome: str):
+    if record is not None:
+        record["outcome"] = outcome
+
+
+def add_telemetry_arguments(parser):
+    """Register the telemetry command-line switches shared by both scrapers."""
+    parser.add_argument("--metrics", help=f"Per-call metrics JSONL file (default: a new file per run in {METRICS_DIR}).")
+    parser.add_argument("--no-metrics", action="store_true", help="Don't write per-call metrics (the summary is still printed).")
+    parser.add_argument("--prometheus", help="Also write run totals to this Prometheus textfile (e.g. for node_exporter's textfile collector).")
+
+
+def telemetry_from_args(args, script: str, model: str) -> Telemetry:
+    path = None if args.no_metrics else (args.metrics or metrics_path_for(script))
+    return Telemetry(script, model, path)
@@ -0,0 +1,161 @@
+"""
+Validation of the compliance data and the stakeholder network, as the plain dicts the
+scrapers and the site use. Checks run in place without building anything, so a hand-edited
+or half-written file fails on load with the path of the offending field instead of a
+KeyError deep inside a scraper.
+"""
+
+from typing import Dict, List
+
+SCORES = (0, 25, 50, 75, 100)
+
+
+class ValidationError(ValueError):
+    """A data file does not have the expected shape; the message starts with where."""
+
+
+def check(condition: bool, where: str, message: str):
+    if not condition:
+        raise ValidationError(f"{where}: {message}")
+
+
+def invalid(where: str, message: str) -> ValidationError:
+    return ValidationError(f"{where}: {message}")
+
+
+def is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# --- Compliance data ---
+
+def validate_cell(cell: Dict, where: str):
+    """One lab's assessment of one control. Sources are URLs in memory, registry IDs on disk."""
+    # The hot path of a load (one per lab per control), so checks are inline and
+    # messages are only formatted on failure
+    if not isinstance(cell, dict):
+        raise invalid(where, "cell must be an object")
+    score = cell.get("score")
+    if score not in SCORES or type(score) is not int:
+        raise invalid(where, f"score must be one of {SCORES}, got {score!r}")
+    if not isinstance(cell.get("justification"), str):
+        raise invalid(where, "justification must be a string")
+    sources, source_ids = cell.get("sources"), cell.get("source_ids")
+    if sources is not None and not is_str_list(sources):
+        raise invalid(where, "sources must be a list of URL strings")
+    if source_ids is not None and not is_str_list(source_ids):
+        raise invalid(where, "source_ids must be a list of strings")
+    for field in ("fetched_at", "model", "sources_hash"):
+        value = cell.get(field)
+        if value is not None and not isinstance(value, str):
+            raise invalid(where, f"{field} must be a string")
+
+
+def validate_control(control: Dict, where: str):
+    check(isinstance(control, dict), where, "control must be an object")
+    check(isinstance(control.get("name"), str) and control["name"] != "", where, "control name must be a non-empty string")
+    where = f"{where} / '{control['name']}'"
+    compliance = control.get("compliance")
+    check(isinstance(compliance, dict), where, "compliance must be an object keyed by lab")
+    for lab, cell in compliance.items():
+        validate_cell(cell, f"{where} / {lab}")
+
+
+def validate_level(sl_entry: Dict, where: str):
+    check(isinstance(sl_entry, dict), where, "level must be an object")
+    level = sl_entry.get("level")
+    check(isinstance(level, int) and not isinstance(level, bool) and level >= 1, where,
+          f"level must be a positive integer, got {level!r}")
+    where = f"SL{level}"
+    check(isinstance(sl_entry.get("description", ""), str), where, "description must be a string")
+    check(isinstance(sl_entry.get("categories"), list), where, "categories must be a list")
+    for category in sl_entry["categories"]:
+        check(isinstance(category, dict), where, "category must be an object")
+        check(isinstance(category.get("name"), str) and category["name"] != "", where,
+              "category name must be a non-empty string")
+        category_where = f"{where} / {category['name']}"
+        check(isinstance(category.get("subcategories"), list), category_where, "subcategories must be a list")
+        for subcategory in category["subcategories"]:
+            check(isinstance(subcategory, dict), category_where, "subcategory must be an object")
+            # Categories without subdivisions use a single subcategory named ""
+            check(isinstance(subcategory.get("name"), str), category_where, "subcategory name must be a string")
+            subcategory_where = f"{category_where} / {subcategory['name']}" if subcategory["name"] else category_where
+            check(isinstance(subcategory.get("controls"), list), subcategory_where, "controls must be a list")
+            for control in subcategory["controls"]:
+                validate_control(control, subcategory_where)
+
+
+def validate_compliance_data(compliance_data: List[Dict]):
+    """Raise ValidationError if `compliance_data` (sources as URLs or registry IDs) is malformed."""
+    check(isinstance(compliance_data, list), "compliance data", "must be a list of levels")
+    seen = set()
+    for i, sl_entry in enumerate(compliance_data):
+        validate_level(sl_entry, f"level #{i + 1}")
+        check(sl_entry["level"] not in seen, f"SL{sl_entry['level']}", "level appears more than once")
+        seen.add(sl_entry["level"])
+
+
+# --- Stakeholder network ---
+
+def validate_node(node: Dict, where: str):
+    check(isinstance(node, dict), where, "node must be an object")
+    check(isinstance(node.get("id"), str) and node["id"] != "", where, "node id must be a non-empty string")
+    where = f"node '{node['id']}'"
+    for field in ("name", "category"):
+        check(isinstance(node.get(field), str) and node[field] != "", where, f"{field} must be a non-empty string")
+    check(isinstance(node.get("description", ""), str), where, "description must be a string")
+    check(node.get("url") is None or isinstance(node["url"], str), where, "url must be a string")
+    check(is_number(node.get("size", 20)) and node.get("size", 20) > 0, where, "size must be a positive number")
+    check(node.get("research") is None or is_str_list(node["research"]), where, "research must be a list of strings")
+    sources = node.get("sources")
+    check(sources is None or (isinstance(sources, list) and all(isinstance(source, (dict, str)) for source in sources)),
+          where, "sources must be a list of {text, url} objects")
+    check(node.get("source_ids") is None or is_str_list(node["source_ids"]), where, "source_ids must be a list of strings")
+    for field in ("degree", "community"):
+        value = node.get(field)
+        check(value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0), where,
+              f"{field} must be a non-negative integer")
+    for field in ("weighted_degree", "betweenness", "x", "y", "fx", "fy"):
+        check(node.get(field) is None or is_number(node[field]), where, f"{field} must be a number")
+
+
+def validate_link(link: Dict, where: str):
+    check(isinstance(link, dict), where, "link must be an object")
+    for field in ("source", "target"):
+        check(isinstance(link.get(field), str) and link[field] != "", where, f"{field} must be a node id")
+    where = f"link {link['source']} -> {link['target']}"
+    check(is_number(link.get("strength", 3)), where, "strength must be a number")
+    weight = link.get("weight")
+    check(weight is None or (isinstance(weight, int) and weight >= 1), where, "weight must be a positive integer")
+
+
+def validate_network(network: Dict):
+    """
+    Raise ValidationError if a network (nodes, links, the sources they cite, citation text
+    and metadata) is malformed, has duplicate node ids or links to missing nodes.
+    """
+    check(isinstance(network, dict), "network", "must be an object")
+    check(isinstance(network.get("nodes"), list), "network", "nodes must be a list")
+    check(isinstance(network.get("links"), list), "network", "links must be a list")
+    ids = set()
+    for i, node in enumerate(network["nodes"]):
+        validate_node(node, f"node #{i + 1}")
+        check(node["id"] not in ids, f"node '{node['id']}'", "id appears more than once")
+        ids.add(node["id"])
+    for i, link in enumerate(network["links"]):
+        validate_link(link, f"link #{i + 1}")
+        for end in (link["source"], link["target"]):
+            check(end in ids, f"link {link['source']} -> {link['target']}", f"unknown node '{end}'")
+    sources = network.get("sources")
+    check(sources is None or (isinstance(sources, list) and all(isinstance(entry, dict) and "id" in entry for entry in sources)),
+          "network", "sources must be a list of source entries")
+    if sources is not None:
+        source_ids = {entry["id"] for entry in sources}
+        for node in network["nodes"]:
+            for source_id in node.get("source_ids") or []:
+                check(source_id in source_ids, f"node '{node['id']}'", f"cites source '{source_id}' missing from the sources table")
+    check(network.get("metadata") is None or isinstance(network["metadata"], dict), "network", "metadata must be an object")